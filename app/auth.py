@@ -1,56 +1,272 @@
 from fastapi import Security, HTTPException, status
 from fastapi.security.api_key import APIKeyHeader
-from app.config import settings
+from app.config import Settings, settings, settings_store
 from app.logger import logger
+from app.metrics import STAGE_LATENCY
+from typing import Any, Dict, FrozenSet, List, MutableMapping, NamedTuple, Optional
+import hashlib
+import hmac
+import json
+import os
+import time
 
 api_key_header = APIKeyHeader(name=settings.API_KEY_NAME, auto_error=False)
 
-async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
+DEFAULT_TIER = "default"
+
+
+class APIClient(NamedTuple):
+    """Identity and permissions attached to an API key."""
+    client_id: str
+    key_hash: bytes
+    rate_limit_tier: str = DEFAULT_TIER
+    # None allows every template
+    allowed_templates: Optional[FrozenSet[str]] = None
+    # May manage service-wide data such as the suppression list
+    admin: bool = False
+
+    def can_send(self, template_name: str) -> bool:
+        return self.allowed_templates is None or template_name in self.allowed_templates
+
+
+def hash_api_key(api_key: str) -> bytes:
+    """SHA-256 digest an API key is stored and looked up by."""
+    return hashlib.sha256(api_key.strip().encode()).digest()
+
+
+def parse_rate_limit_tiers(spec: str) -> Dict[str, int]:
+    """
+    Parse ``"name:limit,name:limit"`` into a tier -> requests-per-window map.
+
+    The default tier always exists and falls back to RATE_LIMIT_MAX_REQUESTS.
+    """
+    tiers = {DEFAULT_TIER: settings.RATE_LIMIT_MAX_REQUESTS}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, limit = item.partition(":")
+        tiers[name.strip()] = int(limit)
+    return tiers
+
+
+class APIKeyAuthenticator:
+    """
+    Constant-time lookup of API keys.
+
+    Keys are held only as SHA-256 digests in a dict, so verifying a request
+    costs one hash and one O(1) lookup however many keys are configured.
+    Keys come from ``API_KEYS_FILE`` (reloaded when the file changes) plus
+    the single legacy ``API_KEY``.
+
+    ``API_KEYS_FILE`` is JSON::
+
+        {"keys": [
+            {"client_id": "billing", "key_sha256": "<hex digest>",
+             "rate_limit_tier": "premium", "templates": ["order_confirm"]},
+            {"client_id": "ops", "key_sha256": "<hex digest>", "admin": true}
+        ]}
+
+    ``key`` may be given instead of ``key_sha256`` for local setups.
+    """
+
+    def __init__(self, keys_file: str = "", legacy_key: str = "", reload_interval: float = 5.0):
+        self.keys_file = keys_file
+        self.legacy_key = legacy_key
+        self.reload_interval = reload_interval
+        self._clients: Dict[bytes, APIClient] = {}
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.reload()
+
+    def _load(self) -> Dict[bytes, APIClient]:
+        clients: Dict[bytes, APIClient] = {}
+        if self.legacy_key:
+            digest = hash_api_key(self.legacy_key)
+            # The single legacy key owns the whole deployment
+            clients[digest] = APIClient(client_id="default", key_hash=digest, admin=True)
+        if self.keys_file:
+            with open(self.keys_file) as f:
+                data = json.load(f)
+            entries: List[Dict[str, Any]] = data["keys"] if isinstance(data, dict) else data
+            for entry in entries:
+                if "key_sha256" in entry:
+                    digest = bytes.fromhex(entry["key_sha256"])
+                else:
+                    digest = hash_api_key(entry["key"])
+                templates = entry.get("templates")
+                clients[digest] = APIClient(
+                    client_id=entry["client_id"],
+                    key_hash=digest,
+                    rate_limit_tier=entry.get("rate_limit_tier", DEFAULT_TIER),
+                    allowed_templates=None if templates in (None, "*") else frozenset(templates),
+                    admin=bool(entry.get("admin", False))
+                )
+        return clients
+
+    def reload(self) -> bool:
+        """
+        Re-read the configured keys and swap them in atomically.
+
+        On error the current keys stay active. Returns True if keys were loaded.
+        """
+        try:
+            mtime = os.stat(self.keys_file).st_mtime if self.keys_file else None
+            clients = self._load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.reload_errors += 1
+            logger.error("Could not load API keys from %s: %s", self.keys_file, e)
+            return False
+        self._clients = clients
+        self._mtime = mtime
+        self.reloads += 1
+        logger.info("Loaded %s API keys", len(clients))
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if not self.keys_file or now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.keys_file).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def authenticate(self, api_key: str) -> Optional[APIClient]:
+        """Return the client owning ``api_key``, or None if the key is unknown."""
+        self._maybe_reload()
+        digest = hash_api_key(api_key)
+        client = self._clients.get(digest)
+        if client is None or not hmac.compare_digest(client.key_hash, digest):
+            return None
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "keys_file": self.keys_file or None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+_authenticator: Optional[APIKeyAuthenticator] = None
+_rate_limit_tiers: Optional[Dict[str, int]] = None
+
+_api_key_header_name = settings.API_KEY_NAME.lower().encode("latin-1")
+
+
+def get_authenticator() -> APIKeyAuthenticator:
+    """Return the shared authenticator, loading API_KEYS_FILE on first use."""
+    global _authenticator
+    if _authenticator is None:
+        _authenticator = APIKeyAuthenticator(
+            keys_file=settings.API_KEYS_FILE,
+            legacy_key=settings.API_KEY,
+            reload_interval=settings.API_KEYS_RELOAD_INTERVAL
+        )
+    return _authenticator
+
+
+def get_rate_limit_tiers() -> Dict[str, int]:
+    """RATE_LIMIT_TIERS parsed; see parse_rate_limit_tiers."""
+    global _rate_limit_tiers
+    if _rate_limit_tiers is None:
+        _rate_limit_tiers = parse_rate_limit_tiers(settings.RATE_LIMIT_TIERS)
+    return _rate_limit_tiers
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    global _rate_limit_tiers
+    if _rate_limit_tiers is not None:
+        _rate_limit_tiers = parse_rate_limit_tiers(new.RATE_LIMIT_TIERS)
+    authenticator = _authenticator
+    if authenticator is None:
+        return
+    if (new.API_KEY, new.API_KEYS_FILE) != (authenticator.legacy_key, authenticator.keys_file):
+        authenticator.legacy_key = new.API_KEY
+        authenticator.keys_file = new.API_KEYS_FILE
+        authenticator.reload()
+    authenticator.reload_interval = new.API_KEYS_RELOAD_INTERVAL
+
+
+def rate_limit_for_scope(scope: MutableMapping) -> Optional[int]:
+    """
+    Requests-per-window allowed for the API key on an ASGI request.
+
+    Used by RateLimitMiddleware when limiting by API key; unknown keys get
+    the default limit (and are rejected by verify_api_key anyway).
+    """
+    for name, value in scope.get("headers", ()):
+        if name == _api_key_header_name:
+            client = get_authenticator().authenticate(value.decode("latin-1"))
+            if client is not None:
+                return get_rate_limit_tiers().get(client.rate_limit_tier)
+            break
+    return None
+
+
+async def verify_api_key(api_key: str = Security(api_key_header)) -> APIClient:
     """
     Verify the API key from the request header.
-    
+
     Args:
         api_key: The API key from the request header
-        
+
     Returns:
-        str: The verified API key
-        
+        APIClient: The client the key belongs to
+
     Raises:
         HTTPException: If the API key is invalid or missing
     """
-    # Enhanced debug logging
-    logger.debug("=== API Key Verification Debug Info ===")
-    logger.debug(f"Header name being checked: {settings.API_KEY_NAME}")
-    logger.debug(f"Raw received API key: '{api_key}'")  # Log the full key in debug mode
-    logger.debug(f"Raw expected API key: '{settings.API_KEY}'")  # Log the full key in debug mode
-    logger.debug(f"Received API key length: {len(api_key) if api_key else 0}")
-    logger.debug(f"Expected API key length: {len(settings.API_KEY) if settings.API_KEY else 0}")
-    logger.debug(f"API key type received: {type(api_key)}")
-    logger.debug(f"API key type expected: {type(settings.API_KEY)}")
-    
-    if not api_key:
-        logger.warning("No API key provided in request")
+    started = time.perf_counter()
+    try:
+        if not api_key:
+            logger.warning("No API key provided in request")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API Key header is missing"
+            )
+
+        client = get_authenticator().authenticate(api_key)
+        if client is None:
+            logger.warning("Invalid API key provided")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid API Key"
+            )
+        return client
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, "auth")
+
+
+def require_template(client: APIClient, template_name: str) -> None:
+    """
+    Raises:
+        HTTPException: 403 if the client may not send ``template_name``
+    """
+    if not client.can_send(template_name):
+        logger.warning("API client %s is not allowed to send template %s", client.client_id, template_name)
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="API Key header is missing"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"API key is not allowed to send template '{template_name}'"
         )
-    
-    # Strip whitespace and compare
-    received_key = api_key.strip() if api_key else ""
-    expected_key = settings.API_KEY.strip() if settings.API_KEY else ""
-    
-    logger.debug(f"Stripped received key: '{received_key}'")
-    logger.debug(f"Stripped expected key: '{expected_key}'")
-    logger.debug(f"Keys equal after strip: {received_key == expected_key}")
-    
-    if received_key != expected_key:
-        logger.warning("Invalid API key provided. Key mismatch details:")
-        logger.warning(f"Received key: '{received_key}'")  # Log full key in warning for debugging
-        logger.warning(f"Expected key: '{expected_key}'")  # Log full key in warning for debugging
+
+
+def require_admin(api_client: APIClient = Security(verify_api_key)) -> APIClient:
+    """
+    Dependency for admin-only routes.
+
+    Raises:
+        HTTPException: 403 if the API key is not an admin key
+    """
+    if not api_client.admin:
+        logger.warning("API client %s attempted an admin operation", api_client.client_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid API Key"
+            detail="Admin API key required"
         )
-    
-    logger.info("API key validation successful")
-    return api_key
+    return api_client
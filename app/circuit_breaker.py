@@ -0,0 +1,189 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+from fastapi import HTTPException, status
+from app.config import Settings, settings, settings_store
+from app.logger import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker over a count-based sliding window.
+
+    The breaker opens when, over the last ``window_size`` calls (and at least
+    ``minimum_calls``), the failure rate or the slow-call rate reaches its
+    threshold. After ``open_seconds`` it lets up to ``half_open_max_calls``
+    probes through; if they all succeed it closes again, otherwise it re-opens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.8,
+        slow_call_seconds: float = 5.0,
+        window_size: int = 50,
+        minimum_calls: int = 20,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self.failures = 0
+        self.slow_calls = 0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        self.window.clear()
+        self.failures = 0
+        self.slow_calls = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self) -> None:
+        """
+        Reserve permission for one call.
+
+        Raises:
+            HTTPException: 503 while the circuit is open or half-open probes are exhausted
+        """
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self._reject()
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_max_calls:
+                self._reject()
+            self.probes_in_flight += 1
+
+    def _reject(self) -> None:
+        self.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="WhatsApp API is currently unavailable (circuit open). Please try again later.",
+            headers={"Retry-After": str(max(1, int(self.retry_after() + 0.5)))}
+        )
+
+    def release(self) -> None:
+        """Give back a reserved call that was cancelled before it completed."""
+        if self.state == HALF_OPEN and self.probes_in_flight:
+            self.probes_in_flight -= 1
+
+    def record(self, success: bool, duration: float) -> None:
+        """Record the outcome of a call permitted by ``before_call``."""
+        slow = duration >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if not success or slow:
+                self._transition(OPEN)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_max_calls:
+                self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            return
+
+        if len(self.window) == self.window.maxlen:
+            old_failed, old_slow = self.window[0]
+            self.failures -= old_failed
+            self.slow_calls -= old_slow
+        self.window.append((not success, slow))
+        self.failures += not success
+        self.slow_calls += slow
+
+        calls = len(self.window)
+        if calls >= self.minimum_calls and (
+            self.failures / calls >= self.failure_rate_threshold
+            or self.slow_calls / calls >= self.slow_call_rate_threshold
+        ):
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self.window)
+        return {
+            "state": self.state,
+            "calls_in_window": calls,
+            "failure_rate": round(self.failures / calls, 4) if calls else 0.0,
+            "slow_call_rate": round(self.slow_calls / calls, 4) if calls else 0.0,
+            "retry_after_seconds": round(self.retry_after(), 3) if self.state == OPEN else 0.0,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Circuit breakers keyed by Graph API endpoint and phone-number ID."""
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str, phone_number_id: str) -> CircuitBreaker:
+        key = f"{endpoint}:{phone_number_id}"
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(
+                key,
+                failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+                slow_call_rate_threshold=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+                window_size=settings.CIRCUIT_BREAKER_WINDOW_SIZE,
+                minimum_calls=settings.CIRCUIT_BREAKER_MINIMUM_CALLS,
+                open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+                half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS
+            )
+        return breaker
+
+    def is_open(self, endpoint: str, phone_number_id: str) -> bool:
+        """True while the breaker rejects calls (open and not yet due for probes)."""
+        breaker = self.breakers.get(f"{endpoint}:{phone_number_id}")
+        return breaker is not None and breaker.state == OPEN and breaker.retry_after() > 0
+
+    def any_open(self) -> bool:
+        return any(breaker.state != CLOSED for breaker in self.breakers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {key: breaker.stats() for key, breaker in self.breakers.items()}
+
+
+circuit_breakers = CircuitBreakerRegistry()
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    # The window size of existing breakers is kept; new breakers use the new size
+    for breaker in circuit_breakers.breakers.values():
+        breaker.failure_rate_threshold = new.CIRCUIT_BREAKER_FAILURE_RATE
+        breaker.slow_call_rate_threshold = new.CIRCUIT_BREAKER_SLOW_CALL_RATE
+        breaker.slow_call_seconds = new.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        breaker.minimum_calls = new.CIRCUIT_BREAKER_MINIMUM_CALLS
+        breaker.open_seconds = new.CIRCUIT_BREAKER_OPEN_SECONDS
+        breaker.half_open_max_calls = new.CIRCUIT_BREAKER_HALF_OPEN_CALLS
@@ -1,64 +1,451 @@
+import asyncio
 import os
-from typing import List
-from dotenv import load_dotenv
-from app.logger import logger
+import signal
+import tempfile
+import threading
+import time
+from typing import Any, Callable, ClassVar, Dict, List, Literal, Mapping, Optional
+from dotenv import dotenv_values, find_dotenv
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from app.logger import configure_logging, logger
 
-# Load environment variables from .env file with override=True to ensure values are loaded
-load_dotenv(override=True)
 
-# Debug logging for raw environment variables
-raw_api_key = os.getenv('API_KEY')
-logger.debug("=== Raw Environment Variables Debug Info ===")
-logger.debug(f"Raw API_KEY from environment: '{raw_api_key}'")
-logger.debug(f"Raw API_KEY type: {type(raw_api_key)}")
-logger.debug(f"Raw API_KEY length: {len(raw_api_key) if raw_api_key else 0}")
+def _default_shm_path() -> str:
+    return os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "whatsapp_rate_limit")
+
+
+class Settings(BaseModel):
+    """
+    Service configuration, read from the environment and the ``.env`` file.
+
+    Instances are immutable and validated as a whole, so a bad value fails
+    the load with every problem listed instead of surfacing on first use.
+    Fields are named after their environment variables.
+    """
+
+    model_config = ConfigDict(frozen=True, populate_by_name=True)
 
-class Settings:
     # API Configuration
-    API_V1_STR: str = "/api/v1"
-    PROJECT_NAME: str = "WhatsApp Microservice"
-    
+    API_V1_STR: ClassVar[str] = "/api/v1"
+    PROJECT_NAME: ClassVar[str] = "WhatsApp Microservice"
+
     # WhatsApp API Configuration
-    WHATSAPP_API_TOKEN: str = os.getenv("WHATSAPP_API_TOKEN", "")
-    WHATSAPP_PHONE_NUMBER_ID: str = os.getenv("PHONE_NUMBER_ID", "")  # Reading from PHONE_NUMBER_ID env var
-    
+    WHATSAPP_API_TOKEN: str = ""
+    WHATSAPP_PHONE_NUMBER_ID: str = Field("", alias="PHONE_NUMBER_ID")  # Reading from PHONE_NUMBER_ID env var
+    GRAPH_API_BASE_URL: str = "https://graph.facebook.com/v12.0"
+    WHATSAPP_BUSINESS_ACCOUNT_ID: str = ""  # owner of the templates
+
+    # Template Catalog Settings (local checks of template name, language and parameter counts)
+    TEMPLATE_CATALOG_FILE: str = ""  # JSON or YAML
+    TEMPLATE_CATALOG_FETCH: bool = False
+    TEMPLATE_CATALOG_TTL: float = Field(600, gt=0)
+    TEMPLATE_DEFAULT_LANGUAGE: str = "en_US"
+
+    # Graph API HTTP Client Settings (shared connection pool)
+    HTTP_MAX_CONNECTIONS: int = Field(100, ge=1)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, ge=0)
+    HTTP_KEEPALIVE_EXPIRY: float = Field(30, ge=0)
+    HTTP2_ENABLED: bool = False
+    HTTP_CONNECT_TIMEOUT: float = Field(5, gt=0)
+    HTTP_READ_TIMEOUT: float = Field(15, gt=0)
+    HTTP_WRITE_TIMEOUT: float = Field(5, gt=0)
+    HTTP_POOL_TIMEOUT: float = Field(5, gt=0)
+
+    # Batch Send Settings
+    BATCH_MAX_RECIPIENTS: int = Field(10000, ge=1)
+    BATCH_MAX_CONCURRENCY: int = Field(20, ge=1)
+
+    # Phone Number Normalization (LRU cache of already-normalized recipients)
+    PHONE_CACHE_SIZE: int = Field(100000, ge=0)
+
+    # Media Settings (documents uploaded to the Graph API once and sent by id)
+    MEDIA_CACHE_ENABLED: bool = True
+    MEDIA_CACHE_SIZE: int = Field(10000, ge=1)
+    MEDIA_CACHE_TTL: float = Field(7 * 86400, gt=0)
+    MEDIA_MAX_BYTES: int = Field(100 * 1024 * 1024, ge=1)
+    MEDIA_SPOOL_BYTES: int = Field(1024 * 1024, ge=0)
+    MEDIA_FETCH_ALLOWED_HOSTS: str = ""  # e.g. "cdn.example.com,.example.org"; empty = any public host
+    MEDIA_FETCH_ALLOW_PRIVATE: bool = False  # also fetch from private/loopback addresses (on-prem hosts)
+
+    # Recipient Ordering Settings (sends to one number run one at a time, in order)
+    RECIPIENT_ORDERING_ENABLED: bool = True
+    DUPLICATE_WINDOW_SECONDS: float = Field(2, ge=0)
+    DUPLICATE_MAX_KEYS: int = Field(100000, ge=1)
+
+    # Sender Pool Settings (several phone numbers; PHONE_NUMBER_ID alone when no file is given)
+    SENDERS_FILE: str = ""  # JSON list of phone_number_id/token/capacity
+    SENDER_SELECTION: Literal["least_loaded", "weighted_round_robin"] = "least_loaded"
+    SENDER_STICKY: bool = True
+    SENDER_STICKY_SIZE: int = Field(100000, ge=1)
+    SENDER_COOLDOWN_SECONDS: float = Field(60, ge=0)
+
+    # Outbound Throttle Settings (per sending phone-number ID)
+    OUTBOUND_THROTTLE_ENABLED: bool = True
+    OUTBOUND_RATE_PER_SECOND: float = Field(80, gt=0)
+    OUTBOUND_BURST: int = Field(80, ge=1)
+    OUTBOUND_MAX_WAIT_SECONDS: float = Field(10, ge=0)
+
+    # Retry Settings for Graph API failures
+    RETRY_MAX_ATTEMPTS: int = Field(3, ge=1)
+    RETRY_BASE_DELAY: float = Field(0.2, ge=0)
+    RETRY_MAX_DELAY: float = Field(5, ge=0)
+    RETRY_DEADLINE_SECONDS: float = Field(20, gt=0)
+
+    # Circuit Breaker Settings (per Graph API endpoint and phone-number ID)
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_RATE: float = Field(0.5, gt=0, le=1)
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = Field(0.8, gt=0, le=1)
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = Field(5, gt=0)
+    CIRCUIT_BREAKER_WINDOW_SIZE: int = Field(50, ge=1)
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = Field(20, ge=1)
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = Field(30, ge=0)
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = Field(3, ge=1)
+
+    # Idempotency Settings (Idempotency-Key header on send endpoints)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: float = Field(86400, gt=0)
+    IDEMPOTENCY_MAX_KEYS: int = Field(100000, ge=1)
+    IDEMPOTENCY_SQLITE_PATH: str = ""  # empty = in-memory only
+
+    # Async Send Queue Settings
+    SEND_QUEUE_ENABLED: bool = False
+    SEND_QUEUE_DEFAULT_ASYNC: bool = False
+    SEND_QUEUE_PATH: str = "data/send_queue.db"
+    SEND_QUEUE_WORKERS: int = Field(4, ge=1)
+    SEND_QUEUE_POLL_INTERVAL: float = Field(1.0, gt=0)
+    SEND_QUEUE_LEASE_SECONDS: float = Field(300, gt=0)  # claimed jobs older than this are re-queued
+
+    # Suppression List Settings (opted-out recipients never reach the Graph API)
+    SUPPRESSION_ENABLED: bool = True
+    SUPPRESSION_SNAPSHOT_PATH: str = "data/suppression.bin"
+    SUPPRESSION_RELOAD_INTERVAL: float = Field(2, gt=0)
+    SUPPRESSION_COMPACT_THRESHOLD: int = Field(100000, ge=1)
+    SUPPRESSION_MAX_UPDATE: int = Field(100000, ge=1)
+
+    # Scheduled Send Settings (send_at on send requests)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_PATH: str = "data/scheduled.db"
+    SCHEDULER_RELEASE_RATE: float = Field(50, gt=0)  # sends per second
+    SCHEDULER_CONCURRENCY: int = Field(20, ge=1)
+    SCHEDULER_HORIZON_SECONDS: float = Field(300, gt=0)
+    SCHEDULER_MAX_LOADED: int = Field(100000, ge=1)
+    SCHEDULER_POLL_INTERVAL: float = Field(1.0, gt=0)
+    SCHEDULER_LEASE_SECONDS: float = Field(300, gt=0)  # claimed sends older than this are rescheduled
+    SCHEDULER_MAX_DAYS: float = Field(30, gt=0)
+
+    # Webhook Settings (delivery statuses and inbound messages from Meta)
+    WEBHOOK_VERIFY_TOKEN: str = ""
+    WHATSAPP_APP_SECRET: str = ""  # used to check X-Hub-Signature-256
+    WEBHOOK_ALLOW_UNSIGNED: bool = False  # accept unsigned webhooks when no app secret is set (local testing only)
+    WEBHOOK_MAX_BODY_BYTES: int = Field(1048576, ge=1)  # larger webhook bodies are refused with 413
+    WEBHOOK_QUEUE_SIZE: int = Field(10000, ge=1)
+    WEBHOOK_BATCH_SIZE: int = Field(500, ge=1)
+    WEBHOOK_FLUSH_INTERVAL: float = Field(0.5, gt=0)
+    STATUS_STORE_PATH: str = "data/status.db"
+
+    # Send Log Settings (every send recorded in the status store)
+    STATUS_RECORD_SENDS: bool = True
+    STATUS_WRITE_QUEUE_SIZE: int = Field(10000, ge=1)
+    STATUS_WRITE_BATCH_SIZE: int = Field(500, ge=1)
+    STATUS_FLUSH_INTERVAL: float = Field(0.5, gt=0)
+    STATUS_RETENTION_DAYS: float = Field(30, gt=0)
+    STATUS_COMPACT_INTERVAL: float = Field(3600, gt=0)
+
     # Security Settings
-    API_KEY_NAME: str = "X-API-Key"  # Name of the header for API key
-    API_KEY: str = os.getenv("API_KEY", "").strip()  # Strip whitespace from API key
-    ENFORCE_HTTPS: bool = os.getenv("ENFORCE_HTTPS", "true").lower() == "true"
-    RATE_LIMIT_MAX_REQUESTS: int = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "100"))
-    RATE_LIMIT_WINDOW_SECONDS: int = 60  # Default window of 60 seconds
-    
+    API_KEY_NAME: ClassVar[str] = "X-API-Key"  # Name of the header for API key
+    API_KEY: str = ""
+    API_KEYS_FILE: str = ""  # JSON file of hashed per-client keys
+    API_KEYS_RELOAD_INTERVAL: float = Field(5, ge=0)
+    ENFORCE_HTTPS: bool = True
+    RATE_LIMIT_MAX_REQUESTS: int = Field(100, ge=1)
+    RATE_LIMIT_WINDOW_SECONDS: ClassVar[int] = 60  # Default window of 60 seconds
+    RATE_LIMIT_KEY: Literal["ip", "forwarded", "api_key"] = "ip"
+    RATE_LIMIT_TIERS: str = ""  # e.g. "premium:1000,bulk:5000" (per API key)
+    RATE_LIMIT_MAX_KEYS: int = Field(100000, ge=1)
+    RATE_LIMIT_BACKEND: Literal["memory", "shared_memory", "redis"] = "memory"
+    RATE_LIMIT_SHM_PATH: str = Field(default_factory=_default_shm_path)
+    RATE_LIMIT_SHM_SLOTS: int = Field(65536, ge=1)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_REDIS_PREFIX: str = "whatsapp:ratelimit:"
+    RATE_LIMIT_REDIS_TIMEOUT: float = Field(0.05, gt=0)
+
+    # Metrics Settings (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = True
+
     # CORS Settings
-    CORS_ORIGINS: List[str] = ["*"]
-    CORS_ALLOW_CREDENTIALS: bool = True
-    CORS_ALLOW_METHODS: List[str] = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
-    CORS_ALLOW_HEADERS: List[str] = ["*"]
-    
+    CORS_ORIGINS: ClassVar[List[str]] = ["*"]
+    CORS_ALLOW_CREDENTIALS: ClassVar[bool] = True
+    CORS_ALLOW_METHODS: ClassVar[List[str]] = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+    CORS_ALLOW_HEADERS: ClassVar[List[str]] = ["*"]
+
+    # Settings Reload (SIGHUP, or the .env file changing)
+    SETTINGS_RELOAD_ON_SIGHUP: bool = True
+    SETTINGS_RELOAD_INTERVAL: float = Field(5, ge=0)  # seconds between .env checks; 0 = SIGHUP only
+
     # Application Settings
-    DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "debug").upper()
-
-    def __init__(self):
-        # Validate API key on initialization
-        if not self.API_KEY:
-            logger.warning("API_KEY is empty or not set in environment")
-        else:
-            logger.debug(f"API_KEY initialized with length: {len(self.API_KEY)}")
-        
-        # Validate WhatsApp configuration
-        if not self.WHATSAPP_API_TOKEN:
-            logger.warning("WHATSAPP_API_TOKEN is not set")
-        if not self.WHATSAPP_PHONE_NUMBER_ID:
-            logger.warning("WHATSAPP_PHONE_NUMBER_ID is not set")
-
-# Create settings instance
-settings = Settings()
-
-# Debug print to verify API key loading
-logger.debug("=== Settings Instance Debug Info ===")
-logger.debug(f"Final API Key from settings (first 4 chars): {settings.API_KEY[:4] if settings.API_KEY else 'None'}")
-logger.debug(f"Final API Key length in settings: {len(settings.API_KEY)}")
-logger.debug(f"Final API Key type in settings: {type(settings.API_KEY)}")
-logger.debug(f"Expected header name: {settings.API_KEY_NAME}")
-logger.debug(f"WhatsApp Phone Number ID: {settings.WHATSAPP_PHONE_NUMBER_ID}")
+    DEBUG: bool = True
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_SAMPLE_RATE: float = Field(1.0, ge=0, le=1)  # fraction of sampled info logs kept
+
+    @field_validator("GRAPH_API_BASE_URL")
+    @classmethod
+    def _strip_trailing_slash(cls, value: str) -> str:
+        return value.rstrip("/")
+
+    @field_validator("API_KEY")
+    @classmethod
+    def _strip_whitespace(cls, value: str) -> str:
+        return value.strip()
+
+    @field_validator("SENDER_SELECTION", "RATE_LIMIT_KEY", "RATE_LIMIT_BACKEND", "LOG_FORMAT", mode="before")
+    @classmethod
+    def _lower(cls, value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+
+    @field_validator("LOG_LEVEL", mode="before")
+    @classmethod
+    def _upper(cls, value: Any) -> Any:
+        return value.strip().upper() if isinstance(value, str) else value
+
+    @field_validator("RATE_LIMIT_TIERS")
+    @classmethod
+    def _check_tiers(cls, value: str) -> str:
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            name, _, limit = item.partition(":")
+            if not name.strip() or not limit.strip().isdigit() or int(limit) < 1:
+                raise ValueError(f"expected 'name:limit' pairs with a limit of at least 1, got '{item}'")
+        return value
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str]) -> "Settings":
+        """
+        Build settings from environment variables; unset variables keep their defaults.
+
+        Raises:
+            ValidationError: Listing every variable with an invalid value
+        """
+        values = {}
+        for name, field in cls.model_fields.items():
+            key = field.alias or name
+            if key in environ:
+                values[key] = environ[key]
+        return cls.model_validate(values)
+
+
+# Read once at startup (connection pools, stores, background tasks); a reload
+# logs a warning when one of these changes instead of applying it
+RESTART_REQUIRED = frozenset({
+    "HTTP_MAX_CONNECTIONS", "HTTP_MAX_KEEPALIVE_CONNECTIONS", "HTTP_KEEPALIVE_EXPIRY", "HTTP2_ENABLED",
+    "HTTP_CONNECT_TIMEOUT", "HTTP_READ_TIMEOUT", "HTTP_WRITE_TIMEOUT", "HTTP_POOL_TIMEOUT",
+    "TEMPLATE_CATALOG_FILE", "TEMPLATE_CATALOG_FETCH", "TEMPLATE_CATALOG_TTL",
+    "PHONE_CACHE_SIZE", "IDEMPOTENCY_SQLITE_PATH", "CIRCUIT_BREAKER_WINDOW_SIZE",
+    "SEND_QUEUE_ENABLED", "SEND_QUEUE_PATH", "SEND_QUEUE_WORKERS", "SEND_QUEUE_POLL_INTERVAL",
+    "SEND_QUEUE_LEASE_SECONDS",
+    "SUPPRESSION_ENABLED", "SUPPRESSION_SNAPSHOT_PATH", "SUPPRESSION_RELOAD_INTERVAL", "SUPPRESSION_COMPACT_THRESHOLD",
+    "SCHEDULER_ENABLED", "SCHEDULER_PATH", "SCHEDULER_RELEASE_RATE", "SCHEDULER_CONCURRENCY",
+    "SCHEDULER_HORIZON_SECONDS", "SCHEDULER_MAX_LOADED", "SCHEDULER_POLL_INTERVAL",
+    "SCHEDULER_LEASE_SECONDS",
+    "WEBHOOK_QUEUE_SIZE", "WEBHOOK_BATCH_SIZE", "WEBHOOK_FLUSH_INTERVAL", "STATUS_STORE_PATH",
+    "STATUS_WRITE_QUEUE_SIZE", "STATUS_WRITE_BATCH_SIZE", "STATUS_FLUSH_INTERVAL", "STATUS_RETENTION_DAYS",
+    "STATUS_COMPACT_INTERVAL", "ENFORCE_HTTPS", "METRICS_ENABLED",
+    "RATE_LIMIT_KEY", "RATE_LIMIT_MAX_KEYS", "RATE_LIMIT_BACKEND", "RATE_LIMIT_SHM_PATH", "RATE_LIMIT_SHM_SLOTS",
+    "RATE_LIMIT_REDIS_URL", "RATE_LIMIT_REDIS_PREFIX", "RATE_LIMIT_REDIS_TIMEOUT",
+    "SETTINGS_RELOAD_ON_SIGHUP", "SETTINGS_RELOAD_INTERVAL",
+})
+
+
+class SettingsStore:
+    """
+    Holds the current Settings and replaces them on reload.
+
+    Nothing is read until settings are first used. A reload re-reads the
+    ``.env`` file, validates a complete new Settings object and swaps the
+    reference in a single assignment, so readers see either the old values
+    or the new ones, never a mix; if validation fails the current settings
+    stay. Modules that copy settings into long-lived objects register an
+    ``on_reload`` callback to apply new values.
+    """
+
+    def __init__(self, env_file: Optional[str] = None):
+        # None: ENV_FILE, or the nearest .env found above this package
+        self.env_file = env_file
+        self._current: Optional[Settings] = None
+        # Values last applied from the .env file, to unset removed variables
+        self._file_values: Dict[str, str] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[Settings], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._sighup = False
+
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _read_file(self) -> Dict[str, str]:
+        if self.env_file is None:
+            self.env_file = os.getenv("ENV_FILE") or find_dotenv()
+        if not self.env_file:
+            return {}
+        mtime = os.stat(self.env_file).st_mtime
+        values = {key: value for key, value in dotenv_values(self.env_file).items() if value is not None}
+        self._mtime = mtime
+        return values
+
+    def _environ(self, file_values: Dict[str, str]) -> Dict[str, str]:
+        """The process environment with ``file_values`` applied (file values win)."""
+        environ = dict(os.environ)
+        for key in self._file_values.keys() - file_values.keys():
+            if environ.get(key) == self._file_values[key]:
+                del environ[key]
+        environ.update(file_values)
+        return environ
+
+    def _apply_file(self, file_values: Dict[str, str]) -> None:
+        # Other modules (sender token_env) read os.environ directly
+        for key in self._file_values.keys() - file_values.keys():
+            if os.environ.get(key) == self._file_values[key]:
+                del os.environ[key]
+        os.environ.update(file_values)
+        self._file_values = file_values
+
+    @property
+    def current(self) -> Settings:
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    try:
+                        file_values = self._read_file()
+                    except OSError as e:
+                        logger.warning("Could not read %s: %s", self.env_file, e)
+                        file_values = {}
+                    loaded = Settings.from_env(self._environ(file_values))
+                    self._apply_file(file_values)
+                    self.loaded_at = time.time()
+                    self._current = loaded
+                    # The logger was set up from os.environ before .env was read
+                    _apply_log_settings(loaded)
+                    if not loaded.API_KEY and not loaded.API_KEYS_FILE:
+                        logger.warning("Neither API_KEY nor API_KEYS_FILE is set")
+                    if not loaded.WHATSAPP_API_TOKEN:
+                        logger.warning("WHATSAPP_API_TOKEN is not set")
+                    if not loaded.WHATSAPP_PHONE_NUMBER_ID:
+                        logger.warning("WHATSAPP_PHONE_NUMBER_ID is not set")
+                current = self._current
+        return current
+
+    def on_reload(self, callback: Callable[[Settings], None]) -> Callable[[Settings], None]:
+        """Call ``callback(new_settings)`` after every successful reload. Usable as a decorator."""
+        self._callbacks.append(callback)
+        return callback
+
+    def reload(self) -> bool:
+        """
+        Re-read the ``.env`` file and environment and swap in the new settings.
+
+        On error the current settings stay active. Returns True if settings were replaced.
+        """
+        previous = self.current
+        with self._lock:
+            try:
+                file_values = self._read_file()
+                loaded = Settings.from_env(self._environ(file_values))
+            except (OSError, ValidationError) as e:
+                self.reload_errors += 1
+                logger.error("Could not reload settings; keeping the current values: %s", e)
+                return False
+            self._apply_file(file_values)
+            self._current = loaded
+            self.loaded_at = time.time()
+            self.reloads += 1
+
+        changed = [name for name in Settings.model_fields if getattr(previous, name) != getattr(loaded, name)]
+        logger.info("Settings reloaded; changed: %s", ", ".join(changed) or "nothing")
+        restart = sorted(RESTART_REQUIRED.intersection(changed))
+        if restart:
+            logger.warning("Changes to %s take effect after a restart", ", ".join(restart))
+        for callback in self._callbacks:
+            try:
+                callback(loaded)
+            except Exception as e:
+                logger.error("Applying reloaded settings in %s failed: %r", callback.__module__, e)
+        return True
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.env_file).st_mtime
+            except OSError:
+                continue
+            if mtime != self._mtime:
+                self.reload()
+
+    def start(self) -> None:
+        """
+        Reload on SIGHUP and whenever the ``.env`` file changes. Called from
+        the application lifespan.
+        """
+        current = self.current
+        if current.SETTINGS_RELOAD_ON_SIGHUP and hasattr(signal, "SIGHUP"):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload)
+                self._sighup = True
+            except (NotImplementedError, RuntimeError, ValueError) as e:
+                # Not the main thread, or no signal support in this event loop
+                logger.warning("Settings will not reload on SIGHUP: %s", e)
+        if current.SETTINGS_RELOAD_INTERVAL > 0 and self.env_file and self._task is None:
+            self._task = asyncio.create_task(self._watch(current.SETTINGS_RELOAD_INTERVAL))
+
+    async def stop(self) -> None:
+        if self._sighup:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._sighup = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "env_file": self.env_file or None,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "reload_on_sighup": self._sighup,
+            "watching": self._task is not None,
+        }
+
+
+class SettingsProxy:
+    """
+    ``settings.NAME`` reads NAME from the current Settings.
+
+    Hold on to this object rather than to the Settings it returns, so code
+    always sees the values from the latest reload.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: SettingsStore):
+        object.__setattr__(self, "_store", store)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._store.current, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Settings are read-only; change the environment or .env file and reload")
+
+    def __repr__(self) -> str:
+        return f"<settings from {self._store.env_file or 'the environment'}>"
+
+
+settings_store = SettingsStore()
+settings = SettingsProxy(settings_store)
+
+
+@settings_store.on_reload
+def _apply_log_settings(new: Settings) -> None:
+    configure_logging(new.LOG_LEVEL, new.LOG_FORMAT, new.LOG_SAMPLE_RATE)
@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from app.config import Settings, settings, settings_store
+from app.metrics import RECIPIENT_QUEUE_DEPTH
+
+
+class KeyedDispatcher:
+    """
+    Runs sends for the same key (recipient) one at a time, in arrival order,
+    while sends for different keys run concurrently.
+
+    Each active key holds a deque of turn futures: the head is the send in
+    progress, the rest wait for it to finish. No task is created per key;
+    callers run their own send when their turn comes, and the key is
+    dropped as soon as its deque empties, so memory follows the number of
+    keys with work in flight rather than every key ever seen.
+
+    Exact duplicates (same key and fingerprint) submitted while the first
+    send is in flight, or within ``duplicate_window`` seconds after it
+    completed, share its result instead of sending again. A failed send is
+    forgotten at once, so it can be retried.
+    """
+
+    def __init__(self, duplicate_window: float = 2.0, max_duplicate_keys: int = 100000):
+        self.duplicate_window = duplicate_window
+        self.max_duplicate_keys = max_duplicate_keys
+        self._queues: Dict[Hashable, Deque[asyncio.Future]] = {}
+        # (key, fingerprint) -> future of the send in progress
+        self._in_flight: Dict[Tuple[Hashable, Hashable], asyncio.Future] = {}
+        # (key, fingerprint) -> (future, expires_at) of completed sends, oldest first
+        self._recent: "OrderedDict[Tuple[Hashable, Hashable], Tuple[asyncio.Future, float]]" = OrderedDict()
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.waited = 0
+        self.max_depth = 0
+
+    def depth(self, key: Hashable) -> int:
+        """Sends queued for ``key``, including the one in progress."""
+        queue = self._queues.get(key)
+        return len(queue) if queue else 0
+
+    def _purge_recent(self, now: float) -> None:
+        recent = self._recent
+        while recent:
+            future, expires_at = next(iter(recent.values()))
+            if expires_at > now and len(recent) <= self.max_duplicate_keys:
+                break
+            recent.popitem(last=False)
+
+    def _next_turn(self, key: Hashable, queue: Deque[asyncio.Future]) -> None:
+        queue.popleft()
+        # Waiters cancelled since the last hand-off are skipped
+        while queue and queue[0].cancelled():
+            queue.popleft()
+        if queue:
+            queue[0].set_result(None)
+        elif self._queues.get(key) is queue:
+            del self._queues[key]
+
+    async def _run_in_order(self, key: Hashable, send: Callable[[], Awaitable[Any]]) -> Any:
+        turn = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            turn.set_result(None)
+        queue.append(turn)
+        depth = len(queue)
+        RECIPIENT_QUEUE_DEPTH.observe(depth)
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+        if not turn.done():
+            self.waited += 1
+            try:
+                await turn
+            except asyncio.CancelledError:
+                if turn.cancelled():
+                    if turn in queue:
+                        queue.remove(turn)
+                else:
+                    # Cancelled just after being handed the turn: pass it on
+                    self._next_turn(key, queue)
+                raise
+        try:
+            return await send()
+        finally:
+            self._next_turn(key, queue)
+
+    async def submit(
+        self,
+        key: Hashable,
+        send: Callable[[], Awaitable[Any]],
+        fingerprint: Optional[Hashable] = None
+    ) -> Any:
+        """
+        Run ``send`` after every earlier send for ``key`` has finished.
+
+        Args:
+            key: Ordering key, e.g. the normalized recipient number
+            send: Coroutine function performing the send
+            fingerprint: Identifies the request and its sender; identical
+                fingerprints for the same key within the duplicate window
+                are coalesced
+
+        Returns:
+            The result of ``send`` (or of the duplicate it was coalesced with)
+        """
+        self.submitted += 1
+        if fingerprint is None or self.duplicate_window <= 0:
+            return await self._run_in_order(key, send)
+
+        now = time.monotonic()
+        self._purge_recent(now)
+        duplicate_key = (key, fingerprint)
+        future = self._in_flight.get(duplicate_key)
+        if future is None:
+            entry = self._recent.get(duplicate_key)
+            if entry is not None and entry[1] > now:
+                future = entry[0]
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[duplicate_key] = future
+        try:
+            result = await self._run_in_order(key, send)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so an exception with no waiters is not reported as unhandled
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[duplicate_key]
+        # The window starts when the send completes, so a slow send cannot outlast it
+        self._recent[duplicate_key] = (future, time.monotonic() + self.duplicate_window)
+        self._recent.move_to_end(duplicate_key)
+        future.set_result(result)
+        return result
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        deepest = heapq.nlargest(top, self._queues.items(), key=lambda item: len(item[1]))
+        return {
+            "active_keys": len(self._queues),
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "deepest": {str(key): len(queue) for key, queue in deepest},
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "waited": self.waited,
+            "coalesced": self.coalesced,
+            "duplicate_keys": len(self._in_flight) + len(self._recent),
+        }
+
+
+_recipient_dispatcher: Optional[KeyedDispatcher] = None
+
+
+def get_recipient_dispatcher() -> KeyedDispatcher:
+    """The dispatcher that orders sends per recipient, created on first use."""
+    global _recipient_dispatcher
+    if _recipient_dispatcher is None:
+        _recipient_dispatcher = KeyedDispatcher(
+            duplicate_window=settings.DUPLICATE_WINDOW_SECONDS,
+            max_duplicate_keys=settings.DUPLICATE_MAX_KEYS
+        )
+    return _recipient_dispatcher
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _recipient_dispatcher is None:
+        return
+    _recipient_dispatcher.duplicate_window = new.DUPLICATE_WINDOW_SECONDS
+    _recipient_dispatcher.max_duplicate_keys = new.DUPLICATE_MAX_KEYS
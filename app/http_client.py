@@ -0,0 +1,183 @@
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from app.config import settings
+from app.logger import logger
+from app.metrics import POOL_CONNECTIONS, POOL_IN_FLIGHT, POOL_MAX_CONNECTIONS, POOL_TIMEOUTS, registry
+
+
+class GraphHTTPClient:
+    """
+    Long-lived, pooled HTTP client for the WhatsApp Graph API.
+
+    Wraps a single ``httpx.AsyncClient`` so that TCP/TLS connections to
+    graph.facebook.com are reused across sends, and keeps lightweight
+    counters that describe how saturated the connection pool is.
+    ``transport`` replaces the network transport (and with it the pool
+    limits); benchmarks use it to route sends to an in-process mock.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        write_timeout: float = 5.0,
+        pool_timeout: float = 5.0,
+        base_url: str = "",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections
+        self.http2 = http2 and self._http2_available()
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=limits,
+            timeout=timeout,
+            http2=self.http2,
+            transport=transport,
+        )
+
+        # Pool saturation counters
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.pool_timeouts = 0
+        self.total_request_seconds = 0.0
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+            return False
+        return True
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a POST request through the shared pool while tracking usage."""
+        return await self.request("POST", url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a GET request through the shared pool while tracking usage."""
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self.in_flight += 1
+        self.total_requests += 1
+        if self.in_flight > self.peak_in_flight:
+            self.peak_in_flight = self.in_flight
+        start = time.perf_counter()
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            self.total_request_seconds += time.perf_counter() - start
+            self.in_flight -= 1
+
+    def _pool_connections(self) -> Dict[str, int]:
+        # httpcore does not expose pool stats publicly, so inspect defensively.
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None) or []
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage and saturation metrics."""
+        connections = self._pool_connections()
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturation": round(self.in_flight / self.max_connections, 4) if self.max_connections else 0.0,
+            "total_requests": self.total_requests,
+            "pool_timeouts": self.pool_timeouts,
+            "avg_request_ms": round(
+                self.total_request_seconds / self.total_requests * 1000, 3
+            ) if self.total_requests else 0.0,
+            "connections": connections,
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_client: Optional[GraphHTTPClient] = None
+
+
+def create_http_client() -> GraphHTTPClient:
+    """Build a GraphHTTPClient from application settings."""
+    return GraphHTTPClient(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        http2=settings.HTTP2_ENABLED,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        write_timeout=settings.HTTP_WRITE_TIMEOUT,
+        pool_timeout=settings.HTTP_POOL_TIMEOUT,
+    )
+
+
+async def start_http_client() -> GraphHTTPClient:
+    """Create the shared client. Called from the application lifespan."""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+        logger.info(
+            "Graph API HTTP client started (max_connections=%s, http2=%s)", _client.max_connections, _client.http2
+        )
+    return _client
+
+
+def get_http_client() -> GraphHTTPClient:
+    """
+    Return the shared client.
+
+    Falls back to lazily creating it when used outside the application
+    lifespan (e.g. scripts or background jobs).
+    """
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Graph API HTTP client closed")
+
+
+def _collect_pool_metrics() -> None:
+    if _client is None:
+        return
+    POOL_IN_FLIGHT.set(_client.in_flight)
+    POOL_MAX_CONNECTIONS.set(_client.max_connections)
+    for state, count in _client._pool_connections().items():
+        POOL_CONNECTIONS.set(count, state)
+
+
+registry.add_collector(_collect_pool_metrics)
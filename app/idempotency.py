@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from app.config import Settings, settings, settings_store
+from app.logger import logger
+
+# (status_code, response body) as returned to the first caller
+StoredResponse = Tuple[int, Dict[str, Any]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+"""
+
+
+class SQLiteIdempotencyBackend:
+    """Durable store for idempotent responses so replays survive restarts."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, StoredResponse, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, status_code, body, expires_at FROM idempotency_keys "
+                "WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], (row[1], json.loads(row[2])), row[3]
+
+    def put(self, key: str, fingerprint: str, response: StoredResponse, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status_code, body, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, response[0], json.dumps(response[1]), expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                # Keep the table bounded by dropping expired keys now and then
+                self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (time.time(),))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL/LRU cache of responses keyed by ``Idempotency-Key``.
+
+    Concurrent requests with the same key share the first request's
+    in-flight send (single-flight) instead of calling the Graph API again.
+    Only successful responses are cached, so a failed send can be retried
+    with the same key.
+    """
+
+    def __init__(self, ttl_seconds: float, max_keys: int, backend: Optional[SQLiteIdempotencyBackend] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self.backend = backend
+        # key -> (fingerprint, response, expires_at)
+        self.entries: "OrderedDict[str, Tuple[str, StoredResponse, float]]" = OrderedDict()
+        self.inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evicted = 0
+        self.bytes = 0
+
+    @staticmethod
+    def _size(key: str, entry: Tuple[str, StoredResponse, float]) -> int:
+        # Approximate footprint: key, fingerprint and the serialized body
+        return sys.getsizeof(key) + sys.getsizeof(entry[0]) + len(json.dumps(entry[1][1]))
+
+    def _remember(self, key: str, entry: Tuple[str, StoredResponse, float]) -> None:
+        if key in self.entries:
+            self.bytes -= self._size(key, self.entries.pop(key))
+        self.entries[key] = entry
+        self.bytes += self._size(key, entry)
+        while len(self.entries) > self.max_keys:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.bytes -= self._size(old_key, old_entry)
+            self.evicted += 1
+
+    def _lookup(self, key: str, now: float) -> Optional[Tuple[str, StoredResponse, float]]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[2] > now:
+                self.entries.move_to_end(key)
+                return entry
+            self.bytes -= self._size(key, self.entries.pop(key))
+        return None
+
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    async def execute(
+        self,
+        key: str,
+        fingerprint: str,
+        send: Callable[[], Awaitable[StoredResponse]]
+    ) -> Tuple[StoredResponse, bool]:
+        """
+        Run ``send`` at most once per key.
+
+        Returns:
+            tuple: (stored_response, replayed)
+        """
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is not None:
+            self._check_fingerprint(entry[0], fingerprint)
+            self.hits += 1
+            return entry[1], True
+
+        inflight = self.inflight.get(key)
+        if inflight is not None:
+            self._check_fingerprint(inflight[0], fingerprint)
+            self.coalesced += 1
+            return await asyncio.shield(inflight[1]), True
+
+        # Register before any await so concurrent duplicates wait on this send
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = (fingerprint, future)
+        try:
+            entry = None
+            if self.backend is not None:
+                entry = await asyncio.to_thread(self.backend.get, key, now)
+            if entry is not None:
+                self._check_fingerprint(entry[0], fingerprint)
+                self.hits += 1
+                self._remember(key, entry)
+                response, replayed = entry[1], True
+            else:
+                self.misses += 1
+                response, replayed = await send(), False
+                expires_at = time.time() + self.ttl_seconds
+                self._remember(key, (fingerprint, response, expires_at))
+                if self.backend is not None:
+                    await asyncio.to_thread(self.backend.put, key, fingerprint, response, expires_at)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception with no waiters is not reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response, replayed
+        finally:
+            self.inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "keys": len(self.entries),
+            "max_keys": self.max_keys,
+            "in_flight": len(self.inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evicted": self.evicted,
+            "approx_bytes": self.bytes,
+            "durable": self.backend is not None,
+        }
+
+
+def scoped_key(client_id: str, path: str, idempotency_key: str) -> str:
+    """Namespace a client-supplied key by caller and endpoint."""
+    caller = hashlib.blake2b(client_id.encode(), digest_size=8).hexdigest()
+    return f"{caller}:{path}:{idempotency_key}"
+
+
+def fingerprint(message: Any) -> str:
+    """Hash of the validated request, used to detect key reuse with another payload."""
+    return hashlib.blake2b(message.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+def _create_cache() -> IdempotencyCache:
+    backend = None
+    if settings.IDEMPOTENCY_SQLITE_PATH:
+        try:
+            backend = SQLiteIdempotencyBackend(settings.IDEMPOTENCY_SQLITE_PATH)
+        except sqlite3.Error as e:
+            logger.warning("Could not open idempotency store (%s); using in-memory cache only", e)
+    return IdempotencyCache(
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+        backend=backend
+    )
+
+
+_cache: Optional[IdempotencyCache] = None
+
+
+def get_idempotency_cache() -> IdempotencyCache:
+    """
+    Return the shared cache.
+
+    Opened on first use, so importing this module does not touch
+    IDEMPOTENCY_SQLITE_PATH.
+    """
+    global _cache
+    if _cache is None:
+        _cache = _create_cache()
+    return _cache
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _cache is None:
+        return
+    _cache.ttl_seconds = new.IDEMPOTENCY_TTL_SECONDS
+    _cache.max_keys = new.IDEMPOTENCY_MAX_KEYS
@@ -1,37 +1,142 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from typing import Any
+from typing import Any, Optional
+
+# Fraction of sampled info logs kept; set from LOG_SAMPLE_RATE by configure_logging
+LOG_SAMPLE_RATE = 1.0
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue the record as-is.
+
+    The stock QueueHandler formats the message in the calling thread so the
+    record can be pickled; records here never leave the process, so message
+    interpolation and JSON encoding are left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    return JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+_stream = logging.StreamHandler(sys.stdout)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _start_listener() -> None:
+    global _listener
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    # Writing to stdout happens on the listener's thread, never on the event loop
+    _listener = logging.handlers.QueueListener(log_queue, _stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    logging.getLogger().addHandler(DeferredQueueHandler(log_queue))
+
+
+def configure_logging(level: str, log_format: str, sample_rate: float) -> None:
+    """
+    Apply validated logging settings.
+
+    app.config calls this when the settings first load and after every
+    reload. The first call attaches the queue handler to the root logger and
+    starts the listener thread; importing this module has no side effects.
+    """
+    global LOG_SAMPLE_RATE
+    if _listener is None:
+        _start_listener()
+    logging.getLogger().setLevel(level)
+    _stream.setFormatter(_formatter(log_format))
+    LOG_SAMPLE_RATE = sample_rate
 
-# Configure logging format
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 
 class Logger:
-    """Custom logger class for the application."""
-    
-    def __init__(self, name: str):
+    """
+    Custom logger class for the application.
+
+    Pass arguments %-style (``logger.info("Sent to %s", number)``) so nothing
+    is formatted for disabled levels, and interpolation happens on the
+    logging thread. Arguments are formatted after the call returns, so pass
+    values that will not be mutated afterwards.
+    """
+
+    def __init__(self, name: str, sample_rate: Optional[float] = None):
         self.logger = logging.getLogger(name)
-    
-    def info(self, message: Any, *args: Any, **kwargs: Any) -> None:
-        """Log info level message."""
-        self.logger.info(message, *args, **kwargs)
-    
+        # None follows LOG_SAMPLE_RATE, including changes from configure_logging
+        self.sample_rate = sample_rate
+
+    def _log(self, level: int, message: Any, args: Any, kwargs: Any, sampled: bool = False) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if sampled:
+            sample_rate = LOG_SAMPLE_RATE if self.sample_rate is None else self.sample_rate
+            if sample_rate < 1.0 and random.random() >= sample_rate:
+                return
+        exc_info = kwargs.get("exc_info")
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        # Built directly instead of through Logger.log: neither format shows the
+        # caller, so the stack walk that finds it would be wasted on every record
+        record = self.logger.makeRecord(
+            self.logger.name, level, "(unknown file)", 0, message, args, exc_info or None,
+            extra=kwargs.get("extra")
+        )
+        self.logger.handle(record)
+
+    def info(self, message: Any, *args: Any, sampled: bool = False, **kwargs: Any) -> None:
+        """
+        Log info level message.
+
+        With ``sampled=True`` only ``LOG_SAMPLE_RATE`` of calls are kept; use it
+        for per-request lines that would otherwise dominate the output.
+        """
+        self._log(logging.INFO, message, args, kwargs, sampled)
+
     def error(self, message: Any, *args: Any, **kwargs: Any) -> None:
         """Log error level message."""
-        self.logger.error(message, *args, **kwargs)
-    
+        self._log(logging.ERROR, message, args, kwargs)
+
     def warning(self, message: Any, *args: Any, **kwargs: Any) -> None:
         """Log warning level message."""
-        self.logger.warning(message, *args, **kwargs)
-    
+        self._log(logging.WARNING, message, args, kwargs)
+
     def debug(self, message: Any, *args: Any, **kwargs: Any) -> None:
         """Log debug level message."""
-        self.logger.debug(message, *args, **kwargs)
+        self._log(logging.DEBUG, message, args, kwargs)
 
 # Create default logger instance
 logger = Logger("whatsapp_service")
@@ -1,18 +1,69 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import messages
-from app.config import settings
+from app.routes import messages, health, webhooks, metrics, suppressions, media
+from app.config import settings, settings_store
+from app.http_client import start_http_client, close_http_client
+from app.send_queue import start_send_queue, stop_send_queue
+from app.scheduler import start_scheduler, stop_scheduler
+from app.webhooks import start_webhook_processor, stop_webhook_processor
+from app.status_store import start_send_recorder, stop_send_recorder, close_status_store
+from app.suppression import open_suppression_list, close_suppression_list
+from app.template_catalog import start_template_catalog, stop_template_catalog
+from app.middleware.rate_limit import KEY_FUNCTIONS, close_rate_limit_backend, get_rate_limit_backend
+from app.auth import get_authenticator, rate_limit_for_scope
+from app.senders import get_sender_pool
+from app.idempotency import get_idempotency_cache
+from app.middleware.metrics import MetricsMiddleware
 from app.middleware.security import (
     RateLimitMiddleware,
     SecurityHeadersMiddleware,
     HTTPSRedirectMiddleware
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rate-limit counters, shared across workers/nodes when a shared backend is configured
+    app.state.rate_limit_backend = get_rate_limit_backend()
+    # Reload settings on SIGHUP or when .env changes, without dropping in-flight sends
+    settings_store.start()
+    # Built lazily; loaded here so bad key or sender files and the idempotency
+    # store are reported at startup rather than on the first request
+    get_authenticator()
+    get_sender_pool()
+    get_idempotency_cache()
+    # Shared Graph API client, reused by every route for the app's lifetime
+    app.state.http_client = await start_http_client()
+    # Template definitions for local checks; may fetch through the shared client
+    await start_template_catalog()
+    # Mapped before the send queue starts so queued sends are checked too
+    open_suppression_list()
+    if settings.SEND_QUEUE_ENABLED:
+        await start_send_queue()
+    if settings.SCHEDULER_ENABLED:
+        await start_scheduler()
+    # Webhook events are acknowledged immediately and stored in batches
+    start_webhook_processor()
+    start_send_recorder()
+    yield
+    # Released scheduled and queued sends finish while the send log is still recording
+    await stop_scheduler()
+    await stop_send_queue()
+    await stop_webhook_processor()
+    await stop_send_recorder()
+    close_status_store()
+    await close_suppression_list()
+    await stop_template_catalog()
+    await close_http_client()
+    await close_rate_limit_backend()
+    await settings_store.stop()
+
 # Initialize FastAPI application
 app = FastAPI(
     title="WhatsApp Microservice",
     description="A microservice for handling WhatsApp messaging operations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add security middleware
@@ -25,7 +76,12 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(
     RateLimitMiddleware,
     max_requests=settings.RATE_LIMIT_MAX_REQUESTS,
-    window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS
+    window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    key_func=KEY_FUNCTIONS[settings.RATE_LIMIT_KEY],
+    backend_factory=get_rate_limit_backend,
+    # Per-key tiers only make sense when counting per API key
+    limit_func=rate_limit_for_scope if settings.RATE_LIMIT_KEY == "api_key" else None
 )
 
 # Configure CORS
@@ -37,8 +93,18 @@ app.add_middleware(
     allow_headers=settings.CORS_ALLOW_HEADERS,
 )
 
+# Request metrics; added last so it wraps every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(messages.router, prefix="/api/v1", tags=["messages"])
+app.include_router(health.router, prefix="/api/v1", tags=["health"])
+app.include_router(webhooks.router, prefix="/api/v1", tags=["webhooks"])
+app.include_router(suppressions.router, prefix="/api/v1", tags=["suppressions"])
+app.include_router(media.router, prefix="/api/v1", tags=["media"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 # Root endpoint
 @app.get("/")
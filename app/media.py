@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import ipaddress
+import socket
+import tempfile
+import time
+from collections import OrderedDict
+from typing import IO, Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from app.config import Settings, settings, settings_store
+from app.http_client import GraphHTTPClient, get_http_client
+from app.logger import logger
+from app.senders import get_sender_pool
+
+# Bytes read per chunk while downloading or hashing a document
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+class MediaFetchRefused(ValueError):
+    pass
+
+
+def parse_allowed_hosts(spec: str) -> Tuple[str, ...]:
+    """``"cdn.example.com,.example.org"`` -> host patterns; a leading dot also matches subdomains."""
+    return tuple(filter(None, (host.strip().lower() for host in spec.split(","))))
+
+
+async def check_fetch_url(url: str, allowed_hosts: Tuple[str, ...] = (), allow_private: bool = False) -> None:
+    """
+    Refuse to download a caller-supplied URL that points inside the network.
+
+    The scheme must be http(s), the host must match ``allowed_hosts`` when
+    any are configured, and every address it resolves to must be public
+    (no loopback, private, link-local or reserved ranges) unless
+    ``allow_private`` is set.
+
+    Raises:
+        MediaFetchRefused: If the URL may not be fetched
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").rstrip(".")
+    if parts.scheme not in ("http", "https") or not host:
+        raise MediaFetchRefused(f"Only http(s) URLs with a host are fetched: {url}")
+    if allowed_hosts and not any(
+        host == pattern or (pattern.startswith(".") and host.endswith(pattern)) for pattern in allowed_hosts
+    ):
+        raise MediaFetchRefused(f"Host {host} is not in MEDIA_FETCH_ALLOWED_HOSTS")
+    if allow_private:
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, ValueError) as e:
+        raise MediaFetchRefused(f"Could not resolve {host}: {e}")
+    for *_, sockaddr in addresses:
+        _check_address(host, sockaddr[0])
+
+
+def _check_address(host: str, ip: str) -> None:
+    address = ipaddress.ip_address(ip.split("%", 1)[0])
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    if not address.is_global or address.is_multicast:
+        raise MediaFetchRefused(f"Host {host} resolves to non-public address {address}")
+
+
+def check_peer(response: httpx.Response, allow_private: bool = False) -> None:
+    """
+    Refuse a response whose connection ended up at a non-public address.
+
+    The name is resolved again when connecting, so a host that answered
+    ``check_fetch_url`` with a public address can rebind to an internal one
+    before the download starts. Call this before reading the body. Transports
+    without a network stream (in-process mocks) are not checked.
+
+    Raises:
+        MediaFetchRefused: If the peer address is not public
+    """
+    if allow_private:
+        return
+    stream = response.extensions.get("network_stream")
+    peer = stream.get_extra_info("server_addr") if stream is not None else None
+    if peer is not None:
+        _check_address(response.url.host, peer[0])
+
+
+async def spool(chunks: AsyncIterator[bytes], max_bytes: int, spool_bytes: int) -> Tuple[IO[bytes], str, int]:
+    """
+    Copy a byte stream into a temporary file while hashing it.
+
+    Small documents stay in memory; anything over ``spool_bytes`` goes to
+    disk, so no document is ever held in memory whole.
+
+    Returns:
+        tuple: (file rewound to the start, sha256 hex digest, size)
+
+    Raises:
+        MediaTooLarge: If the stream exceeds ``max_bytes``
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise MediaTooLarge(f"Document exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            file.write(chunk)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file, digest.hexdigest(), size
+
+
+class MediaCache:
+    """
+    Uploads documents to the Graph API ``/media`` endpoint once and remembers
+    the returned media ids.
+
+    Ids are cached by source URL and by content hash (so two URLs serving
+    the same file share one upload) in a TTL/LRU cache. Meta keeps uploaded
+    media for 30 days, so the TTL should stay below that. Concurrent
+    requests for the same URL share one upload (single-flight).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 7 * 86400,
+        max_bytes: int = 100 * 1024 * 1024,
+        spool_bytes: int = 1024 * 1024,
+        allowed_hosts: Tuple[str, ...] = (),
+        allow_private: bool = False
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        # Hosts documents may be downloaded from; empty allows any public host
+        self.allowed_hosts = allowed_hosts
+        self.allow_private = allow_private
+        # "url:<url>" or "sha256:<digest>" -> (media_id, expires_at)
+        self.entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.failures = 0
+        self.refused = 0
+        self.evicted = 0
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def _remember(self, key: str, media_id: str, expires_at: float) -> None:
+        self.entries[key] = (media_id, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    async def upload(
+        self,
+        file: IO[bytes],
+        content_type: str,
+        filename: str,
+        client: Optional[GraphHTTPClient] = None
+    ) -> str:
+        """
+        Stream ``file`` to the Graph API as multipart form data.
+
+        httpx reads file objects in chunks, so the upload never holds the
+        whole document in memory.
+
+        Raises:
+            httpx.HTTPError: If the upload fails
+        """
+        client = client or get_http_client()
+        # Uploaded through the first sender; pooled numbers share its business account
+        sender = get_sender_pool().primary
+        response = await client.post(
+            f"{settings.GRAPH_API_BASE_URL}/{sender.phone_number_id}/media",
+            data={"messaging_product": "whatsapp", "type": content_type},
+            files={"file": (filename, file, content_type)},
+            headers={"Authorization": f"Bearer {sender.token}"}
+        )
+        response.raise_for_status()
+        self.uploads += 1
+        return response.json()["id"]
+
+    async def media_id_for_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        filename: str,
+        client: Optional[GraphHTTPClient] = None
+    ) -> Tuple[str, str]:
+        """
+        Media id for a document given as a byte stream, uploading it unless
+        identical content was uploaded before.
+
+        Returns:
+            tuple: (media_id, sha256 hex digest)
+        """
+        file, digest, size = await spool(chunks, self.max_bytes, self.spool_bytes)
+        with file:
+            key = f"sha256:{digest}"
+            media_id = self._lookup(key)
+            if media_id is not None:
+                self.hits += 1
+                return media_id, digest
+            media_id = await self.upload(file, content_type, filename, client)
+        self.uploaded_bytes += size
+        self._remember(key, media_id, time.time() + self.ttl_seconds)
+        return media_id, digest
+
+    async def _fetch_and_upload(self, url: str, content_type: str, client: GraphHTTPClient) -> str:
+        try:
+            await check_fetch_url(url, self.allowed_hosts, self.allow_private)
+        except MediaFetchRefused:
+            self.refused += 1
+            raise
+        async with client.client.stream("GET", url) as response:
+            try:
+                check_peer(response, self.allow_private)
+            except MediaFetchRefused:
+                self.refused += 1
+                raise
+            response.raise_for_status()
+            filename = url.rsplit("/", 1)[-1].split("?", 1)[0] or "document"
+            media_id, _ = await self.media_id_for_stream(
+                response.aiter_bytes(CHUNK_SIZE),
+                response.headers.get("content-type", content_type).split(";", 1)[0],
+                filename,
+                client
+            )
+        return media_id
+
+    async def media_id_for_url(
+        self,
+        url: str,
+        content_type: str = "application/pdf",
+        client: Optional[GraphHTTPClient] = None
+    ) -> Optional[str]:
+        """
+        Media id for the document at ``url``, downloading and uploading it on
+        the first request only.
+
+        Returns None if the document could not be fetched or uploaded; the
+        caller then falls back to sending the link.
+        """
+        key = f"url:{url}"
+        media_id = self._lookup(key)
+        if media_id is not None:
+            self.hits += 1
+            return media_id
+
+        inflight = self.inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        media_id = None
+        try:
+            media_id = await self._fetch_and_upload(url, content_type, client or get_http_client())
+            self._remember(key, media_id, time.time() + self.ttl_seconds)
+        except (httpx.HTTPError, MediaTooLarge, KeyError, ValueError) as e:
+            self.failures += 1
+            logger.warning("Could not upload %s to the Graph API, sending the link instead: %s", url, e)
+            media_id = None
+        finally:
+            del self.inflight[key]
+            # Resolved even if this task is cancelled, so waiters fall back to the link
+            future.set_result(media_id)
+        return media_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "uploads": self.uploads,
+            "uploaded_bytes": self.uploaded_bytes,
+            "failures": self.failures,
+            "refused": self.refused,
+            "evicted": self.evicted,
+        }
+
+
+_media_cache: Optional[MediaCache] = None
+
+
+def get_media_cache() -> MediaCache:
+    """The shared media id cache, built from settings on first use."""
+    global _media_cache
+    if _media_cache is None:
+        _media_cache = MediaCache(
+            max_entries=settings.MEDIA_CACHE_SIZE,
+            ttl_seconds=settings.MEDIA_CACHE_TTL,
+            max_bytes=settings.MEDIA_MAX_BYTES,
+            spool_bytes=settings.MEDIA_SPOOL_BYTES,
+            allowed_hosts=parse_allowed_hosts(settings.MEDIA_FETCH_ALLOWED_HOSTS),
+            allow_private=settings.MEDIA_FETCH_ALLOW_PRIVATE
+        )
+    return _media_cache
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _media_cache is None:
+        return
+    _media_cache.max_entries = new.MEDIA_CACHE_SIZE
+    _media_cache.ttl_seconds = new.MEDIA_CACHE_TTL
+    _media_cache.max_bytes = new.MEDIA_MAX_BYTES
+    _media_cache.spool_bytes = new.MEDIA_SPOOL_BYTES
+    _media_cache.allowed_hosts = parse_allowed_hosts(new.MEDIA_FETCH_ALLOWED_HOSTS)
+    _media_cache.allow_private = new.MEDIA_FETCH_ALLOW_PRIVATE
@@ -0,0 +1,218 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Prometheus instruments kept deliberately small: each observation is a dict
+# lookup, a bisect and two list increments. Observations are made on the
+# event loop thread, so the counters need no lock. Every worker process
+# exposes its own values; Prometheus aggregates them across scrape targets.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram.
+
+    Each label set owns one list holding a non-cumulative count per bucket,
+    the +Inf count and the running sum; cumulative counts are only computed
+    when the endpoint is scraped.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        bounds = [f'le="{_format_value(bound)}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, bound)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(float(series[-1]))}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges just before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "whatsapp_http_request_duration_seconds",
+    "Time to handle an API request, by route template, method and response status.",
+    ("route", "method", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "whatsapp_http_requests_in_flight",
+    "API requests currently being handled."
+))
+STAGE_LATENCY = registry.register(Histogram(
+    "whatsapp_request_stage_duration_seconds",
+    "Time spent in individual request stages (auth, validation, rate_limit, media).",
+    ("stage",)
+))
+UPSTREAM_LATENCY = registry.register(Histogram(
+    "whatsapp_graph_request_duration_seconds",
+    "Graph API call latency per attempt, by template and upstream status (or error).",
+    ("template", "status")
+))
+RATE_LIMIT_REJECTIONS = registry.register(Counter(
+    "whatsapp_rate_limit_rejections_total",
+    "Requests rejected by the inbound rate limiter."
+))
+SUPPRESSED_SENDS = registry.register(Counter(
+    "whatsapp_suppressed_sends_total",
+    "Sends blocked because the recipient is on the suppression list, by template.",
+    ("template",)
+))
+SENDER_SENDS = registry.register(Counter(
+    "whatsapp_sender_sends_total",
+    "Graph API send attempts per sending phone-number ID, by outcome (sent, failed, throttled).",
+    ("phone_number_id", "outcome")
+))
+RECIPIENT_QUEUE_DEPTH = registry.register(Histogram(
+    "whatsapp_recipient_queue_depth",
+    "Sends queued for the same recipient when a send is submitted, including itself.",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+))
+POOL_TIMEOUTS = registry.register(Counter(
+    "whatsapp_graph_pool_timeouts_total",
+    "Graph API requests that timed out waiting for a pooled connection."
+))
+POOL_IN_FLIGHT = registry.register(Gauge(
+    "whatsapp_graph_pool_in_flight",
+    "Graph API requests currently using the connection pool."
+))
+POOL_MAX_CONNECTIONS = registry.register(Gauge(
+    "whatsapp_graph_pool_max_connections",
+    "Configured maximum connections in the Graph API pool."
+))
+POOL_CONNECTIONS = registry.register(Gauge(
+    "whatsapp_graph_pool_connections",
+    "Open Graph API connections by state.",
+    ("state",)
+))
@@ -0,0 +1,45 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+class MetricsMiddleware:
+    """
+    Records request latency per route template and the number of requests
+    in flight.
+
+    Added outermost so the measurement includes the other middleware
+    (rate limiting, security headers). The route label is the matched path
+    template, e.g. ``/api/v1/messages/{job_id}``, so IDs in URLs don't
+    create new series; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope on the way in
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                getattr(route, "path", "unmatched"),
+                scope["method"],
+                str(status_code)
+            )
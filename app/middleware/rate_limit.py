@@ -0,0 +1,461 @@
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Tuple
+
+from app.config import Settings, settings, settings_store
+from app.logger import logger
+
+Scope = MutableMapping
+KeyFunc = Callable[[Scope], str]
+# Per-request limit override (e.g. an API key's tier); None means the default
+LimitFunc = Callable[[Scope], Optional[int]]
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip_key(scope: Scope) -> str:
+    """Rate-limit by the connecting client's IP address."""
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def forwarded_for_key(scope: Scope) -> str:
+    """
+    Rate-limit by the first address in X-Forwarded-For.
+
+    Only use this behind a proxy that overwrites the header, otherwise
+    clients can pick their own key.
+    """
+    forwarded = _header(scope, b"x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",", 1)[0].strip()
+    return client_ip_key(scope)
+
+
+_api_key_header = settings.API_KEY_NAME.lower().encode("latin-1")
+
+
+def api_key_key(scope: Scope) -> str:
+    """Rate-limit by API key (hashed), falling back to client IP."""
+    api_key = _header(scope, _api_key_header)
+    if api_key:
+        return "key:" + hashlib.blake2b(api_key.strip().encode(), digest_size=8).hexdigest()
+    return client_ip_key(scope)
+
+
+KEY_FUNCTIONS: Dict[str, KeyFunc] = {
+    "ip": client_ip_key,
+    "forwarded": forwarded_for_key,
+    "api_key": api_key_key,
+}
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window-counter rate limiter with O(1) work per request.
+
+    Each key keeps the request count of the current and previous fixed
+    windows; the sliding count is estimated by weighting the previous window
+    by how much of it still overlaps the sliding window. Keys live in an LRU
+    map bounded by ``max_keys``, and keys idle for two windows are dropped.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: float, max_keys: int = 100_000):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        # key -> [window_start, current_count, previous_count, last_seen]
+        self.entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.evicted = 0
+
+    def _evict(self, now: float) -> None:
+        entries = self.entries
+        while entries:
+            oldest = next(iter(entries.values()))
+            if len(entries) <= self.max_keys and now - oldest[3] < 2 * self.window_seconds:
+                break
+            entries.popitem(last=False)
+            self.evicted += 1
+
+    def hit(self, key: str, now: Optional[float] = None, limit: Optional[int] = None) -> Tuple[bool, float]:
+        """
+        Count a request for ``key``.
+
+        Args:
+            limit: Requests per window for this key; defaults to ``max_requests``
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.monotonic() if now is None else now
+        max_requests = self.max_requests if limit is None else limit
+        window = self.window_seconds
+        if max_requests <= 0:
+            return False, window
+        window_start = now - (now % window)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = [window_start, 0, 0, now]
+            self.entries[key] = entry
+            self._evict(now)
+        else:
+            self.entries.move_to_end(key)
+            if entry[0] != window_start:
+                # Roll windows; anything older than the previous window counts as zero
+                entry[2] = entry[1] if window_start - entry[0] == window else 0
+                entry[1] = 0
+                entry[0] = window_start
+            entry[3] = now
+
+        overlap = 1 - (now - window_start) / window
+        estimated = entry[2] * overlap + entry[1]
+        if estimated >= max_requests:
+            # Approximate time until the estimate falls back under the limit
+            remaining = window_start + window - now
+            if entry[1] >= max_requests:
+                retry_after = remaining + window * (1 - max_requests / entry[1])
+            elif entry[2] == 0:
+                retry_after = remaining
+            else:
+                retry_after = min((estimated - max_requests) / entry[2] * window, remaining)
+            return False, max(retry_after, 0.0)
+
+        entry[1] += 1
+        return True, 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {"tracked_keys": len(self.entries), "max_keys": self.max_keys, "evicted": self.evicted}
+
+
+class RateLimitBackend:
+    """Storage backend for rate-limit counters."""
+
+    name = "base"
+
+    async def hit(self, key: str, limit: Optional[int] = None) -> Tuple[bool, float]:
+        """
+        Count a request for ``key``, allowing ``limit`` requests per window
+        (the backend's ``max_requests`` when None).
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        raise NotImplementedError
+
+    def set_limit(self, max_requests: int) -> None:
+        """Change the default requests per window; counts so far are kept."""
+        self.max_requests = max_requests
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process counters. Limits are per worker, not per deployment."""
+
+    name = "memory"
+
+    def __init__(self, max_requests: int, window_seconds: float, max_keys: int = 100_000):
+        self.limiter = SlidingWindowRateLimiter(max_requests, window_seconds, max_keys=max_keys)
+
+    async def hit(self, key: str, limit: Optional[int] = None) -> Tuple[bool, float]:
+        return self.limiter.hit(key, limit=limit)
+
+    def set_limit(self, max_requests: int) -> None:
+        self.limiter.max_requests = max_requests
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.limiter.stats()}
+
+
+def _sliding_estimate(
+    max_requests: int, window: float, now: float, window_index: int, current: int, previous: int
+) -> Tuple[bool, float]:
+    """Shared sliding-window decision for backends that store raw window counts."""
+    if max_requests <= 0:
+        return False, window
+    elapsed = now - window_index * window
+    estimated = previous * (1 - elapsed / window) + current
+    if estimated < max_requests:
+        return True, 0.0
+    remaining = window - elapsed
+    if current >= max_requests:
+        return False, max(0.0, remaining + window * (1 - max_requests / current))
+    if previous == 0:
+        return False, max(0.0, remaining)
+    return False, max(0.0, min((estimated - max_requests) / previous * window, remaining))
+
+
+class SharedMemoryBackend(RateLimitBackend):
+    """
+    Counters in a memory-mapped file shared by all workers on one host.
+
+    The file holds a fixed-size open-addressing hash table of
+    ``(key_hash, window_index, current, previous)`` slots. Each check takes an
+    exclusive ``flock`` on the file, so updates are atomic across processes.
+    When a key's probe sequence is full, the slot with the oldest window is
+    reused.
+    """
+
+    name = "shared_memory"
+
+    MAGIC = b"WARL0001"
+    HEADER = struct.Struct("<8sQ")
+    SLOT = struct.Struct("<QqII")
+    MAX_PROBES = 8
+
+    def __init__(self, path: str, max_requests: int, window_seconds: float, slots: int = 65536):
+        self.path = path
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.slots = slots
+        size = self.HEADER.size + slots * self.SLOT.size
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self.fd, self.HEADER.size, 0)
+            magic, existing = self.HEADER.unpack(header) if len(header) == self.HEADER.size else (None, 0)
+            if magic == self.MAGIC and existing != slots:
+                # Other workers may have this table mapped; truncating it
+                # under them would crash them with SIGBUS
+                raise OSError(
+                    f"{path} holds a {existing}-slot table, not {slots}; "
+                    "remove it once no worker is using it"
+                )
+            if magic != self.MAGIC:
+                # New or unrecognised file: initialise it
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, slots), 0)
+        except BaseException:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            raise
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+        self.evicted = 0
+
+    def _slot_offset(self, index: int) -> int:
+        return self.HEADER.size + (index % self.slots) * self.SLOT.size
+
+    def hit_sync(self, key: str, now: Optional[float] = None, limit: Optional[int] = None) -> Tuple[bool, float]:
+        now = time.time() if now is None else now
+        window_index = int(now // self.window_seconds)
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") | 1
+        start = key_hash % self.slots
+
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            offset = free = oldest = None
+            oldest_window = 0
+            for probe in range(self.MAX_PROBES):
+                candidate = self._slot_offset(start + probe)
+                slot_hash, slot_window, current, previous = self.SLOT.unpack_from(self.map, candidate)
+                if slot_hash == key_hash:
+                    offset = candidate
+                    break
+                if slot_hash == 0 or slot_window < window_index - 1:
+                    # Empty or expired: reusable without losing live state
+                    if free is None:
+                        free = candidate
+                elif oldest is None or slot_window < oldest_window:
+                    oldest, oldest_window = candidate, slot_window
+
+            if offset is None:
+                if free is None:
+                    self.evicted += 1
+                offset = free if free is not None else oldest
+                slot_window, current, previous = window_index, 0, 0
+
+            if slot_window != window_index:
+                previous = current if slot_window == window_index - 1 else 0
+                current = 0
+
+            allowed, retry_after = _sliding_estimate(
+                self.max_requests if limit is None else limit,
+                self.window_seconds, now, window_index, current, previous
+            )
+            if allowed:
+                current += 1
+            self.SLOT.pack_into(self.map, offset, key_hash, window_index, current, previous)
+            return allowed, retry_after
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    async def hit(self, key: str, limit: Optional[int] = None) -> Tuple[bool, float]:
+        return self.hit_sync(key, limit=limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": self.path, "slots": self.slots, "evicted": self.evicted}
+
+    async def close(self) -> None:
+        self.map.close()
+        os.close(self.fd)
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Counters in Redis (or any server speaking the Redis protocol), shared by
+    every worker and node.
+
+    Each check is one MULTI/EXEC pipeline (INCR + PEXPIRE on the current
+    window, GET on the previous window), so it is atomic and costs a single
+    round trip. Rejected requests are un-counted with a follow-up DECR.
+    While Redis is unreachable, checks fall back to local in-memory counting
+    and Redis is retried after ``retry_seconds``.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: float,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "ratelimit:",
+        timeout: float = 0.05,
+        retry_seconds: float = 5.0,
+        max_keys: int = 100_000,
+        client: Any = None
+    ):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.fallback = MemoryBackend(max_requests, window_seconds, max_keys=max_keys)
+        self.down_until = 0.0
+        self.fallback_checks = 0
+
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("RATE_LIMIT_BACKEND=redis but the 'redis' package is not installed; "
+                               "using local in-memory rate limiting")
+                self.down_until = float("inf")
+            else:
+                client = redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.client = client
+
+    async def _hit_redis(self, key: str, now: float, limit: Optional[int] = None) -> Tuple[bool, float]:
+        window_index = int(now // self.window_seconds)
+        current_key = f"{self.prefix}{key}:{window_index}"
+        previous_key = f"{self.prefix}{key}:{window_index - 1}"
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(current_key)
+        pipe.pexpire(current_key, int(self.window_seconds * 2000))
+        pipe.get(previous_key)
+        current, _, previous = await asyncio.wait_for(pipe.execute(), timeout=self.timeout)
+
+        allowed, retry_after = _sliding_estimate(
+            self.max_requests if limit is None else limit,
+            self.window_seconds, now, window_index, int(current) - 1, int(previous or 0)
+        )
+        if not allowed:
+            await asyncio.wait_for(self.client.decr(current_key), timeout=self.timeout)
+        return allowed, retry_after
+
+    async def hit(self, key: str, limit: Optional[int] = None) -> Tuple[bool, float]:
+        if time.monotonic() >= self.down_until:
+            try:
+                return await self._hit_redis(key, time.time(), limit)
+            except Exception as e:
+                logger.warning("Redis rate-limit store unavailable (%r); "
+                               "falling back to local counting for %.0fs", e, self.retry_seconds)
+                self.down_until = time.monotonic() + self.retry_seconds
+        self.fallback_checks += 1
+        return await self.fallback.hit(key, limit)
+
+    def set_limit(self, max_requests: int) -> None:
+        self.max_requests = max_requests
+        self.fallback.set_limit(max_requests)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "available": time.monotonic() >= self.down_until,
+            "fallback_checks": self.fallback_checks,
+            "fallback": self.fallback.stats(),
+        }
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+
+
+def create_backend(max_requests: int, window_seconds: float) -> RateLimitBackend:
+    """
+    Build the rate-limit backend selected by RATE_LIMIT_BACKEND.
+
+    Falls back to in-memory counting if the shared store cannot be set up.
+    """
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "redis":
+        return RedisBackend(
+            max_requests,
+            window_seconds,
+            url=settings.RATE_LIMIT_REDIS_URL,
+            prefix=settings.RATE_LIMIT_REDIS_PREFIX,
+            timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+            max_keys=settings.RATE_LIMIT_MAX_KEYS
+        )
+    if backend == "shared_memory":
+        try:
+            return SharedMemoryBackend(
+                settings.RATE_LIMIT_SHM_PATH,
+                max_requests,
+                window_seconds,
+                slots=settings.RATE_LIMIT_SHM_SLOTS
+            )
+        except OSError as e:
+            logger.warning("Could not open shared rate-limit table (%s); using in-memory rate limiting", e)
+    elif backend != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND '%s'; using in-memory rate limiting", backend)
+    return MemoryBackend(max_requests, window_seconds, max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """
+    Return the shared backend, creating it with create_backend on first use.
+
+    RateLimitMiddleware asks for it when the middleware stack is built, so
+    importing the app opens no table or Redis client.
+    """
+    global _backend
+    if _backend is None:
+        _backend = create_backend(settings.RATE_LIMIT_MAX_REQUESTS, settings.RATE_LIMIT_WINDOW_SECONDS)
+    return _backend
+
+
+async def close_rate_limit_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _backend is not None:
+        _backend.set_limit(new.RATE_LIMIT_MAX_REQUESTS)
@@ -1,78 +1,125 @@
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
 from fastapi.responses import JSONResponse
-from typing import Callable, Dict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Callable, Optional
+import math
 import time
 from app.config import settings
 from app.logger import logger
+from app.metrics import RATE_LIMIT_REJECTIONS, STAGE_LATENCY
+from app.middleware.rate_limit import KEY_FUNCTIONS, KeyFunc, LimitFunc, MemoryBackend, RateLimitBackend
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
+# These middlewares are plain ASGI callables rather than BaseHTTPMiddleware
+# subclasses, so they add no extra task or body-stream wrapping per request
+# and streaming responses pass straight through.
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_requests: int = 100,
+        window_seconds: int = 60,
+        max_keys: int = 100_000,
+        key_func: Optional[KeyFunc] = None,
+        backend: Optional[RateLimitBackend] = None,
+        limit_func: Optional[LimitFunc] = None,
+        backend_factory: Optional[Callable[[], RateLimitBackend]] = None
+    ):
+        self.app = app
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, list] = {}  # Store request timestamps per IP
-        
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Initialize or clean old requests
-        now = time.time()
-        if client_ip not in self.requests:
-            self.requests[client_ip] = []
-        
-        # Remove old requests outside the window
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < self.window_seconds
-        ]
-        
+        self.key_func = key_func or KEY_FUNCTIONS["ip"]
+        self.limit_func = limit_func
+        # O(1) sliding-window counters; in-process unless a shared backend is given.
+        # A factory defers creating it until Starlette builds the middleware stack
+        if backend is None and backend_factory is not None:
+            backend = backend_factory()
+        self.backend = backend or MemoryBackend(max_requests, window_seconds, max_keys=max_keys)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_key = self.key_func(scope)
+        limit = self.limit_func(scope) if self.limit_func else None
+
         # Check rate limit
-        if len(self.requests[client_ip]) >= self.max_requests:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
+        started = time.perf_counter()
+        allowed, retry_after = await self.backend.hit(client_key, limit)
+        STAGE_LATENCY.observe(time.perf_counter() - started, "rate_limit")
+        if not allowed:
+            RATE_LIMIT_REJECTIONS.inc()
+            logger.warning("Rate limit exceeded for client: %s", client_key)
+            retry_after = max(1, math.ceil(retry_after))
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": "Too many requests. Please try again later.",
-                    "retry_after": self.window_seconds
-                }
+                    "retry_after": retry_after
+                },
+                headers={"Retry-After": str(retry_after)}
             )
-        
-        # Add current request
-        self.requests[client_ip].append(now)
-        
+            await response(scope, receive, send)
+            return
+
         # Process the request
-        return await call_next(request)
+        await self.app(scope, receive, send)
+
+class HTTPSRedirectMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip HTTPS check in debug mode
-        if settings.DEBUG:
-            return await call_next(request)
-            
+        if scope["type"] != "http" or settings.DEBUG:
+            await self.app(scope, receive, send)
+            return
+
         # Check if the request is secure
-        if not request.url.scheme == "https":
-            logger.warning(f"Insecure request received from: {request.client.host}")
-            return JSONResponse(
+        if scope.get("scheme", "http") != "https":
+            client = scope.get("client")
+            logger.warning("Insecure request received from: %s", client[0] if client else 'unknown')
+            response = JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 content={
                     "detail": "HTTPS is required for all API calls"
                 }
             )
-        
-        return await call_next(request)
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+# Security headers, encoded once and appended at http.response.start
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'"),
+]
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADERS)
 
 # Additional security headers middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        
-        return response 
\ No newline at end of file
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Replace any values the app set, as assigning response.headers did
+                headers = [
+                    header for header in message.get("headers", ())
+                    if header[0].lower() not in _SECURITY_HEADER_NAMES
+                ]
+                headers.extend(SECURITY_HEADERS)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,182 @@
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from app.schemas import (
+    MessageRequest,
+    HelloWorldTemplateRequest,
+    OrderConfirmTemplateRequest,
+    AccountCreatedTemplateRequest
+)
+
+try:
+    import orjson
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value)
+except ImportError:  # pragma: no cover - exercised only without orjson
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+    def dumps(value: Any) -> bytes:
+        return _encoder.encode(value).encode("utf-8")
+
+# A builder turns a validated request, the normalized recipient number and the
+# template language code into ready-to-send Graph API JSON bytes.
+PayloadBuilder = Callable[[Any, str, str], bytes]
+
+_builders: Dict[Type, PayloadBuilder] = {}
+_builders_by_name: Dict[str, PayloadBuilder] = {}
+# Parameters each dedicated builder sends, per component type
+_parameter_counts: Dict[Type, Dict[str, int]] = {}
+
+
+def register_template(
+    name: str,
+    model: Type,
+    parameters: Optional[Dict[str, int]] = None
+) -> Callable[[PayloadBuilder], PayloadBuilder]:
+    """
+    Register the payload builder for a template request model.
+
+    ``parameters`` gives the number of parameters the builder sends per
+    component type (``{"header": 1, "body": 3}``), checked against the
+    template catalog. Omit it for models that carry their own components.
+    """
+    def decorator(builder: PayloadBuilder) -> PayloadBuilder:
+        _builders[model] = builder
+        _builders_by_name[name] = builder
+        if parameters is not None:
+            _parameter_counts[model] = parameters
+        return builder
+    return decorator
+
+
+def build_payload(message: Any, to: str, language: str) -> bytes:
+    """
+    Build the Graph API request body for ``message``.
+
+    Raises:
+        KeyError: If no builder is registered for the message type
+    """
+    return _builders[type(message)](message, to, language)
+
+
+def get_template_name(message: Any) -> str:
+    """Template name of a dedicated or generic request."""
+    return getattr(message, "template_name", None) or message.template.name
+
+
+def requested_language(message: Any) -> Optional[str]:
+    """Language code set on the request, if any."""
+    template = getattr(message, "template", None)
+    if template is not None:
+        return template.language.code
+    return getattr(message, "language", None)
+
+
+def parameter_counts(message: Any) -> Dict[str, int]:
+    """Number of parameters ``message`` sends per component type."""
+    counts = _parameter_counts.get(type(message))
+    if counts is not None:
+        return counts
+    counts = {}
+    for component in message.template.components or ():
+        component_type = component.type.lower()
+        counts[component_type] = counts.get(component_type, 0) + len(component.parameters)
+    return counts
+
+
+def registered_templates() -> Dict[str, PayloadBuilder]:
+    return dict(_builders_by_name)
+
+
+def is_registered_template(name: str) -> bool:
+    return name in _builders_by_name
+
+
+@lru_cache(maxsize=32)
+def graph_endpoint(base_url: str, phone_number_id: str, token: str) -> Tuple[str, Dict[str, str]]:
+    """Messages URL and auth headers, computed once per sender."""
+    return (
+        f"{base_url}/{phone_number_id}/messages",
+        {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+    )
+
+
+# Static JSON fragments shared by every template payload
+_HEAD = b'{"messaging_product":"whatsapp","to":'
+_TEMPLATE = b',"type":"template","template":{"name":'
+_END = b'}}'
+
+
+@lru_cache(maxsize=64)
+def _language(code: str) -> bytes:
+    return b',"language":{"code":' + dumps(code) + b'}'
+
+
+@register_template("hello_world", HelloWorldTemplateRequest, parameters={})
+def _build_hello_world(message: HelloWorldTemplateRequest, to: str, language: str) -> bytes:
+    return b"".join((_HEAD, dumps(to), _TEMPLATE, dumps(message.template_name), _language(language), _END))
+
+
+# Uploaded documents are referenced by media id, others by link
+_DOCUMENT_ID = b',"components":[{"type":"header","parameters":[{"type":"document","document":{"id":'
+
+_ORDER_CONFIRM_COMPONENTS = (
+    b',"components":[{"type":"header","parameters":[{"type":"document","document":{"link":',
+    b'}}]},{"type":"body","parameters":[{"type":"text","text":',
+    b'},{"type":"text","text":',
+    b'},{"type":"text","text":',
+    b'}]}]',
+)
+
+
+@register_template("order_confirm", OrderConfirmTemplateRequest, parameters={"header": 1, "body": 3})
+def _build_order_confirm(message: OrderConfirmTemplateRequest, to: str, language: str) -> bytes:
+    header, body, second, third, end = _ORDER_CONFIRM_COMPONENTS
+    if message.pdf_media_id:
+        header, document = _DOCUMENT_ID, dumps(message.pdf_media_id)
+    else:
+        document = dumps(str(message.pdf_url))
+    return b"".join((
+        _HEAD, dumps(to), _TEMPLATE, dumps(message.template_name), _language(language),
+        header, document,
+        body, dumps(message.card_type),
+        second, dumps(message.merchant_name),
+        third, dumps(message.document_type),
+        end, _END
+    ))
+
+
+_ACCOUNT_CREATED_COMPONENTS = (
+    b',"components":[{"type":"body","parameters":[{"type":"text","text":',
+    b'},{"type":"text","text":',
+    b'}]}]',
+)
+
+
+@register_template("account_created", AccountCreatedTemplateRequest, parameters={"body": 2})
+def _build_account_created(message: AccountCreatedTemplateRequest, to: str, language: str) -> bytes:
+    body, second, end = _ACCOUNT_CREATED_COMPONENTS
+    return b"".join((
+        _HEAD, dumps(to), _TEMPLATE, dumps(message.template_name), _language(language),
+        body, dumps(message.name),
+        second, dumps(message.verification_type),
+        end, _END
+    ))
+
+
+@register_template("generic", MessageRequest)
+def _build_generic(message: MessageRequest, to: str, language: str) -> bytes:
+    parts = [_HEAD, dumps(to), _TEMPLATE, dumps(message.template.name), _language(language)]
+    if message.template.components:
+        components = [
+            component.model_dump(mode="json", exclude_none=True)
+            for component in message.template.components
+        ]
+        parts += (b',"components":', dumps(components))
+    parts.append(_END)
+    return b"".join(parts)
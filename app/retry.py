@@ -0,0 +1,140 @@
+import random
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from app.config import Settings, settings, settings_store
+
+# HTTP statuses worth retrying: throttling and transient server-side failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Graph API error codes that describe transient conditions
+# (https://developers.facebook.com/docs/whatsapp/cloud-api/support/error-codes)
+RETRYABLE_GRAPH_CODES = {
+    1,       # API Unknown
+    2,       # API Service (temporary downtime)
+    4,       # API Too Many Calls
+    80007,   # Rate limit issues
+    130429,  # Cloud API message throughput reached
+    131000,  # Something went wrong
+    131016,  # Service unavailable
+    133004,  # Server temporarily unavailable
+}
+
+# Graph API error codes that will fail the same way on every attempt, even
+# when returned with a retryable HTTP status
+PERMANENT_GRAPH_CODES = {
+    131048,  # Spam rate limit hit
+    131056,  # Pair rate limit hit
+    368,     # Temporarily blocked for policy violations
+}
+
+# Transport errors raised before any byte of the request was sent, so a retry
+# cannot produce a duplicate message. Read/write timeouts and protocol errors
+# (e.g. the connection dropped after the request went out) are excluded.
+RETRYABLE_REQUEST_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+
+def graph_error_code(response: httpx.Response) -> Optional[int]:
+    """Extract ``error.code`` from a Graph API error response, if present."""
+    try:
+        return response.json().get("error", {}).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(response: httpx.Response) -> Tuple[bool, Optional[float]]:
+    """
+    Decide whether a failed Graph API response should be retried.
+
+    Returns:
+        tuple: (retryable, retry_after_seconds)
+    """
+    code = graph_error_code(response)
+    if code in PERMANENT_GRAPH_CODES:
+        return False, None
+    retryable = response.status_code in RETRYABLE_STATUS_CODES or code in RETRYABLE_GRAPH_CODES
+    return retryable, parse_retry_after(response.headers.get("Retry-After"))
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter and a per-send deadline."""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, deadline: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next attempt.
+
+        ``attempt`` is the number of attempts already made. A Retry-After
+        value from the server takes precedence over the computed backoff.
+        """
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class RetryStats:
+    """Attempt and retry counters per template."""
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"attempts": 0, "retries": 0, "recovered": 0, "exhausted": 0}
+        )
+
+    def record(self, template_name: str, counter: str) -> None:
+        self.counters[template_name][counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: dict(counters) for name, counters in self.counters.items()}
+
+
+retry_stats = RetryStats()
+_retry_policy: Optional[RetryPolicy] = None
+
+
+def get_retry_policy() -> RetryPolicy:
+    """The shared policy, built from settings on first use."""
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY,
+            deadline=settings.RETRY_DEADLINE_SECONDS
+        )
+    return _retry_policy
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _retry_policy is None:
+        return
+    _retry_policy.max_attempts = new.RETRY_MAX_ATTEMPTS
+    _retry_policy.base_delay = new.RETRY_BASE_DELAY
+    _retry_policy.max_delay = new.RETRY_MAX_DELAY
+    _retry_policy.deadline = new.RETRY_DEADLINE_SECONDS
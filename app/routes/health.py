@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, Request
+from app.config import settings_store
+from app.http_client import get_http_client
+from app.send_queue import get_send_queue
+from app.scheduler import get_scheduler
+from app.throttle import get_outbound_throttle
+from app.senders import get_sender_pool
+from app.retry import retry_stats
+from app.circuit_breaker import circuit_breakers
+from app.idempotency import get_idempotency_cache
+from app.media import get_media_cache
+from app.dispatcher import get_recipient_dispatcher
+from app.webhooks import get_webhook_processor
+from app.status_store import get_send_recorder
+from app.auth import APIClient, get_authenticator, require_admin
+from app.suppression import get_suppression_list
+from app.template_catalog import get_template_catalog
+from app.utils.phone import phone_cache_stats
+from typing import Dict, Any
+
+router = APIRouter()
+
+def _status() -> str:
+    return "degraded" if circuit_breakers.any_open() else "ok"
+
+@router.get("/health")
+async def health() -> Dict[str, Any]:
+    """
+    Report service health for load balancers and uptime checks.
+    
+    Status is "degraded" while any Graph API circuit breaker is not closed.
+    Internals are only reported by the admin-only ``/health/details``.
+    """
+    return {"status": _status()}
+
+@router.get(
+    "/health/details",
+    responses={
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Not an admin API key"}
+    }
+)
+async def health_details(
+    request: Request,
+    api_client: APIClient = Depends(require_admin)
+) -> Dict[str, Any]:
+    """
+    Report service health along with the statistics of every subsystem.
+    """
+    queue = get_send_queue()
+    scheduler = get_scheduler()
+    processor = get_webhook_processor()
+    recorder = get_send_recorder()
+    suppression_list = get_suppression_list()
+    catalog = get_template_catalog()
+    return {
+        "status": _status(),
+        "circuit_breakers": circuit_breakers.stats(),
+        "http_pool": get_http_client().stats(),
+        "outbound_throttle": get_outbound_throttle().stats(),
+        "senders": get_sender_pool().stats(),
+        "rate_limit": request.app.state.rate_limit_backend.stats(),
+        "auth": get_authenticator().stats(),
+        "idempotency": get_idempotency_cache().stats(),
+        "phone_cache": phone_cache_stats(),
+        "media": get_media_cache().stats(),
+        "recipient_ordering": get_recipient_dispatcher().stats(),
+        "retries": retry_stats.stats(),
+        "send_queue": await queue.stats() if queue else None,
+        "scheduler": await scheduler.stats() if scheduler else None,
+        "webhooks": processor.stats() if processor else None,
+        "send_log": recorder.stats() if recorder else None,
+        "suppression": suppression_list.stats() if suppression_list else None,
+        "templates": catalog.stats() if catalog else None,
+        "settings": settings_store.stats()
+    }
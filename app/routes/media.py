@@ -0,0 +1,42 @@
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from app.schemas import MediaUploadResponse
+from app.media import MediaTooLarge, get_media_cache
+from app.auth import APIClient, verify_api_key
+from app.logger import logger
+
+router = APIRouter()
+
+
+@router.post(
+    "/media",
+    response_model=MediaUploadResponse,
+    responses={
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        413: {"description": "Document exceeds MEDIA_MAX_BYTES"},
+        502: {"description": "Graph API upload failed"}
+    }
+)
+async def upload_media(
+    request: Request,
+    filename: str = "document.pdf",
+    api_client: APIClient = Depends(verify_api_key)
+) -> MediaUploadResponse:
+    """
+    Upload a document to the Graph API and return its media id.
+
+    Send the file as the raw request body with its Content-Type. Bodies over
+    MEDIA_SPOOL_BYTES are spooled to disk rather than held in memory, and
+    uploads of identical content are answered from the media cache.
+    """
+    content_type = request.headers.get("content-type", "application/pdf").split(";", 1)[0]
+    try:
+        media_id, digest = await get_media_cache().media_id_for_stream(request.stream(), content_type, filename)
+    except MediaTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        logger.error("Media upload for API client %s failed: %s", api_client.client_id, e)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Graph API media upload failed")
+    logger.info("API client %s uploaded media %s", api_client.client_id, media_id, sampled=True)
+    return MediaUploadResponse(media_id=media_id, sha256=digest)
@@ -1,24 +1,170 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import asyncio
+import time
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, status
+from fastapi.responses import JSONResponse
 from app.schemas import (
     MessageRequest,
     MessageResponse,
     HelloWorldTemplateRequest,
     OrderConfirmTemplateRequest,
-    AccountCreatedTemplateRequest
+    AccountCreatedTemplateRequest,
+    BatchMessageRequest,
+    BatchMessageResponse,
+    SendJobResponse,
+    MessageStatusEvent,
+    MessageStatusHistory,
+    SentMessageRecord,
+    SentMessagePage,
+    ScheduledSendResponse
 )
-from app.services import send_whatsapp_message
-from app.auth import verify_api_key
+from app.services import check_template, send_whatsapp_message, send_whatsapp_batch
+from app.config import settings
+from app.send_queue import get_send_queue
+from app.scheduler import get_scheduler, to_timestamp
+from app.status_store import get_status_store
+from app.idempotency import get_idempotency_cache, scoped_key, fingerprint
+from app.utils.validators import validate_phone_number
+from app.utils.phone import graph_number, normalize_phone_number
+from app.http_client import GraphHTTPClient, get_http_client
+from app.auth import APIClient, require_template, verify_api_key
+from app.payloads import get_template_name
 from app.logger import logger
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple, Union
 
 router = APIRouter()
 
+def _check_before_accepting(message: Any) -> None:
+    """Reject what the worker would reject before accepting a queued or scheduled send."""
+    if not validate_phone_number(message.to_number):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid phone number format. Use international format (e.g., +1234567890)"
+        )
+    check_template(message, get_template_name(message))
+
+async def _schedule_if_requested(message: Any, api_client: APIClient) -> Optional[ScheduledSendResponse]:
+    """
+    Hand the message to the scheduler when ``send_at`` is in the future.
+    
+    Returns None when the message should be sent now.
+    """
+    if message.send_at is None:
+        return None
+    send_at = to_timestamp(message.send_at)
+    now = time.time()
+    if send_at <= now:
+        return None
+    if send_at > now + settings.SCHEDULER_MAX_DAYS * 86400:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"send_at must be within {settings.SCHEDULER_MAX_DAYS:g} days"
+        )
+    scheduler = get_scheduler()
+    if scheduler is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Scheduled sending is disabled (SCHEDULER_ENABLED=false)"
+        )
+    _check_before_accepting(message)
+    schedule_id = await scheduler.schedule(message, send_at, api_client.client_id)
+    logger.info("Scheduled send %s for %s at %s", schedule_id, message.to_number, message.send_at)
+    return ScheduledSendResponse(schedule_id=schedule_id, status="scheduled", send_at=message.send_at)
+
+async def _enqueue_if_async(
+    message: Any,
+    async_mode: Optional[bool],
+    api_client: APIClient
+) -> Optional[SendJobResponse]:
+    """
+    Queue the message when async mode is requested.
+    
+    Returns None when the message should be sent inline.
+    """
+    if async_mode is None:
+        async_mode = settings.SEND_QUEUE_DEFAULT_ASYNC
+    if not async_mode:
+        return None
+    
+    queue = get_send_queue()
+    if queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Asynchronous sending is disabled (SEND_QUEUE_ENABLED=false)"
+        )
+    _check_before_accepting(message)
+    job_id = await queue.enqueue(message, api_client.client_id)
+    logger.info("Queued send job %s for %s", job_id, message.to_number)
+    return SendJobResponse(job_id=job_id, status="queued")
+
+async def _dispatch(
+    message: Any,
+    client: GraphHTTPClient,
+    async_mode: Optional[bool],
+    api_client: APIClient
+) -> Tuple[int, Dict[str, Any]]:
+    """Send inline, schedule or queue the message, returning (status_code, response body)."""
+    scheduled = await _schedule_if_requested(message, api_client)
+    if scheduled is not None:
+        return status.HTTP_202_ACCEPTED, scheduled.model_dump(mode="json")
+    job = await _enqueue_if_async(message, async_mode, api_client)
+    if job is not None:
+        return status.HTTP_202_ACCEPTED, job.model_dump()
+    response = await send_whatsapp_message(message, client=client, client_id=api_client.client_id)
+    return status.HTTP_200_OK, MessageResponse(
+        success=True,
+        message_id=response.get("messages", [{}])[0].get("id"),
+        status="sent"
+    ).model_dump()
+
+async def _process_send(
+    message: Any,
+    request: Request,
+    api_client: APIClient,
+    idempotency_key: Optional[str],
+    client: GraphHTTPClient,
+    async_mode: Optional[bool]
+) -> JSONResponse:
+    """
+    Dispatch a send, deduplicated by the Idempotency-Key header when given.
+    
+    A repeated key returns the stored response (with ``Idempotent-Replayed: true``)
+    and concurrent duplicates wait for the first send instead of sending again.
+    """
+    require_template(api_client, get_template_name(message))
+    
+    if not idempotency_key or not settings.IDEMPOTENCY_ENABLED:
+        status_code, content = await _dispatch(message, client, async_mode, api_client)
+        return JSONResponse(status_code=status_code, content=content)
+    
+    if len(idempotency_key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+    (status_code, content), replayed = await get_idempotency_cache().execute(
+        scoped_key(api_client.client_id, request.url.path, idempotency_key),
+        fingerprint(message),
+        lambda: _dispatch(message, client, async_mode, api_client)
+    )
+    if replayed:
+        logger.info("Replayed idempotent response for key %s", idempotency_key)
+    return JSONResponse(
+        status_code=status_code,
+        content=content,
+        headers={"Idempotent-Replayed": "true"} if replayed else None
+    )
+
 @router.post(
     "/messages/hello-world",
     response_model=MessageResponse,
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Message sent successfully"},
+        202: {
+            "description": "Message queued for asynchronous sending, or scheduled when send_at is given",
+            "model": Union[SendJobResponse, ScheduledSendResponse]
+        },
         401: {"description": "Unauthorized - Missing API key"},
         403: {"description": "Forbidden - Invalid API key"},
         422: {"description": "Validation Error"},
@@ -28,7 +174,13 @@ router = APIRouter()
 )
 async def send_hello_world(
     message: HelloWorldTemplateRequest,
-    api_key: str = Depends(verify_api_key)
+    request: Request,
+    api_client: APIClient = Depends(verify_api_key),
+    client: GraphHTTPClient = Depends(get_http_client),
+    async_mode: Optional[bool] = Query(None, alias="async", description="Queue the send and return 202"),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Deduplicates retried sends"
+    )
 ) -> MessageResponse:
     """
     Send the hello_world template message.
@@ -41,15 +193,10 @@ async def send_hello_world(
     ```
     """
     try:
-        logger.info(f"Received hello_world template request for {message.to_number}")
-        response = await send_whatsapp_message(message)
-        return MessageResponse(
-            success=True,
-            message_id=response.get("messages", [{}])[0].get("id"),
-            status="sent"
-        )
+        logger.info("Received hello_world template request for %s", message.to_number, sampled=True)
+        return await _process_send(message, request, api_client, idempotency_key, client, async_mode)
     except Exception as e:
-        logger.error(f"Error sending hello_world template: {str(e)}")
+        logger.error("Error sending hello_world template: %s", e)
         raise
 
 @router.post(
@@ -58,6 +205,10 @@ async def send_hello_world(
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Message sent successfully"},
+        202: {
+            "description": "Message queued for asynchronous sending, or scheduled when send_at is given",
+            "model": Union[SendJobResponse, ScheduledSendResponse]
+        },
         401: {"description": "Unauthorized - Missing API key"},
         403: {"description": "Forbidden - Invalid API key"},
         422: {"description": "Validation Error"},
@@ -67,7 +218,13 @@ async def send_hello_world(
 )
 async def send_order_confirm(
     message: OrderConfirmTemplateRequest,
-    api_key: str = Depends(verify_api_key)
+    request: Request,
+    api_client: APIClient = Depends(verify_api_key),
+    client: GraphHTTPClient = Depends(get_http_client),
+    async_mode: Optional[bool] = Query(None, alias="async", description="Queue the send and return 202"),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Deduplicates retried sends"
+    )
 ) -> MessageResponse:
     """
     Send the order confirmation template with PDF attachment.
@@ -88,15 +245,10 @@ async def send_order_confirm(
     ```
     """
     try:
-        logger.info(f"Received order confirmation template request for {message.to_number}")
-        response = await send_whatsapp_message(message)
-        return MessageResponse(
-            success=True,
-            message_id=response.get("messages", [{}])[0].get("id"),
-            status="sent"
-        )
+        logger.info("Received order confirmation template request for %s", message.to_number, sampled=True)
+        return await _process_send(message, request, api_client, idempotency_key, client, async_mode)
     except Exception as e:
-        logger.error(f"Error sending order confirmation template: {str(e)}")
+        logger.error("Error sending order confirmation template: %s", e)
         raise
 
 @router.post(
@@ -105,6 +257,10 @@ async def send_order_confirm(
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Message sent successfully"},
+        202: {
+            "description": "Message queued for asynchronous sending, or scheduled when send_at is given",
+            "model": Union[SendJobResponse, ScheduledSendResponse]
+        },
         401: {"description": "Unauthorized - Missing API key"},
         403: {"description": "Forbidden - Invalid API key"},
         422: {"description": "Validation Error"},
@@ -114,7 +270,13 @@ async def send_order_confirm(
 )
 async def send_account_created(
     message: AccountCreatedTemplateRequest,
-    api_key: str = Depends(verify_api_key)
+    request: Request,
+    api_client: APIClient = Depends(verify_api_key),
+    client: GraphHTTPClient = Depends(get_http_client),
+    async_mode: Optional[bool] = Query(None, alias="async", description="Queue the send and return 202"),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Deduplicates retried sends"
+    )
 ) -> MessageResponse:
     """
     Send the account created template.
@@ -129,15 +291,10 @@ async def send_account_created(
     ```
     """
     try:
-        logger.info(f"Received account created template request for {message.to_number}")
-        response = await send_whatsapp_message(message)
-        return MessageResponse(
-            success=True,
-            message_id=response.get("messages", [{}])[0].get("id"),
-            status="sent"
-        )
+        logger.info("Received account created template request for %s", message.to_number, sampled=True)
+        return await _process_send(message, request, api_client, idempotency_key, client, async_mode)
     except Exception as e:
-        logger.error(f"Error sending account created template: {str(e)}")
+        logger.error("Error sending account created template: %s", e)
         raise
 
 # Keep the generic endpoint for backward compatibility
@@ -147,6 +304,10 @@ async def send_account_created(
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Message sent successfully"},
+        202: {
+            "description": "Message queued for asynchronous sending, or scheduled when send_at is given",
+            "model": Union[SendJobResponse, ScheduledSendResponse]
+        },
         401: {"description": "Unauthorized - Missing API key"},
         403: {"description": "Forbidden - Invalid API key"},
         422: {"description": "Validation Error"},
@@ -156,7 +317,13 @@ async def send_account_created(
 )
 async def send_message(
     message: MessageRequest,
-    api_key: str = Depends(verify_api_key)
+    request: Request,
+    api_client: APIClient = Depends(verify_api_key),
+    client: GraphHTTPClient = Depends(get_http_client),
+    async_mode: Optional[bool] = Query(None, alias="async", description="Queue the send and return 202"),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Deduplicates retried sends"
+    )
 ) -> MessageResponse:
     """
     Send a generic template message.
@@ -175,13 +342,260 @@ async def send_message(
     ```
     """
     try:
-        logger.info(f"Received message request for {message.to_number}")
-        response = await send_whatsapp_message(message)
-        return MessageResponse(
-            success=True,
-            message_id=response.get("messages", [{}])[0].get("id"),
-            status="sent"
-        )
+        logger.info("Received message request for %s", message.to_number, sampled=True)
+        return await _process_send(message, request, api_client, idempotency_key, client, async_mode)
     except Exception as e:
-        logger.error(f"Error sending message: {str(e)}")
+        logger.error("Error sending message: %s", e)
         raise
+
+@router.post(
+    "/messages/batch",
+    response_model=BatchMessageResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Batch processed; see per-recipient results"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        422: {"description": "Validation Error"},
+        500: {"description": "Internal Server Error"}
+    }
+)
+async def send_batch(
+    batch: BatchMessageRequest,
+    api_client: APIClient = Depends(verify_api_key),
+    client: GraphHTTPClient = Depends(get_http_client)
+) -> BatchMessageResponse:
+    """
+    Send one template to many recipients with bounded concurrency.
+    
+    Each recipient is validated and sent independently; failures are
+    reported per item and do not fail the batch.
+    
+    Example request:
+    ```json
+    {
+        "template_name": "account_created",
+        "recipients": [
+            {"to_number": "919821449581", "parameters": {"name": "John Doe", "verification_type": "email"}},
+            {"to_number": "919821449582", "parameters": {"name": "Jane Doe", "verification_type": "phone number"}}
+        ]
+    }
+    ```
+    """
+    if len(batch.recipients) > settings.BATCH_MAX_RECIPIENTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch exceeds maximum of {settings.BATCH_MAX_RECIPIENTS} recipients"
+        )
+    # Batches are sent now; a per-recipient send_at would otherwise be dropped silently
+    scheduled = [index for index, recipient in enumerate(batch.recipients) if "send_at" in recipient.parameters]
+    if scheduled:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"send_at is not supported in batch sends (recipients {scheduled[:10]})"
+        )
+    
+    concurrency = min(batch.concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    logger.info(
+        "Received batch request for template %s with %s recipients (concurrency=%s)",
+        batch.template_name, len(batch.recipients), concurrency
+    )
+    results = await send_whatsapp_batch(
+        batch,
+        concurrency=concurrency,
+        client=client,
+        authorize=lambda message: require_template(api_client, get_template_name(message)),
+        client_id=api_client.client_id
+    )
+    succeeded = sum(1 for result in results if result.success)
+    logger.info("Batch complete: %s/%s sent", succeeded, len(results))
+    return BatchMessageResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+@router.get(
+    "/messages/{job_id}",
+    response_model=SendJobResponse,
+    responses={
+        200: {"description": "Job status"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        404: {"description": "Job not found"},
+        503: {"description": "Asynchronous sending is disabled"}
+    }
+)
+async def get_send_job(
+    job_id: str,
+    api_client: APIClient = Depends(verify_api_key)
+) -> SendJobResponse:
+    """
+    Get the status of a message queued with `?async=true`.
+    """
+    queue = get_send_queue()
+    if queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Asynchronous sending is disabled (SEND_QUEUE_ENABLED=false)"
+        )
+    job = await queue.get(job_id)
+    # Other clients' jobs are reported as missing rather than forbidden
+    if job is None or (job.pop("client_id") != api_client.client_id and not api_client.admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Send job not found")
+    return SendJobResponse(job_id=job.pop("id"), **job)
+
+async def _get_scheduled_send(schedule_id: str, api_client: APIClient) -> Dict[str, Any]:
+    scheduler = get_scheduler()
+    if scheduler is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Scheduled sending is disabled (SCHEDULER_ENABLED=false)"
+        )
+    scheduled = await scheduler.get(schedule_id)
+    # Other clients' sends are reported as missing rather than forbidden
+    if scheduled is None or (scheduled["client_id"] != api_client.client_id and not api_client.admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scheduled send not found")
+    return scheduled
+
+def _scheduled_response(scheduled: Dict[str, Any]) -> ScheduledSendResponse:
+    scheduled.pop("client_id")
+    return ScheduledSendResponse(
+        schedule_id=scheduled.pop("id"),
+        send_at=datetime.fromtimestamp(scheduled.pop("send_at"), tz=timezone.utc),
+        **scheduled
+    )
+
+@router.get(
+    "/scheduled-messages/{schedule_id}",
+    response_model=ScheduledSendResponse,
+    responses={
+        200: {"description": "Scheduled send status"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        404: {"description": "Scheduled send not found"},
+        503: {"description": "Scheduled sending is disabled"}
+    }
+)
+async def get_scheduled_send(
+    schedule_id: str,
+    api_client: APIClient = Depends(verify_api_key)
+) -> ScheduledSendResponse:
+    """
+    Get the status of a message sent with `send_at`.
+    """
+    return _scheduled_response(await _get_scheduled_send(schedule_id, api_client))
+
+@router.delete(
+    "/scheduled-messages/{schedule_id}",
+    response_model=ScheduledSendResponse,
+    responses={
+        200: {"description": "Scheduled send cancelled"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        404: {"description": "Scheduled send not found"},
+        409: {"description": "The send was already released"},
+        503: {"description": "Scheduled sending is disabled"}
+    }
+)
+async def cancel_scheduled_send(
+    schedule_id: str,
+    api_client: APIClient = Depends(verify_api_key)
+) -> ScheduledSendResponse:
+    """
+    Cancel a scheduled send that has not been released yet.
+    """
+    scheduled = await _get_scheduled_send(schedule_id, api_client)
+    if not await get_scheduler().cancel(schedule_id, None if api_client.admin else api_client.client_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Scheduled send is already {scheduled['status']}"
+        )
+    logger.info("Cancelled scheduled send %s", schedule_id)
+    return _scheduled_response(await _get_scheduled_send(schedule_id, api_client))
+
+@router.get(
+    "/messages/{message_id}/statuses",
+    response_model=MessageStatusHistory,
+    responses={
+        200: {"description": "Delivery status history received through the webhook"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"},
+        404: {"description": "No status updates received for this message"}
+    }
+)
+async def get_message_statuses(
+    message_id: str,
+    api_client: APIClient = Depends(verify_api_key)
+) -> MessageStatusHistory:
+    """
+    Get the send record and delivery status history of a message by its WhatsApp message ID.
+    
+    Clients only see messages they sent; admin keys see every message,
+    including statuses of sends that were never recorded.
+    """
+    store = get_status_store()
+    send = await asyncio.to_thread(
+        store.get_send, message_id, None if api_client.admin else api_client.client_id
+    )
+    if send is None and not api_client.admin:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No record of this message")
+    events = await store.get_history(message_id)
+    if send is None and not events:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No record of this message")
+    return MessageStatusHistory(
+        message_id=message_id,
+        send=SentMessageRecord(**send) if send else None,
+        statuses=[MessageStatusEvent(**event) for event in events]
+    )
+
+@router.get(
+    "/messages/",
+    response_model=SentMessagePage,
+    responses={
+        200: {"description": "Recorded sends, newest first"},
+        400: {"description": "Bad Request - Invalid cursor"},
+        401: {"description": "Unauthorized - Missing API key"},
+        403: {"description": "Forbidden - Invalid API key"}
+    }
+)
+async def list_sent_messages(
+    to_number: Optional[str] = Query(None, description="Recipient number without the + prefix"),
+    template_name: Optional[str] = None,
+    message_status: Optional[str] = Query(None, alias="status"),
+    since: Optional[float] = Query(None, description="Unix time; only sends at or after this time"),
+    until: Optional[float] = Query(None, description="Unix time; only sends before this time"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    api_client: APIClient = Depends(verify_api_key)
+) -> SentMessagePage:
+    """
+    Search the send log by recipient, template, status and time range.
+    
+    Clients only see their own sends; admin keys see every client's.
+    
+    Results are paginated with an opaque cursor, so pages stay fast however
+    deep the client reads.
+    """
+    if to_number is not None:
+        e164 = normalize_phone_number(to_number)
+        to_number = graph_number(e164) if e164 else to_number.strip().lstrip("+")
+    try:
+        items, next_cursor = await asyncio.to_thread(
+            get_status_store().query_sends,
+            to_number=to_number,
+            template_name=template_name,
+            status=message_status,
+            client_id=None if api_client.admin else api_client.client_id,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return SentMessagePage(
+        items=[SentMessageRecord(**item) for item in items],
+        next_cursor=next_cursor
+    )
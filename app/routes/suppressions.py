@@ -0,0 +1,95 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.schemas import SuppressionStatus, SuppressionUpdateRequest, SuppressionUpdateResponse
+from app.suppression import SuppressionList, get_suppression_list, number_key
+from app.utils.phone import graph_number, normalize_phone_number, normalize_phone_numbers
+from app.auth import APIClient, require_admin
+from app.config import settings
+from app.logger import logger
+from typing import Callable, Iterable
+
+router = APIRouter()
+
+ADMIN_RESPONSES = {
+    401: {"description": "Unauthorized - Missing API key"},
+    403: {"description": "Forbidden - Invalid or non-admin API key"},
+    503: {"description": "Suppression list is disabled"}
+}
+
+
+def _suppression_list() -> SuppressionList:
+    suppression_list = get_suppression_list()
+    if suppression_list is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Suppression list is disabled (SUPPRESSION_ENABLED=false)"
+        )
+    return suppression_list
+
+
+async def _update(
+    request: SuppressionUpdateRequest,
+    apply: Callable[[Iterable[int]], int]
+) -> SuppressionUpdateResponse:
+    if len(request.numbers) > settings.SUPPRESSION_MAX_UPDATE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SUPPRESSION_MAX_UPDATE} numbers per request"
+        )
+    numbers, invalid = normalize_phone_numbers(request.numbers)
+    keys = [number_key(graph_number(number)) for number in numbers if number is not None]
+    # Journal writes are fsynced; keep them off the event loop
+    updated = await asyncio.to_thread(apply, keys)
+    return SuppressionUpdateResponse(updated=updated, invalid=invalid)
+
+
+@router.post("/suppressions", response_model=SuppressionUpdateResponse, responses=ADMIN_RESPONSES)
+async def add_suppressions(
+    request: SuppressionUpdateRequest,
+    admin: APIClient = Depends(require_admin)
+) -> SuppressionUpdateResponse:
+    """
+    Add numbers to the suppression list. Sends to them are rejected with 403
+    until they are removed. Invalid numbers are reported by index.
+    """
+    response = await _update(request, _suppression_list().add)
+    logger.info("API client %s suppressed %s numbers", admin.client_id, response.updated)
+    return response
+
+
+@router.post("/suppressions/remove", response_model=SuppressionUpdateResponse, responses=ADMIN_RESPONSES)
+async def remove_suppressions(
+    request: SuppressionUpdateRequest,
+    admin: APIClient = Depends(require_admin)
+) -> SuppressionUpdateResponse:
+    """
+    Remove numbers from the suppression list (e.g. after a user opts back in).
+    """
+    response = await _update(request, _suppression_list().remove)
+    logger.info("API client %s unsuppressed %s numbers", admin.client_id, response.updated)
+    return response
+
+
+@router.get(
+    "/suppressions/{to_number}",
+    response_model=SuppressionStatus,
+    responses={**ADMIN_RESPONSES, 422: {"description": "Invalid phone number"}}
+)
+async def get_suppression(
+    to_number: str,
+    admin: APIClient = Depends(require_admin)
+) -> SuppressionStatus:
+    """
+    Check whether a number is on the suppression list.
+    """
+    suppression_list = _suppression_list()
+    e164 = normalize_phone_number(to_number)
+    if e164 is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid phone number format. Use international format (e.g., +1234567890)"
+        )
+    return SuppressionStatus(
+        to_number=e164,
+        suppressed=suppression_list.contains(number_key(graph_number(e164)))
+    )
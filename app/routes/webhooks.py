@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, Response
+from app.config import settings
+from app.webhooks import (
+    WebhookBodyTooLarge,
+    get_webhook_processor,
+    parse_signature,
+    read_body,
+    read_verified_body
+)
+from app.logger import logger
+from typing import Optional
+import hmac
+
+router = APIRouter()
+
+@router.get(
+    "/webhooks/whatsapp",
+    response_class=PlainTextResponse,
+    responses={
+        200: {"description": "Subscription verified; echoes hub.challenge"},
+        403: {"description": "Forbidden - Verify token mismatch"}
+    }
+)
+async def verify_webhook(
+    mode: Optional[str] = Query(None, alias="hub.mode"),
+    verify_token: Optional[str] = Query(None, alias="hub.verify_token"),
+    challenge: Optional[str] = Query(None, alias="hub.challenge")
+) -> PlainTextResponse:
+    """
+    Answer Meta's webhook subscription challenge.
+    """
+    if (
+        mode == "subscribe"
+        and settings.WEBHOOK_VERIFY_TOKEN
+        and verify_token is not None
+        and hmac.compare_digest(verify_token.encode(), settings.WEBHOOK_VERIFY_TOKEN.encode())
+    ):
+        logger.info("Webhook subscription verified")
+        return PlainTextResponse(challenge or "")
+    logger.warning("Webhook verification failed")
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Webhook verification failed")
+
+@router.post(
+    "/webhooks/whatsapp",
+    responses={
+        200: {"description": "Event accepted for processing"},
+        403: {"description": "Forbidden - Missing or invalid X-Hub-Signature-256"},
+        413: {"description": "Body larger than WEBHOOK_MAX_BODY_BYTES"},
+        503: {"description": "Webhook queue is full; Meta will retry"}
+    }
+)
+async def receive_webhook(request: Request) -> Response:
+    """
+    Receive delivery statuses and inbound messages from Meta.
+    
+    The signature is checked over the raw body as it streams in and the body
+    is queued for batch processing, so the request is acknowledged without
+    parsing the payload.
+    """
+    # The endpoint is public: refuse oversized or unsigned bodies before reading them
+    max_bytes = settings.WEBHOOK_MAX_BODY_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Webhook body is too large")
+    app_secret = settings.WHATSAPP_APP_SECRET
+    if app_secret:
+        signature = parse_signature(request.headers.get("x-hub-signature-256"))
+        if signature is None:
+            logger.warning("Rejected webhook with a missing or malformed signature")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid webhook signature")
+    elif not settings.WEBHOOK_ALLOW_UNSIGNED:
+        logger.error("WHATSAPP_APP_SECRET is not set and WEBHOOK_ALLOW_UNSIGNED is off; rejecting unsigned webhook")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Webhook signature cannot be verified")
+    
+    try:
+        if app_secret:
+            body, valid = await read_verified_body(request.stream(), signature, app_secret, max_bytes)
+        else:
+            # Local development without an app secret, enabled explicitly
+            body, valid = await read_body(request.stream(), max_bytes), True
+    except WebhookBodyTooLarge:
+        logger.warning("Rejected webhook larger than %s bytes", max_bytes)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Webhook body is too large")
+    if not valid:
+        logger.warning("Rejected webhook with invalid signature")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid webhook signature")
+    
+    processor = get_webhook_processor()
+    if processor is None or not processor.submit(body):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook queue is full")
+    return Response(status_code=status.HTTP_200_OK)
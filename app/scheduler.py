@@ -0,0 +1,412 @@
+import asyncio
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from app.config import settings
+from app.logger import logger
+from app.send_queue import QUEUEABLE_MODELS
+from app.throttle import TokenBucket
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_sends (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    client_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    send_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message_id TEXT,
+    error TEXT,
+    status_code INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_status_send_at ON scheduled_sends (status, send_at);
+"""
+
+_COLUMNS = "id, client_id, status, send_at, attempts, message_id, error, status_code, created_at, updated_at"
+
+
+def to_timestamp(value: datetime) -> float:
+    """Unix time of ``value``; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class SendScheduler:
+    """
+    Sends held until their ``send_at`` time, persisted in SQLite.
+
+    Only the sends due within ``horizon`` seconds (at most ``max_loaded``
+    of them) are kept in memory, in a heap of ``(send_at, id)``; the rest
+    stay on disk behind the ``(status, send_at)`` index, and a loader tops
+    the heap up every ``poll_interval``. One dispatcher task pops due sends
+    and releases them into ``send_whatsapp_message`` at ``release_rate`` per
+    second with at most ``concurrency`` in flight, so a million sends booked
+    for 9:00 go out as a steady stream instead of a burst.
+
+    A send is claimed with a conditional UPDATE before it is sent, so
+    workers sharing the database never send it twice, and a cancelled send
+    is never claimed. A claim is a lease: sends still in ``processing``
+    ``lease_seconds`` after they were claimed (their worker crashed) are
+    rescheduled (at-least-once, like the send queue).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        release_rate: float = 50.0,
+        concurrency: int = 20,
+        horizon: float = 300.0,
+        max_loaded: int = 100000,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+        retention_seconds: float = 30 * 86400
+    ):
+        self.path = path
+        self.horizon = horizon
+        self.max_loaded = max_loaded
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.bucket = TokenBucket(release_rate, max(1, int(release_rate)))
+        self.concurrency = concurrency
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._heap: List[Tuple[float, str]] = []
+        self._loaded: Set[str] = set()
+        self._cancelled: Set[str] = set()
+        self._loaded_until = 0.0
+        self._last_seq = 0
+        self._next_cleanup = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Set[asyncio.Task] = set()
+
+        self.scheduled = 0
+        self.released = 0
+        self.cancelled = 0
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        # Cancelled tasks do not stop a storage call already running in a thread
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Blocking storage operations, run in a thread from the async API
+
+    def _insert(self, schedule_id: str, client_id: str, kind: str, payload: str, send_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO scheduled_sends (id, client_id, kind, payload, send_at, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'scheduled', ?, ?)",
+                (schedule_id, client_id, kind, payload, send_at, now, now)
+            )
+
+    def _load_due(self, window_end: float) -> List[Tuple[float, str]]:
+        """Scheduled sends that belong in the heap: newly inserted ones and the next slice of the window."""
+        with self._lock:
+            max_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM scheduled_sends").fetchone()[0]
+            # Inserted by any worker since the last load, inside the loaded window
+            rows = self._conn.execute(
+                "SELECT send_at, id FROM scheduled_sends "
+                "WHERE seq > ? AND seq <= ? AND status = 'scheduled' AND send_at < ?",
+                (self._last_seq, max_seq, self._loaded_until)
+            ).fetchall()
+            self._last_seq = max_seq
+            room = self.max_loaded - len(self._loaded)
+            if room > 0 and window_end > self._loaded_until:
+                window = self._conn.execute(
+                    "SELECT send_at, id FROM scheduled_sends "
+                    "WHERE status = 'scheduled' AND send_at >= ? AND send_at < ? ORDER BY send_at LIMIT ?",
+                    (self._loaded_until, window_end, room)
+                ).fetchall()
+                rows += window
+                # A full slice may have stopped mid-window; continue from there next time
+                self._loaded_until = window[-1][0] if len(window) == room else window_end
+        return [(row[0], row[1]) for row in rows]
+
+    def _claim(self, schedule_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'processing', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = 'scheduled'",
+                (time.time(), schedule_id)
+            ).rowcount
+            if not claimed:
+                return None
+            return self._conn.execute(
+                "SELECT client_id, kind, payload FROM scheduled_sends WHERE id = ?", (schedule_id,)
+            ).fetchone()
+
+    def _recover(self) -> List[Tuple[float, str]]:
+        """Reschedule sends whose lease expired without the send finishing."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT send_at, id FROM scheduled_sends WHERE status = 'processing' AND updated_at < ?",
+                (now - self.lease_seconds,)
+            ).fetchall()
+            recovered = []
+            for row in rows:
+                # Only the worker whose UPDATE wins puts it back in its heap
+                if self._conn.execute(
+                    "UPDATE scheduled_sends SET status = 'scheduled', updated_at = ? "
+                    "WHERE id = ? AND status = 'processing' AND updated_at < ?",
+                    (now, row[1], now - self.lease_seconds)
+                ).rowcount:
+                    recovered.append((row[0], row[1]))
+        return recovered
+
+    def _unclaim(self, schedule_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'scheduled', updated_at = ? WHERE id = ? AND status = 'processing'",
+                (time.time(), schedule_id)
+            )
+
+    def _finish(
+        self,
+        schedule_id: str,
+        status: str,
+        message_id: Optional[str] = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled_sends SET status = ?, message_id = ?, error = ?, status_code = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, message_id, error, status_code, time.time(), schedule_id)
+            )
+
+    def _cancel(self, schedule_id: str, client_id: Optional[str]) -> bool:
+        query = "UPDATE scheduled_sends SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'scheduled'"
+        params: Tuple[Any, ...] = (time.time(), schedule_id)
+        if client_id is not None:
+            query += " AND client_id = ?"
+            params += (client_id,)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount == 1
+
+    def _get(self, schedule_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM scheduled_sends WHERE id = ?", (schedule_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _cleanup(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM scheduled_sends WHERE status IN ('sent', 'failed', 'cancelled') AND updated_at < ?",
+                (time.time() - self.retention_seconds,)
+            ).rowcount
+
+    def _counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM scheduled_sends GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # Async API
+
+    def _push(self, send_at: float, schedule_id: str) -> None:
+        if schedule_id in self._loaded:
+            return
+        self._loaded.add(schedule_id)
+        heapq.heappush(self._heap, (send_at, schedule_id))
+        if self._heap[0][1] == schedule_id and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def schedule(self, message: Any, send_at: float, client_id: str) -> str:
+        """Persist a validated request to be sent at ``send_at`` (Unix time) and return its id."""
+        schedule_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self._insert, schedule_id, client_id, type(message).__name__, message.model_dump_json(), send_at
+        )
+        self.scheduled += 1
+        if send_at < self._loaded_until and len(self._loaded) < self.max_loaded:
+            self._push(send_at, schedule_id)
+        return schedule_id
+
+    async def cancel(self, schedule_id: str, client_id: Optional[str] = None) -> bool:
+        """
+        Cancel a send that has not been released yet.
+
+        With ``client_id``, only that client's sends can be cancelled.
+        Returns False if there is no such pending send.
+        """
+        cancelled = await asyncio.to_thread(self._cancel, schedule_id, client_id)
+        if cancelled:
+            self.cancelled += 1
+            if schedule_id in self._loaded:
+                # Dropped lazily when it reaches the top of the heap
+                self._cancelled.add(schedule_id)
+        return cancelled
+
+    async def get(self, schedule_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, schedule_id)
+
+    async def _release(self, schedule_id: str) -> None:
+        # Imported here to avoid a circular import with app.services
+        from app.services import send_whatsapp_message
+
+        try:
+            row = await asyncio.to_thread(self._claim, schedule_id)
+            if row is None:
+                return
+            self.released += 1
+            message = QUEUEABLE_MODELS[row["kind"]].model_validate_json(row["payload"])
+            response = await send_whatsapp_message(message, client_id=row["client_id"])
+            message_id = response.get("messages", [{}])[0].get("id")
+            await asyncio.to_thread(self._finish, schedule_id, "sent", message_id, None, 200)
+        except asyncio.CancelledError:
+            # Shutting down mid-send: hand it back so the next start loads it again
+            self._unclaim(schedule_id)
+            raise
+        except HTTPException as e:
+            await asyncio.to_thread(self._finish, schedule_id, "failed", None, str(e.detail), e.status_code)
+        except Exception as e:
+            logger.error("Unexpected error releasing scheduled send %s: %s", schedule_id, e)
+            await asyncio.to_thread(self._finish, schedule_id, "failed", None, str(e), 500)
+        finally:
+            self._slots.release()
+
+    async def _wait(self, timeout: float) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._heap:
+                await self._wait(self.poll_interval)
+                continue
+            send_at, schedule_id = self._heap[0]
+            delay = send_at - time.time()
+            if delay > 0:
+                await self._wait(min(delay, self.poll_interval))
+                continue
+            heapq.heappop(self._heap)
+            self._loaded.discard(schedule_id)
+            if schedule_id in self._cancelled:
+                self._cancelled.discard(schedule_id)
+                continue
+            await self.bucket.acquire(max_wait=float("inf"))
+            await self._slots.acquire()
+            task = asyncio.create_task(self._release(schedule_id))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _load(self) -> None:
+        while True:
+            try:
+                for send_at, schedule_id in await asyncio.to_thread(self._load_due, time.time() + self.horizon):
+                    self._push(send_at, schedule_id)
+                recovered = await asyncio.to_thread(self._recover)
+                if recovered:
+                    logger.warning("Rescheduled %s sends whose worker stopped before finishing", len(recovered))
+                    # Already due, so behind the loaded window; push them directly
+                    for send_at, schedule_id in recovered:
+                        self._push(send_at, schedule_id)
+                if time.monotonic() >= self._next_cleanup:
+                    self._next_cleanup = time.monotonic() + 3600
+                    removed = await asyncio.to_thread(self._cleanup)
+                    if removed:
+                        logger.info("Removed %s finished scheduled sends", removed)
+            except Exception as e:
+                logger.error("Failed to load scheduled sends: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        self.open()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks = [asyncio.create_task(self._load()), asyncio.create_task(self._dispatch())]
+        logger.info("Send scheduler started (%s)", self.path)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Let released sends finish so they are not sent again after a restart
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=10)
+        for task in self._in_flight:
+            task.cancel()
+        # Cancelled sends hand their claim back, which needs the connection
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        self._tasks = []
+        self.close()
+        logger.info("Send scheduler stopped")
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self._counts)
+        return {
+            "loaded": len(self._heap),
+            "in_flight": len(self._in_flight),
+            "scheduled": self.scheduled,
+            "released": self.released,
+            "cancelled": self.cancelled,
+            "release": self.bucket.stats(),
+            "sends": counts,
+        }
+
+
+_scheduler: Optional[SendScheduler] = None
+
+
+async def start_scheduler() -> SendScheduler:
+    """Open the schedule and start releasing due sends. Called from the application lifespan."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SendScheduler(
+            settings.SCHEDULER_PATH,
+            release_rate=settings.SCHEDULER_RELEASE_RATE,
+            concurrency=settings.SCHEDULER_CONCURRENCY,
+            horizon=settings.SCHEDULER_HORIZON_SECONDS,
+            max_loaded=settings.SCHEDULER_MAX_LOADED,
+            poll_interval=settings.SCHEDULER_POLL_INTERVAL,
+            lease_seconds=settings.SCHEDULER_LEASE_SECONDS,
+            retention_seconds=settings.STATUS_RETENTION_DAYS * 86400
+        )
+        await _scheduler.start()
+    return _scheduler
+
+
+async def stop_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
+
+
+def get_scheduler() -> Optional[SendScheduler]:
+    """Return the running scheduler, or None when scheduled sends are disabled."""
+    return _scheduler
@@ -1,8 +1,13 @@
+from datetime import datetime
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict, Any
+
+SEND_AT_DESCRIPTION = "Send at this time instead of now (ISO 8601; UTC if no offset is given)"
 
 class TemplateLanguage(BaseModel):
-    code: str = "en_US"
+    code: Optional[str] = Field(
+        None, description="Language code; defaults to the template catalog's or TEMPLATE_DEFAULT_LANGUAGE"
+    )
 
 class TemplateParameter(BaseModel):
     type: str
@@ -15,7 +20,7 @@ class TemplateComponent(BaseModel):
 
 class Template(BaseModel):
     name: str
-    language: TemplateLanguage
+    language: TemplateLanguage = Field(default_factory=TemplateLanguage)
     components: Optional[List[TemplateComponent]] = None
 
 # Specific template request models for better type safety and validation
@@ -23,20 +28,29 @@ class HelloWorldTemplateRequest(BaseModel):
     """Request model for hello_world template"""
     to_number: str
     template_name: str = "hello_world"
+    language: Optional[str] = Field(None, description="Template language code")
+    send_at: Optional[datetime] = Field(None, description=SEND_AT_DESCRIPTION)
 
 class OrderConfirmTemplateRequest(BaseModel):
     """Request model for order confirmation template with PDF header"""
     to_number: str
     template_name: str = "order_confirm"
+    language: Optional[str] = Field(None, description="Template language code")
+    send_at: Optional[datetime] = Field(None, description=SEND_AT_DESCRIPTION)
     card_type: str
     merchant_name: str
     document_type: str
     pdf_url: HttpUrl = Field(..., description="URL to the PDF document that will be attached in the header")
+    pdf_media_id: Optional[str] = Field(
+        None, description="Graph API media id of an uploaded PDF, sent instead of pdf_url. Filled in automatically when media caching is on"
+    )
 
 class AccountCreatedTemplateRequest(BaseModel):
     """Request model for account creation template"""
     to_number: str
     template_name: str = "account_created"
+    language: Optional[str] = Field(None, description="Template language code")
+    send_at: Optional[datetime] = Field(None, description=SEND_AT_DESCRIPTION)
     name: str
     verification_type: str  # e.g., "email", "phone number"
 
@@ -49,6 +63,7 @@ class MessageRequest(BaseModel):
     message_type: str = "template"  # Default to template type
     template: Template
     message: Optional[str] = None  # Keep this for backward compatibility
+    send_at: Optional[datetime] = Field(None, description=SEND_AT_DESCRIPTION)
 
 class MessageResponse(BaseModel):
     """Schema for message response."""
@@ -56,3 +71,114 @@ class MessageResponse(BaseModel):
     message_id: Optional[str] = Field(None, description="WhatsApp message ID if successful")
     status: str = Field(..., description="Status of the message (sent, failed, etc.)")
     error: Optional[str] = Field(None, description="Error message if any")
+
+
+class SendJobResponse(BaseModel):
+    """Schema for a queued (asynchronous) send job."""
+    job_id: str = Field(..., description="Identifier of the queued send job")
+    status: str = Field(..., description="Job status (queued, processing, sent, failed)")
+    attempts: int = Field(0, description="Number of times a worker picked up the job")
+    message_id: Optional[str] = Field(None, description="WhatsApp message ID once sent")
+    error: Optional[str] = Field(None, description="Error message if the send failed")
+    status_code: Optional[int] = Field(None, description="HTTP status code of the final send attempt")
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+class ScheduledSendResponse(BaseModel):
+    """Schema for a send scheduled with ``send_at``."""
+    schedule_id: str = Field(..., description="Identifier of the scheduled send, used to cancel it")
+    status: str = Field(..., description="scheduled, processing, sent, failed or cancelled")
+    send_at: datetime
+    attempts: int = 0
+    message_id: Optional[str] = Field(None, description="WhatsApp message ID once sent")
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+class MessageStatusEvent(BaseModel):
+    """A delivery status reported by the WhatsApp webhook."""
+    status: str = Field(..., description="sent, delivered, read or failed")
+    timestamp: int = Field(..., description="Unix time reported by WhatsApp")
+    recipient_id: Optional[str] = None
+    error: Optional[str] = Field(None, description="JSON-encoded error details for failed messages")
+
+class SentMessageRecord(BaseModel):
+    """A send recorded in the status store."""
+    message_id: Optional[str] = Field(None, description="WhatsApp message ID; empty for failed sends")
+    to_number: str
+    template_name: str
+    status: str = Field(..., description="sent, failed or suppressed at send time, then the latest webhook status")
+    status_code: Optional[int] = Field(None, description="HTTP status code returned for the send")
+    error: Optional[str] = None
+    latency_ms: int = Field(..., description="Time spent calling the Graph API, including retries")
+    created_at: float = Field(..., description="Unix time of the send")
+    updated_at: float = Field(..., description="Unix time of the last status change")
+
+class SentMessagePage(BaseModel):
+    """One page of send records, newest first."""
+    items: List[SentMessageRecord]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
+
+class MessageStatusHistory(BaseModel):
+    """Status history of a sent message, oldest first."""
+    message_id: str
+    send: Optional[SentMessageRecord] = Field(None, description="The recorded send, if it went through this service")
+    statuses: List[MessageStatusEvent]
+
+class SuppressionUpdateRequest(BaseModel):
+    """Numbers to add to or remove from the suppression list."""
+    numbers: List[str] = Field(..., min_length=1, description="Recipient numbers in any accepted format")
+
+class SuppressionUpdateResponse(BaseModel):
+    """Result of a suppression list update."""
+    updated: int = Field(..., description="Numbers added or removed")
+    invalid: List[int] = Field(default_factory=list, description="Indexes of numbers that are not valid E.164")
+
+class SuppressionStatus(BaseModel):
+    """Whether a recipient is suppressed."""
+    to_number: str = Field(..., description="The number in E.164 form")
+    suppressed: bool
+
+class MediaUploadResponse(BaseModel):
+    """A document uploaded to the Graph API."""
+    media_id: str = Field(..., description="Graph API media id, usable as pdf_media_id")
+    sha256: str = Field(..., description="Content hash; re-uploading the same bytes returns the same id")
+
+# Batch send models
+class BatchRecipient(BaseModel):
+    """A single recipient in a batch send, with its own template parameters"""
+    to_number: str
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Template-specific fields for this recipient (e.g. name, verification_type)"
+    )
+
+class BatchMessageRequest(BaseModel):
+    """
+    Request model for sending one template to many recipients.
+
+    ``template_name`` selects the request model each recipient is validated
+    against: hello_world, order_confirm and account_created use their
+    dedicated models, any other name is sent through the generic
+    ``MessageRequest`` using ``template``.
+    """
+    template_name: str
+    template: Optional[Template] = Field(None, description="Template definition for generic templates")
+    recipients: List[BatchRecipient] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(
+        None, ge=1, description="Maximum parallel sends; capped by BATCH_MAX_CONCURRENCY"
+    )
+
+class BatchItemResult(MessageResponse):
+    """Per-recipient outcome of a batch send."""
+    index: int = Field(..., description="Position of the recipient in the request")
+    to_number: str
+    status_code: int = Field(..., description="HTTP status code the single-send endpoint would have returned")
+
+class BatchMessageResponse(BaseModel):
+    """Schema for batch send response."""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
@@ -0,0 +1,294 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from app.config import settings
+from app.logger import logger
+from app.schemas import (
+    MessageRequest,
+    HelloWorldTemplateRequest,
+    OrderConfirmTemplateRequest,
+    AccountCreatedTemplateRequest
+)
+
+# Request models that can be queued, keyed by the name stored with each job
+QUEUEABLE_MODELS = {
+    model.__name__: model
+    for model in (
+        MessageRequest,
+        HelloWorldTemplateRequest,
+        OrderConfirmTemplateRequest,
+        AccountCreatedTemplateRequest
+    )
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS send_jobs (
+    id TEXT PRIMARY KEY,
+    client_id TEXT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message_id TEXT,
+    error TEXT,
+    status_code INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_send_jobs_status_created ON send_jobs (status, created_at);
+"""
+
+
+class SendQueue:
+    """
+    Durable local send queue backed by SQLite in WAL mode.
+
+    Jobs are written to disk before the API answers 202, and a pool of
+    asyncio workers drains them through ``send_whatsapp_message``. A job is
+    claimed with a conditional UPDATE, so processes sharing the database
+    never pick up the same job. A claim is a lease: jobs still in
+    ``processing`` ``lease_seconds`` after they were claimed (their worker
+    crashed or was killed) are re-queued, so delivery is at-least-once.
+    Finished jobs are deleted after ``retention_seconds``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+        retention_seconds: float = 30 * 86400
+    ):
+        self.path = path
+        self.worker_count = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self._next_cleanup = 0.0
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Queues created before jobs were scoped to the client that queued them
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(send_jobs)")}
+        if "client_id" not in columns:
+            self._conn.execute("ALTER TABLE send_jobs ADD COLUMN client_id TEXT")
+
+    def close(self) -> None:
+        # Cancelled workers do not stop a storage call already running in a thread
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Blocking storage operations, run in a thread from the async API
+
+    def _insert(self, job_id: str, client_id: Optional[str], kind: str, payload: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO send_jobs (id, client_id, kind, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, client_id, kind, payload, now, now)
+            )
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        with self._lock:
+            candidates = self._conn.execute(
+                "SELECT id, client_id, kind, payload FROM send_jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 8"
+            ).fetchall()
+            for row in candidates:
+                # Another process may have claimed it since the SELECT
+                claimed = self._conn.execute(
+                    "UPDATE send_jobs SET status = 'processing', attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (time.time(), row["id"])
+                ).rowcount
+                if claimed:
+                    return row
+            return None
+
+    def _recover(self) -> int:
+        """Re-queue jobs whose lease expired without the job finishing."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE send_jobs SET status = 'queued', updated_at = ? "
+                "WHERE status = 'processing' AND updated_at < ?",
+                (time.time(), time.time() - self.lease_seconds)
+            ).rowcount
+
+    def _release(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE send_jobs SET status = 'queued', updated_at = ? WHERE id = ? AND status = 'processing'",
+                (time.time(), job_id)
+            )
+
+    def _cleanup(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM send_jobs WHERE status IN ('sent', 'failed') AND updated_at < ?",
+                (time.time() - self.retention_seconds,)
+            ).rowcount
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        message_id: Optional[str] = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE send_jobs SET status = ?, message_id = ?, error = ?, status_code = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, message_id, error, status_code, time.time(), job_id)
+            )
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, client_id, status, attempts, message_id, error, status_code, created_at, updated_at "
+                "FROM send_jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM send_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # Async API
+
+    async def enqueue(self, message: Any, client_id: Optional[str] = None) -> str:
+        """Persist a validated request, owned by ``client_id``, and return its job id."""
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self._insert, job_id, client_id, type(message).__name__, message.model_dump_json()
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self._counts)
+        return {"workers": len(self._workers), "jobs": counts}
+
+    async def _process(self, row: sqlite3.Row) -> None:
+        # Imported here to avoid a circular import with app.services
+        from app.services import send_whatsapp_message
+
+        job_id = row["id"]
+        try:
+            message = QUEUEABLE_MODELS[row["kind"]].model_validate_json(row["payload"])
+            response = await send_whatsapp_message(message, client_id=row["client_id"])
+            message_id = response.get("messages", [{}])[0].get("id")
+            await asyncio.to_thread(self._finish, job_id, "sent", message_id, None, 200)
+        except asyncio.CancelledError:
+            # Shutting down mid-send: hand the job back instead of waiting out the lease
+            self._release(job_id)
+            raise
+        except HTTPException as e:
+            await asyncio.to_thread(self._finish, job_id, "failed", None, str(e.detail), e.status_code)
+        except Exception as e:
+            logger.error("Unexpected error processing send job %s: %s", job_id, e)
+            await asyncio.to_thread(self._finish, job_id, "failed", None, str(e), 500)
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                recovered = await asyncio.to_thread(self._recover)
+                if recovered:
+                    logger.warning("Re-queued %s send jobs whose worker stopped before finishing", recovered)
+                    self._wakeup.set()
+                if time.monotonic() >= self._next_cleanup:
+                    self._next_cleanup = time.monotonic() + 3600
+                    removed = await asyncio.to_thread(self._cleanup)
+                    if removed:
+                        logger.info("Removed %s finished send jobs", removed)
+            except Exception as e:
+                logger.error("Send queue maintenance failed: %s", e)
+            await asyncio.sleep(min(self.lease_seconds / 2, 60))
+
+    async def _worker(self) -> None:
+        while True:
+            row = await asyncio.to_thread(self._claim)
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(row)
+
+    async def start(self) -> None:
+        self.open()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._maintenance = asyncio.create_task(self._maintain())
+        logger.info("Send queue started with %s workers (%s)", self.worker_count, self.path)
+
+    async def stop(self) -> None:
+        tasks = self._workers + [self._maintenance]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._maintenance = None
+        self.close()
+        logger.info("Send queue stopped")
+
+
+_queue: Optional[SendQueue] = None
+
+
+async def start_send_queue() -> SendQueue:
+    """Open the queue and start its workers. Called from the application lifespan."""
+    global _queue
+    if _queue is None:
+        _queue = SendQueue(
+            settings.SEND_QUEUE_PATH,
+            workers=settings.SEND_QUEUE_WORKERS,
+            poll_interval=settings.SEND_QUEUE_POLL_INTERVAL,
+            lease_seconds=settings.SEND_QUEUE_LEASE_SECONDS,
+            retention_seconds=settings.STATUS_RETENTION_DAYS * 86400
+        )
+        await _queue.start()
+    return _queue
+
+
+async def stop_send_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
+
+
+def get_send_queue() -> Optional[SendQueue]:
+    """Return the running queue, or None when async sending is disabled."""
+    return _queue
@@ -0,0 +1,320 @@
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.config import Settings, settings, settings_store
+from app.circuit_breaker import circuit_breakers
+from app.logger import logger
+from app.metrics import SENDER_SENDS
+from app.payloads import graph_endpoint
+from app.throttle import get_outbound_throttle
+
+# Graph API error codes meaning the sending number itself is over its limits
+# (131056, the pair rate limit, is about one recipient and does not count)
+THROTTLE_GRAPH_CODES = {
+    4,       # API Too Many Calls
+    80007,   # Rate limit issues
+    130429,  # Cloud API message throughput reached
+}
+
+SELECTION_STRATEGIES = ("least_loaded", "weighted_round_robin")
+
+
+class RateMeter:
+    """Exponentially decaying event rate (events per second over roughly ``window`` seconds)."""
+
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self.value = 0.0
+        self.updated = time.monotonic()
+
+    def _decay(self, now: float) -> None:
+        self.value *= math.exp(-(now - self.updated) / self.window)
+        self.updated = now
+
+    def mark(self) -> None:
+        self._decay(time.monotonic())
+        self.value += 1 / self.window
+
+    def rate(self) -> float:
+        self._decay(time.monotonic())
+        return self.value
+
+
+class Sender:
+    """A WhatsApp business phone number the service can send from."""
+
+    def __init__(self, phone_number_id: str, token: str, capacity: float, weight: Optional[float] = None):
+        self.phone_number_id = phone_number_id
+        self.token = token
+        # Messages per second this number may send (its throughput tier)
+        self.capacity = capacity
+        self.weight = weight if weight is not None else capacity
+        self.url, self.headers = graph_endpoint(settings.GRAPH_API_BASE_URL, phone_number_id, token)
+
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        # Smooth weighted round-robin state
+        self.current_weight = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+        self.throughput = RateMeter()
+        self.errors = RateMeter()
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / self.capacity
+
+    def available(self, now: float) -> bool:
+        """In rotation: not cooling down after throttling and its circuit is not open."""
+        if now < self.cooldown_until:
+            return False
+        return not (settings.CIRCUIT_BREAKER_ENABLED and circuit_breakers.is_open("messages", self.phone_number_id))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "capacity_per_second": self.capacity,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "available": self.available(now),
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 3),
+            "sent": self.sent,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "throughput_per_second": round(self.throughput.rate(), 3),
+            "errors_per_second": round(self.errors.rate(), 3),
+        }
+
+
+class SenderPool:
+    """
+    Spreads sends over several phone numbers.
+
+    Each send picks the least-loaded number (in-flight sends relative to
+    capacity) or the next one by smooth weighted round-robin. A recipient
+    keeps being served by the number it was first sent from while that
+    number is available (sticky routing, remembered for the last
+    ``sticky_size`` recipients), so conversations stay on one number. A
+    number that reports throttling is taken out of rotation for
+    ``cooldown_seconds`` (or the server's Retry-After, if longer).
+    """
+
+    def __init__(
+        self,
+        senders: List[Sender],
+        strategy: str = "least_loaded",
+        sticky: bool = True,
+        sticky_size: int = 100000,
+        cooldown_seconds: float = 60.0
+    ):
+        if not senders:
+            raise ValueError("A sender pool needs at least one sender")
+        if strategy not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown sender selection strategy '{strategy}' (use {' or '.join(SELECTION_STRATEGIES)})")
+        self.senders = senders
+        self.by_id = {sender.phone_number_id: sender for sender in senders}
+        self.strategy = strategy
+        self.sticky = sticky
+        self.sticky_size = sticky_size
+        self.cooldown_seconds = cooldown_seconds
+        # recipient -> phone_number_id, least recently used first
+        self._routes: "OrderedDict[str, str]" = OrderedDict()
+
+        self.rerouted = 0
+        self.all_unavailable = 0
+
+    @property
+    def primary(self) -> Sender:
+        return self.senders[0]
+
+    def _pick(self, candidates: List[Sender]) -> Sender:
+        if self.strategy == "least_loaded" or len(candidates) == 1:
+            return min(candidates, key=lambda sender: sender.load)
+        total = 0.0
+        chosen = None
+        for sender in candidates:
+            sender.current_weight += sender.weight
+            total += sender.weight
+            if chosen is None or sender.current_weight > chosen.current_weight:
+                chosen = sender
+        chosen.current_weight -= total
+        return chosen
+
+    def select(self, recipient: str, exclude: Optional[Sender] = None) -> Sender:
+        """
+        Choose the number to send to ``recipient`` from and count the send as in flight.
+
+        ``exclude`` skips a number that just failed, unless it is the only one available.
+        Always returns a sender: if no number is available, the one whose
+        cooldown ends first is used and its throttle and breaker decide.
+        """
+        now = time.monotonic()
+        if self.sticky:
+            phone_number_id = self._routes.get(recipient)
+            if phone_number_id is not None:
+                sender = self.by_id.get(phone_number_id)
+                if sender is not None and sender is not exclude and sender.available(now):
+                    self._routes.move_to_end(recipient)
+                    sender.in_flight += 1
+                    return sender
+                self.rerouted += 1
+
+        candidates = [sender for sender in self.senders if sender.available(now)]
+        if exclude in candidates and len(candidates) > 1:
+            candidates.remove(exclude)
+        if candidates:
+            sender = self._pick(candidates)
+        else:
+            self.all_unavailable += 1
+            sender = min(self.senders, key=lambda sender: sender.cooldown_until)
+
+        if self.sticky:
+            self._routes[recipient] = sender.phone_number_id
+            self._routes.move_to_end(recipient)
+            while len(self._routes) > self.sticky_size:
+                self._routes.popitem(last=False)
+        sender.in_flight += 1
+        return sender
+
+    def replace(self, senders: List[Sender]) -> None:
+        """
+        Swap in a new list of senders, e.g. after a token rotation.
+
+        Numbers whose token, capacity, weight and endpoint are unchanged keep
+        their existing Sender, with its counters and any cooldown; sends in
+        flight on a replaced Sender finish on it.
+        """
+        if not senders:
+            raise ValueError("A sender pool needs at least one sender")
+        kept = []
+        for sender in senders:
+            current = self.by_id.get(sender.phone_number_id)
+            unchanged = current is not None and (current.token, current.capacity, current.weight, current.url) == (
+                sender.token, sender.capacity, sender.weight, sender.url
+            )
+            kept.append(current if unchanged else sender)
+        self.senders = kept
+        self.by_id = {sender.phone_number_id: sender for sender in kept}
+
+    def available(self, exclude: Optional[Sender] = None) -> int:
+        """Number of senders in rotation, not counting ``exclude``."""
+        now = time.monotonic()
+        return sum(1 for sender in self.senders if sender is not exclude and sender.available(now))
+
+    def release(self, sender: Sender, success: Optional[bool]) -> None:
+        """
+        Record the outcome of a send started with ``select``; ``success`` is
+        None when no Graph API call was made (e.g. the local throttle refused).
+        """
+        sender.in_flight -= 1
+        if success is None:
+            return
+        if success:
+            sender.sent += 1
+            sender.throughput.mark()
+        else:
+            sender.failed += 1
+            sender.errors.mark()
+        SENDER_SENDS.inc(sender.phone_number_id, "sent" if success else "failed")
+
+    def mark_throttled(self, sender: Sender, retry_after: Optional[float] = None) -> None:
+        """Take ``sender`` out of rotation after the Graph API throttled it."""
+        sender.throttled += 1
+        SENDER_SENDS.inc(sender.phone_number_id, "throttled")
+        cooldown = max(self.cooldown_seconds, retry_after or 0.0)
+        sender.cooldown_until = time.monotonic() + cooldown
+        logger.warning("Sender %s throttled; out of rotation for %.0fs", sender.phone_number_id, cooldown)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "sticky_routes": len(self._routes),
+            "rerouted": self.rerouted,
+            "all_unavailable": self.all_unavailable,
+            "senders": {sender.phone_number_id: sender.stats() for sender in self.senders},
+        }
+
+
+def load_senders(path: str) -> List[Sender]:
+    """
+    Read senders from a JSON file: a list (or ``{"senders": [...]}``) of
+    ``{"phone_number_id", "token" or "token_env", "capacity", "weight"}``.
+    ``token_env`` names an environment variable holding the token, so the
+    file can be committed without secrets.
+
+    Raises:
+        ValueError: If a capacity is not positive or a weight is negative
+    """
+    with open(path) as f:
+        data = json.load(f)
+    entries: List[Dict[str, Any]] = data["senders"] if isinstance(data, dict) else data
+    senders = []
+    for entry in entries:
+        phone_number_id = str(entry["phone_number_id"])
+        token = entry["token"] if "token" in entry else os.environ[entry["token_env"]]
+        capacity = float(entry.get("capacity", settings.OUTBOUND_RATE_PER_SECOND))
+        weight = entry.get("weight")
+        if not capacity > 0:
+            raise ValueError(f"sender {phone_number_id}: capacity must be greater than 0, got {capacity:g}")
+        if weight is not None:
+            weight = float(weight)
+            if not weight >= 0:
+                raise ValueError(f"sender {phone_number_id}: weight must be at least 0, got {weight:g}")
+        senders.append(Sender(phone_number_id=phone_number_id, token=token, capacity=capacity, weight=weight))
+    return senders
+
+
+def _configured_senders(config: Settings) -> List[Sender]:
+    senders = None
+    if config.SENDERS_FILE:
+        try:
+            senders = load_senders(config.SENDERS_FILE)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Could not load senders from %s (%s); using PHONE_NUMBER_ID only", config.SENDERS_FILE, e)
+    if senders:
+        throttle = get_outbound_throttle()
+        for sender in senders:
+            throttle.configure(sender.phone_number_id, sender.capacity)
+        return senders
+    return [Sender(config.WHATSAPP_PHONE_NUMBER_ID, config.WHATSAPP_API_TOKEN, config.OUTBOUND_RATE_PER_SECOND)]
+
+
+def _create_pool() -> SenderPool:
+    return SenderPool(
+        _configured_senders(settings_store.current),
+        strategy=settings.SENDER_SELECTION,
+        sticky=settings.SENDER_STICKY,
+        sticky_size=settings.SENDER_STICKY_SIZE,
+        cooldown_seconds=settings.SENDER_COOLDOWN_SECONDS
+    )
+
+
+_sender_pool: Optional[SenderPool] = None
+
+
+def get_sender_pool() -> SenderPool:
+    """
+    Return the shared pool, reading SENDERS_FILE the first time it is needed.
+    """
+    global _sender_pool
+    if _sender_pool is None:
+        _sender_pool = _create_pool()
+    return _sender_pool
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _sender_pool is None:
+        return
+    _sender_pool.strategy = new.SENDER_SELECTION
+    _sender_pool.sticky = new.SENDER_STICKY
+    _sender_pool.sticky_size = new.SENDER_STICKY_SIZE
+    _sender_pool.cooldown_seconds = new.SENDER_COOLDOWN_SECONDS
+    # Re-reads SENDERS_FILE too, so tokens can be rotated without a restart
+    _sender_pool.replace(_configured_senders(new))
@@ -1,17 +1,91 @@
 import httpx
 from app.config import settings
+from app.http_client import GraphHTTPClient, get_http_client
+from app.throttle import get_outbound_throttle
+from app.retry import RETRYABLE_REQUEST_ERRORS, classify_response, graph_error_code, get_retry_policy, retry_stats
+from app.circuit_breaker import circuit_breakers
+from app.payloads import build_payload, get_template_name, parameter_counts, requested_language
+from app.senders import THROTTLE_GRAPH_CODES, Sender, get_sender_pool
+from app.template_catalog import get_template_catalog, template_label, template_language
+from app.status_store import record_send
+from app.suppression import get_suppression_list, number_key
+from app.metrics import STAGE_LATENCY, SUPPRESSED_SENDS, UPSTREAM_LATENCY
+import asyncio
+import time
 from app.schemas import (
     MessageRequest, 
     HelloWorldTemplateRequest,
     OrderConfirmTemplateRequest,
     AccountCreatedTemplateRequest,
-    TemplateComponent,
-    TemplateParameter
+    BatchMessageRequest,
+    BatchRecipient,
+    BatchItemResult
 )
 from app.logger import logger
-from app.utils.validators import validate_phone_number
+from app.media import get_media_cache
+from app.dispatcher import get_recipient_dispatcher
+from app.idempotency import fingerprint
+from app.utils.phone import graph_number, normalize_phone_number, normalize_phone_numbers
 from fastapi import HTTPException
-from typing import Dict, Any, Union
+from pydantic import ValidationError
+from typing import Callable, Dict, Any, List, Optional, Union
+
+SendableMessage = Union[
+    MessageRequest,
+    HelloWorldTemplateRequest,
+    OrderConfirmTemplateRequest,
+    AccountCreatedTemplateRequest
+]
+
+INVALID_PHONE_NUMBER_DETAIL = "Invalid phone number format. Use international format (e.g., +1234567890)"
+SUPPRESSED_DETAIL = "Recipient is on the suppression list"
+
+# Request models used to validate per-recipient parameters in batch sends
+BATCH_TEMPLATE_MODELS = {
+    "hello_world": HelloWorldTemplateRequest,
+    "order_confirm": OrderConfirmTemplateRequest,
+    "account_created": AccountCreatedTemplateRequest,
+}
+
+def check_template(message: SendableMessage, template_name: str) -> str:
+    """
+    Resolve the template language and check the send against the template catalog.
+    
+    Returns:
+        str: The language code to send the template in
+        
+    Raises:
+        HTTPException: 422 if Meta would reject the template, language or parameter counts
+    """
+    language = template_language(template_name, requested_language(message))
+    catalog = get_template_catalog()
+    if catalog is not None:
+        error = catalog.check(template_name, language, parameter_counts(message))
+        if error:
+            logger.warning("Rejected send of template %s: %s", template_name, error)
+            raise HTTPException(status_code=422, detail=error)
+    return language
+
+async def _attach_media(message: SendableMessage, client: Optional[GraphHTTPClient] = None) -> SendableMessage:
+    """
+    Reference the order confirmation PDF by uploaded media id instead of by link.
+    
+    The document is uploaded once and the id reused for every recipient, so
+    Meta no longer fetches it from our origin per message. If the upload
+    fails the message is sent with the link as before.
+    """
+    if (
+        not settings.MEDIA_CACHE_ENABLED
+        or not isinstance(message, OrderConfirmTemplateRequest)
+        or message.pdf_media_id
+    ):
+        return message
+    started = time.perf_counter()
+    media_id = await get_media_cache().media_id_for_url(str(message.pdf_url), client=client)
+    STAGE_LATENCY.observe(time.perf_counter() - started, "media")
+    if media_id is None:
+        return message
+    return message.model_copy(update={"pdf_media_id": media_id})
 
 async def send_whatsapp_message(
     message: Union[
@@ -19,13 +93,17 @@ async def send_whatsapp_message(
         HelloWorldTemplateRequest,
         OrderConfirmTemplateRequest,
         AccountCreatedTemplateRequest
-    ]
+    ],
+    client: Optional[GraphHTTPClient] = None,
+    client_id: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Send a message using the WhatsApp Business API.
     
     Args:
         message: The message request containing recipient and template info
+        client: Pooled HTTP client to use; defaults to the shared client
+        client_id: API client the send is recorded under in the send log
         
     Returns:
         dict: Response from WhatsApp API
@@ -33,107 +111,332 @@ async def send_whatsapp_message(
     Raises:
         HTTPException: If validation fails or API request fails
     """
-    # Format and validate phone number
-    phone_number = message.to_number.strip()
-    if not phone_number.startswith('+'):
-        phone_number = '+' + phone_number
-        
-    if not validate_phone_number(phone_number):
-        logger.error(f"Invalid phone number format: {phone_number}")
+    # Normalize to E.164 once (cached for repeat recipients)
+    e164 = normalize_phone_number(message.to_number)
+    if e164 is None:
+        logger.error("Invalid phone number format: %s", message.to_number)
         raise HTTPException(
             status_code=422,
-            detail="Invalid phone number format. Use international format (e.g., +1234567890)"
+            detail=INVALID_PHONE_NUMBER_DETAIL
+        )
+    
+    # The Graph API takes the number without the + prefix
+    phone_number = graph_number(e164)
+    
+    if not settings.RECIPIENT_ORDERING_ENABLED:
+        return await _send_to_recipient(message, phone_number, client, client_id)
+    # Sends to one recipient go out in arrival order; one client's exact duplicates share one send
+    return await get_recipient_dispatcher().submit(
+        phone_number,
+        lambda: _send_to_recipient(message, phone_number, client, client_id),
+        (client_id, fingerprint(message)) if settings.DUPLICATE_WINDOW_SECONDS > 0 else None
+    )
+
+async def _send_to_recipient(
+    message: SendableMessage,
+    phone_number: str,
+    client: Optional[GraphHTTPClient] = None,
+    client_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Check and send ``message`` to an already normalized recipient number."""
+    validation_started = time.perf_counter()
+    
+    template_name = get_template_name(message)
+    language = check_template(message, template_name)
+    
+    # Opted-out recipients never reach the Graph API
+    suppression_list = get_suppression_list()
+    if suppression_list is not None and suppression_list.check(number_key(phone_number)):
+        SUPPRESSED_SENDS.inc(template_label(template_name))
+        logger.info("Suppressed send of %s to %s", template_name, phone_number, sampled=True)
+        record_send(
+            None, phone_number, template_name, "suppressed", 0.0,
+            status_code=403, error=SUPPRESSED_DETAIL, client_id=client_id
         )
+        raise HTTPException(status_code=403, detail=SUPPRESSED_DETAIL)
+    
+    STAGE_LATENCY.observe(time.perf_counter() - validation_started, "validation")
     
-    # Remove the + prefix for WhatsApp API
-    phone_number = phone_number[1:] if phone_number.startswith('+') else phone_number
-    
-    # Construct the API URL using v12.0 as per the example
-    url = f"https://graph.facebook.com/v12.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
-    
-    headers = {
-        "Authorization": f"Bearer {settings.WHATSAPP_API_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
-    # Base payload
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": getattr(message, "template_name", None) or message.template.name,
-            "language": {
-                "code": "en_US"
-            }
-        }
-    }
-    
-    # Add template-specific components
-    if isinstance(message, OrderConfirmTemplateRequest):
-        # Add both header (PDF) and body components
-        payload["template"]["components"] = [
-            {
-                "type": "header",
-                "parameters": [
-                    {
-                        "type": "document",
-                        "document": {
-                            "link": str(message.pdf_url)
-                        }
-                    }
-                ]
-            },
-            {
-                "type": "body",
-                "parameters": [
-                    {"type": "text", "text": message.card_type},
-                    {"type": "text", "text": message.merchant_name},
-                    {"type": "text", "text": message.document_type}
-                ]
-            }
-        ]
-    elif isinstance(message, AccountCreatedTemplateRequest):
-        payload["template"]["components"] = [{
-            "type": "body",
-            "parameters": [
-                {"type": "text", "text": message.name},
-                {"type": "text", "text": message.verification_type}
-            ]
-        }]
-    elif isinstance(message, MessageRequest) and message.template.components:
-        payload["template"]["components"] = message.template.components
+    message = await _attach_media(message, client)
     
+    # Ready-to-send JSON from the template's registered builder
+    body = build_payload(message, phone_number, language)
+    
+    # Every outcome goes to the send log; latency includes throttling and retries
+    started = time.perf_counter()
+    try:
+        response_data = await _send_payload(client, body, template_name, phone_number)
+    except HTTPException as e:
+        record_send(
+            None, phone_number, template_name, "failed", time.perf_counter() - started,
+            status_code=e.status_code, error=str(e.detail), client_id=client_id
+        )
+        raise
+    record_send(
+        response_data.get("messages", [{}])[0].get("id"), phone_number, template_name,
+        "sent", time.perf_counter() - started, status_code=200, client_id=client_id
+    )
+    return response_data
+
+
+async def _send_payload(
+    client: Optional[GraphHTTPClient],
+    body: bytes,
+    template_name: str,
+    phone_number: str
+) -> Dict[str, Any]:
+    """Send a built payload, mapping transport and unexpected errors to HTTPException."""
     try:
-        logger.info(f"Sending WhatsApp template message to {phone_number}")
-        logger.debug(f"Using template: {payload['template']['name']}")
-        logger.debug(f"Request payload: {payload}")
+        logger.info("Sending WhatsApp template message to %s", phone_number, sampled=True)
+        logger.debug("Using template: %s", template_name)
+        logger.debug("Request payload: %s", body)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            
-            if response.status_code != 200:
-                error_detail = response.json() if response.text else "No error details available"
-                logger.error(f"WhatsApp API request failed: {error_detail}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"WhatsApp API request failed: {error_detail}"
-                )
-            
-            response_data = response.json()
-            logger.info(f"Successfully sent template message to {phone_number}")
-            logger.debug(f"WhatsApp API response: {response_data}")
-            return response_data
+        # Reuse the pooled client instead of opening a new connection per send
+        client = client or get_http_client()
+        response_data = await _post_with_retry(client, body, template_name, phone_number)
+        logger.info("Successfully sent template message to %s", phone_number, sampled=True)
+        logger.debug("WhatsApp API response: %s", response_data)
+        return response_data
             
+    except HTTPException:
+        raise
     except httpx.RequestError as e:
-        logger.error(f"Failed to send request: {str(e)}")
+        logger.error("Failed to send request: %s", e)
         raise HTTPException(
             status_code=503,
             detail=f"Service unavailable: {str(e)}"
         )
     except Exception as e:
-        logger.error(f"Unexpected error while sending message: {str(e)}")
+        logger.error("Unexpected error while sending message: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Internal server error while sending message"
         )
+
+
+async def _post_with_retry(
+    client: GraphHTTPClient,
+    body: bytes,
+    template_name: str,
+    phone_number: str
+) -> Dict[str, Any]:
+    """
+    POST a prebuilt JSON body to the Graph API, retrying transient failures.
+    
+    Each attempt goes out from a number chosen by the sender pool. Retryable
+    Graph errors and connection failures are retried with capped exponential
+    backoff and full jitter (or the server's Retry-After) until
+    RETRY_MAX_ATTEMPTS or the RETRY_DEADLINE_SECONDS budget runs out. A
+    number the Graph API throttles is taken out of rotation and the retry
+    goes out at once from another number, if there is one.
+    
+    Returns:
+        dict: Response from WhatsApp API
+        
+    Raises:
+        HTTPException: If the final attempt fails with an error response
+        httpx.RequestError: If the final attempt fails at the transport level
+    """
+    # Metrics and retry counters are labelled with a bounded set of names
+    label = template_label(template_name)
+    retry_policy = get_retry_policy()
+    sender_pool = get_sender_pool()
+    outbound_throttle = get_outbound_throttle()
+    deadline = time.monotonic() + retry_policy.deadline
+    attempt = 0
+    failed_sender: Optional[Sender] = None
+    while True:
+        attempt += 1
+        retry_stats.record(label, "attempts")
+        
+        # Sending number for this attempt; its URL and auth headers are built once (see GRAPH_API_BASE_URL)
+        sender = sender_pool.select(phone_number, exclude=failed_sender)
+        success: Optional[bool] = None
+        try:
+            # Pace sends to the phone number's throughput tier instead of tripping 429s upstream
+            if settings.OUTBOUND_THROTTLE_ENABLED:
+                max_wait = min(settings.OUTBOUND_MAX_WAIT_SECONDS, max(0.0, deadline - time.monotonic()))
+                queue_wait = await outbound_throttle.acquire(sender.phone_number_id, max_wait=max_wait)
+                if queue_wait:
+                    logger.debug("Waited %.1f ms for outbound send capacity", queue_wait * 1000)
+            
+            # Fail fast while the Graph API is known to be unhealthy
+            breaker = circuit_breakers.get("messages", sender.phone_number_id) \
+                if settings.CIRCUIT_BREAKER_ENABLED else None
+            if breaker:
+                breaker.before_call()
+            
+            retry_after = None
+            start = time.monotonic()
+            success = False
+            try:
+                response = await client.post(sender.url, content=body, headers=sender.headers)
+            except RETRYABLE_REQUEST_ERRORS as e:
+                elapsed = time.monotonic() - start
+                UPSTREAM_LATENCY.observe(elapsed, label, "error")
+                if breaker:
+                    breaker.record(False, elapsed)
+                failure: Union[httpx.Response, Exception] = e
+            except httpx.RequestError:
+                elapsed = time.monotonic() - start
+                UPSTREAM_LATENCY.observe(elapsed, label, "error")
+                if breaker:
+                    breaker.record(False, elapsed)
+                raise
+            except BaseException:
+                if breaker:
+                    breaker.release()
+                raise
+            else:
+                elapsed = time.monotonic() - start
+                UPSTREAM_LATENCY.observe(elapsed, label, str(response.status_code))
+                if breaker:
+                    breaker.record(response.status_code < 500, elapsed)
+                if response.status_code == 200:
+                    success = True
+                    if attempt > 1:
+                        retry_stats.record(label, "recovered")
+                    return response.json()
+                failure = response
+                retryable, retry_after = classify_response(response)
+                if response.status_code == 429 or graph_error_code(response) in THROTTLE_GRAPH_CODES:
+                    sender_pool.mark_throttled(sender, retry_after)
+                    if sender_pool.available(exclude=sender):
+                        # Another number can take the retry right away
+                        retry_after = 0.0
+                if not retryable:
+                    _raise_for_response(response)
+        finally:
+            sender_pool.release(sender, success)
+        failed_sender = sender
+        
+        delay = retry_policy.backoff(attempt, retry_after)
+        if attempt >= retry_policy.max_attempts or time.monotonic() + delay >= deadline:
+            retry_stats.record(label, "exhausted")
+            if isinstance(failure, Exception):
+                raise failure
+            _raise_for_response(failure)
+        
+        retry_stats.record(label, "retries")
+        logger.warning(
+            "Graph API attempt %s for template %s failed (%s); retrying in %.2fs",
+            attempt, template_name,
+            failure if isinstance(failure, Exception) else failure.status_code, delay
+        )
+        await asyncio.sleep(delay)
+
+def _raise_for_response(response: httpx.Response) -> None:
+    """Convert a failed Graph API response into an HTTPException."""
+    try:
+        error_detail = response.json() if response.text else "No error details available"
+    except ValueError:
+        error_detail = response.text
+    logger.error("WhatsApp API request failed: %s", error_detail)
+    raise HTTPException(
+        status_code=response.status_code,
+        detail=f"WhatsApp API request failed: {error_detail}"
+    )
+
+
+def build_batch_message(batch: BatchMessageRequest, recipient: BatchRecipient) -> SendableMessage:
+    """
+    Validate one batch recipient into the request model for the batch template.
+    
+    Raises:
+        ValidationError: If the recipient parameters do not fit the template model
+    """
+    data = {**recipient.parameters, "to_number": recipient.to_number}
+    model = BATCH_TEMPLATE_MODELS.get(batch.template_name)
+    if model is None:
+        model = MessageRequest
+        if "template" not in data:
+            data["template"] = (
+                batch.template.model_dump() if batch.template
+                else {"name": batch.template_name, "language": {}}
+            )
+    else:
+        data["template_name"] = batch.template_name
+    return model.model_validate(data)
+
+async def send_whatsapp_batch(
+    batch: BatchMessageRequest,
+    concurrency: int,
+    client: Optional[GraphHTTPClient] = None,
+    authorize: Optional[Callable[[SendableMessage], None]] = None,
+    client_id: Optional[str] = None
+) -> List[BatchItemResult]:
+    """
+    Fan a batch out through send_whatsapp_message with bounded concurrency.
+    
+    A fixed pool of ``concurrency`` workers pulls recipients in order, so the
+    number of live coroutines does not grow with the batch size. Failures are
+    captured per recipient instead of aborting the batch. Recipient numbers
+    are validated up front in one pass, so invalid ones never reach a worker.
+    
+    Args:
+        batch: The batch request
+        concurrency: Maximum number of sends in flight at once
+        client: Pooled HTTP client to use; defaults to the shared client
+        authorize: Called with each validated message before sending; raise
+            HTTPException to reject that recipient
+        client_id: API client the sends are recorded under in the send log
+        
+    Returns:
+        list: One BatchItemResult per recipient, in request order
+    """
+    results: List[Optional[BatchItemResult]] = [None] * len(batch.recipients)
+    invalid = normalize_phone_numbers([recipient.to_number for recipient in batch.recipients]).invalid
+    for index in invalid:
+        results[index] = BatchItemResult(
+            index=index,
+            to_number=batch.recipients[index].to_number,
+            success=False,
+            status="failed",
+            error=INVALID_PHONE_NUMBER_DETAIL,
+            status_code=422
+        )
+    skip = set(invalid)
+    pending = iter(
+        [(index, recipient) for index, recipient in enumerate(batch.recipients) if index not in skip]
+    )
+
+    async def send_one(index: int, recipient: BatchRecipient) -> BatchItemResult:
+        try:
+            message = build_batch_message(batch, recipient)
+            if authorize:
+                authorize(message)
+            response = await send_whatsapp_message(message, client=client, client_id=client_id)
+            return BatchItemResult(
+                index=index,
+                to_number=recipient.to_number,
+                success=True,
+                message_id=response.get("messages", [{}])[0].get("id"),
+                status="sent",
+                status_code=200
+            )
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            status_code = 422
+        except HTTPException as e:
+            error, status_code = str(e.detail), e.status_code
+        except Exception as e:
+            logger.error("Unexpected error in batch item %s: %s", index, e)
+            error, status_code = "Internal server error while sending message", 500
+        return BatchItemResult(
+            index=index,
+            to_number=recipient.to_number,
+            success=False,
+            status="failed",
+            error=error,
+            status_code=status_code
+        )
+
+    async def worker() -> None:
+        for index, recipient in pending:
+            results[index] = await send_one(index, recipient)
+
+    workers = min(concurrency, len(batch.recipients) - len(invalid))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return results
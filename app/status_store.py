@@ -0,0 +1,527 @@
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_status_events (
+    id INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    recipient_id TEXT,
+    error TEXT
+);
+-- Meta redelivers webhooks it considers unacknowledged; keep one row per status
+CREATE UNIQUE INDEX IF NOT EXISTS idx_status_events_message ON message_status_events (message_id, timestamp, status);
+
+CREATE TABLE IF NOT EXISTS inbound_messages (
+    message_id TEXT PRIMARY KEY,
+    from_number TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_status_events_time ON message_status_events (timestamp);
+CREATE INDEX IF NOT EXISTS idx_inbound_from ON inbound_messages (from_number, timestamp);
+
+-- One row per send attempt made through send_whatsapp_message. Times are
+-- integer milliseconds to keep rows and indexes small.
+CREATE TABLE IF NOT EXISTS sent_messages (
+    id INTEGER PRIMARY KEY,
+    message_id TEXT,
+    to_number TEXT NOT NULL,
+    template_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    status_code INTEGER,
+    error TEXT,
+    latency_ms INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    client_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sent_message_id ON sent_messages (message_id) WHERE message_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_sent_to_created ON sent_messages (to_number, created_at);
+CREATE INDEX IF NOT EXISTS idx_sent_template_created ON sent_messages (template_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_sent_created ON sent_messages (created_at);
+"""
+
+# Webhook statuses only move a send forward: status -> statuses it replaces
+STATUS_PRECEDENCE = {
+    "delivered": ("sent",),
+    "read": ("sent", "delivered"),
+    "failed": ("sent", "delivered"),
+}
+
+SEND_COLUMNS = (
+    "message_id, to_number, template_name, status, status_code, error, latency_ms, created_at, updated_at"
+)
+
+MAX_ERROR_LENGTH = 500
+
+
+class StatusStore:
+    """
+    Local SQLite (WAL) store of delivery statuses and inbound messages
+    received through the WhatsApp webhook.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Lets compaction hand freed pages back to the filesystem (new databases only)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Stores created before sends were scoped to the client that made them
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(sent_messages)")}
+        if "client_id" not in columns:
+            self._conn.execute("ALTER TABLE sent_messages ADD COLUMN client_id TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sent_client_created ON sent_messages (client_id, created_at)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        # A write or compaction cancelled on shutdown may still be running in a thread
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add_events(self, statuses: Iterable[Dict[str, Any]], inbound: Iterable[Dict[str, Any]]) -> None:
+        """Write a batch of status events and inbound messages in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO message_status_events (message_id, status, timestamp, recipient_id, error) "
+                "VALUES (:message_id, :status, :timestamp, :recipient_id, :error)",
+                statuses
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO inbound_messages (message_id, from_number, type, timestamp, body) "
+                "VALUES (:message_id, :from_number, :type, :timestamp, :body)",
+                inbound
+            )
+            for status, replaces in STATUS_PRECEDENCE.items():
+                updates = [
+                    (status, row["timestamp"] * 1000, row["message_id"])
+                    for row in statuses if row["status"] == status
+                ]
+                if updates:
+                    placeholders = ", ".join("?" * len(replaces))
+                    self._conn.executemany(
+                        f"UPDATE sent_messages SET status = ?, updated_at = ? "
+                        f"WHERE message_id = ? AND status IN ({placeholders})",
+                        [update + replaces for update in updates]
+                    )
+
+    def add_sends(self, sends: Iterable[Dict[str, Any]]) -> None:
+        """
+        Write a batch of send records in one transaction.
+
+        A webhook can report a status before the send record is written (the
+        recorder writes in batches, possibly in another worker); statuses
+        already stored for these messages are applied to the new records.
+        """
+        sends = list(sends)
+        message_ids = [(send["message_id"],) for send in sends if send["message_id"]]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO sent_messages ({SEND_COLUMNS}, client_id) VALUES "
+                "(:message_id, :to_number, :template_name, :status, :status_code, :error, "
+                ":latency_ms, :created_at, :updated_at, :client_id)",
+                sends
+            )
+            if not message_ids:
+                return
+            for status, replaces in STATUS_PRECEDENCE.items():
+                placeholders = ", ".join("?" * len(replaces))
+                self._conn.executemany(
+                    "UPDATE sent_messages SET status = ?, updated_at = ("
+                    "SELECT MAX(timestamp) * 1000 FROM message_status_events "
+                    "WHERE message_id = sent_messages.message_id AND status = ?"
+                    f") WHERE message_id = ? AND status IN ({placeholders}) AND EXISTS ("
+                    "SELECT 1 FROM message_status_events "
+                    "WHERE message_id = sent_messages.message_id AND status = ?)",
+                    [(status, status, message_id, *replaces, status) for (message_id,) in message_ids]
+                )
+
+    def get_send(self, message_id: str, client_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The latest record of ``message_id``; with ``client_id``, only if that client sent it."""
+        query = f"SELECT {SEND_COLUMNS} FROM sent_messages WHERE message_id = ?"
+        params: Tuple[Any, ...] = (message_id,)
+        if client_id is not None:
+            query += " AND client_id = ?"
+            params += (client_id,)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return _send_row(row) if row is not None else None
+
+    def query_sends(
+        self,
+        to_number: Optional[str] = None,
+        template_name: Optional[str] = None,
+        status: Optional[str] = None,
+        client_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Page through send records, newest first.
+
+        Args:
+            client_id: Only sends made by this client
+            since, until: Unix time bounds on when the send was made
+            cursor: ``next_cursor`` from the previous page
+
+        Returns:
+            tuple: (records, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        filters = (
+            ("to_number", to_number), ("template_name", template_name), ("status", status), ("client_id", client_id)
+        )
+        for column, value in filters:
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(int(since * 1000))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(int(until * 1000))
+        if cursor:
+            # Keyset pagination: resume strictly after the last row returned
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {SEND_COLUMNS} FROM sent_messages {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return [_send_row(row) for row in rows], next_cursor
+
+    def compact(self, cutoff: float) -> Dict[str, int]:
+        """
+        Delete records older than ``cutoff`` (Unix time) and reclaim the space.
+
+        Returns:
+            dict: Number of rows deleted per table
+        """
+        with self._lock:
+            with self._conn:
+                deleted = {
+                    "sent_messages": self._conn.execute(
+                        "DELETE FROM sent_messages WHERE created_at < ?", (int(cutoff * 1000),)
+                    ).rowcount,
+                    "status_events": self._conn.execute(
+                        "DELETE FROM message_status_events WHERE timestamp < ?", (int(cutoff),)
+                    ).rowcount,
+                    "inbound_messages": self._conn.execute(
+                        "DELETE FROM inbound_messages WHERE timestamp < ?", (int(cutoff),)
+                    ).rowcount,
+                }
+            self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return deleted
+
+    def history(self, message_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, timestamp, recipient_id, error FROM message_status_events "
+                "WHERE message_id = ? ORDER BY timestamp, id",
+                (message_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    async def get_history(self, message_id: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.history, message_id)
+
+
+def _send_row(row: sqlite3.Row) -> Dict[str, Any]:
+    record = {key: row[key] for key in SEND_COLUMNS.split(", ")}
+    record["created_at"] /= 1000
+    record["updated_at"] /= 1000
+    return record
+
+
+def encode_cursor(created_at: int, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        return int(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def drain_batch(queue: asyncio.Queue, batch_size: int, flush_interval: float) -> List[Any]:
+    """
+    Wait for one item, then collect more until ``batch_size`` items or
+    ``flush_interval`` seconds have passed.
+    """
+    batch = [await queue.get()]
+    deadline = time.monotonic() + flush_interval
+    while len(batch) < batch_size:
+        try:
+            batch.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+    return batch
+
+
+class SendRecorder:
+    """
+    Records every send in the status store without blocking the request.
+
+    Records go on a bounded queue and a background task writes them in
+    batches. A second task periodically drops data older than the retention
+    period so the database stays small.
+    """
+
+    def __init__(
+        self,
+        store: StatusStore,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        retention_seconds: float,
+        compact_interval: float
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self.compact_interval = compact_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.compactions = 0
+        self.compacted_rows = 0
+
+    def record(self, row: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self.recorded += 1
+
+    async def _write_loop(self) -> None:
+        while True:
+            batch = await drain_batch(self.queue, self.batch_size, self.flush_interval)
+            try:
+                await asyncio.to_thread(self.store.add_sends, batch)
+            except Exception as e:
+                self.write_errors += 1
+                logger.error("Failed to store %s send records: %s", len(batch), e)
+            else:
+                self.written += len(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def compact(self) -> Dict[str, int]:
+        deleted = await asyncio.to_thread(self.store.compact, time.time() - self.retention_seconds)
+        self.compactions += 1
+        self.compacted_rows += sum(deleted.values())
+        return deleted
+
+    async def _compact_loop(self) -> None:
+        while True:
+            try:
+                deleted = await self.compact()
+                if any(deleted.values()):
+                    logger.info("Status store compaction removed %s", deleted)
+            except Exception as e:
+                logger.error("Status store compaction failed: %s", e)
+            await asyncio.sleep(self.compact_interval)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._write_loop()),
+            asyncio.create_task(self._compact_loop()),
+        ]
+
+    async def stop(self) -> None:
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %s unwritten send records on shutdown", self.queue.qsize())
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "write_errors": self.write_errors,
+            "compactions": self.compactions,
+            "compacted_rows": self.compacted_rows,
+            "retention_days": self.retention_seconds / 86400,
+        }
+
+
+def parse_webhook_payload(payload: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Extract status updates and inbound messages from a WhatsApp webhook body.
+
+    Returns:
+        dict: ``{"statuses": [...], "inbound": [...]}`` rows ready for StatusStore.add_events
+    """
+    statuses: List[Dict[str, Any]] = []
+    inbound: List[Dict[str, Any]] = []
+    for entry in payload.get("entry", ()):
+        for change in entry.get("changes", ()):
+            value = change.get("value", {})
+            for item in value.get("statuses", ()):
+                errors = item.get("errors")
+                statuses.append({
+                    "message_id": item.get("id"),
+                    "status": item.get("status"),
+                    "timestamp": int(item.get("timestamp", 0)),
+                    "recipient_id": item.get("recipient_id"),
+                    "error": json.dumps(errors) if errors else None,
+                })
+            for item in value.get("messages", ()):
+                inbound.append({
+                    "message_id": item.get("id"),
+                    "from_number": item.get("from"),
+                    "type": item.get("type", "unknown"),
+                    "timestamp": int(item.get("timestamp", 0)),
+                    "body": json.dumps(item),
+                })
+    return {
+        "statuses": [row for row in statuses if row["message_id"] and row["status"]],
+        "inbound": [row for row in inbound if row["message_id"] and row["from_number"]],
+    }
+
+
+_store: Optional[StatusStore] = None
+
+
+def get_status_store() -> StatusStore:
+    """Return the shared status store, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = StatusStore(settings.STATUS_STORE_PATH)
+        _store.open()
+        logger.info("Status store opened (%s)", settings.STATUS_STORE_PATH)
+    return _store
+
+
+def close_status_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+_recorder: Optional[SendRecorder] = None
+
+
+def start_send_recorder() -> SendRecorder:
+    """Start the background send log writer and retention job. Called from the application lifespan."""
+    global _recorder
+    if _recorder is None:
+        _recorder = SendRecorder(
+            get_status_store(),
+            max_queue=settings.STATUS_WRITE_QUEUE_SIZE,
+            batch_size=settings.STATUS_WRITE_BATCH_SIZE,
+            flush_interval=settings.STATUS_FLUSH_INTERVAL,
+            retention_seconds=settings.STATUS_RETENTION_DAYS * 86400,
+            compact_interval=settings.STATUS_COMPACT_INTERVAL
+        )
+        _recorder.start()
+    return _recorder
+
+
+async def stop_send_recorder() -> None:
+    global _recorder
+    if _recorder is not None:
+        await _recorder.stop()
+        _recorder = None
+
+
+def get_send_recorder() -> Optional[SendRecorder]:
+    return _recorder
+
+
+def record_send(
+    message_id: Optional[str],
+    to_number: str,
+    template_name: str,
+    status: str,
+    latency: float,
+    status_code: Optional[int] = None,
+    error: Optional[str] = None,
+    client_id: Optional[str] = None
+) -> None:
+    """
+    Queue a send record for the status store.
+
+    A no-op when the recorder is not running (e.g. outside the application
+    lifespan) or ``STATUS_RECORD_SENDS`` is off.
+    """
+    if _recorder is None or not settings.STATUS_RECORD_SENDS:
+        return
+    now = int(time.time() * 1000)
+    _recorder.record({
+        "message_id": message_id,
+        "to_number": to_number,
+        "template_name": template_name,
+        "status": status,
+        "status_code": status_code,
+        "error": error[:MAX_ERROR_LENGTH] if error else None,
+        "latency_ms": int(latency * 1000),
+        "created_at": now,
+        "updated_at": now,
+        "client_id": client_id,
+    })
@@ -0,0 +1,342 @@
+import asyncio
+import fcntl
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+from app.config import settings
+from app.logger import logger
+
+
+class SuppressionList:
+    """
+    Recipients that must not be messaged (opted out or persistently failing).
+
+    Numbers are stored as int64 E.164 digits (``+14155550100`` ->
+    ``14155550100``). The bulk of the list is a sorted array in a snapshot
+    file that is memory-mapped rather than read, so opening a list of tens
+    of millions of numbers is instant, costs 8 bytes per number of page cache
+    shared by every worker, and lookups are a binary search.
+
+    Changes made through the admin API go to two small in-memory sets and
+    are appended to a journal next to the snapshot. Other workers replay the
+    journal's new lines every ``reload_interval`` seconds in a background
+    thread, so a lookup never touches the filesystem. Once the journal
+    holds ``compact_threshold`` entries it is merged into a new snapshot,
+    which replaces the old one atomically.
+
+    Snapshot layout: an 8-byte magic, the count as uint64, then the sorted
+    numbers as native-endian int64. Journal lines are ``+<digits>`` (add) or
+    ``-<digits>`` (remove).
+    """
+
+    MAGIC = b"WASP0001"
+    HEADER = struct.Struct("<8sQ")
+
+    def __init__(self, path: str, reload_interval: float = 2.0, compact_threshold: int = 100000):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.reload_interval = reload_interval
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.Lock()
+        # Serializes journal replay and snapshot swaps between threads
+        self._sync = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._base: Sequence[int] = array("q")
+        self._snapshot_id: Optional[tuple] = None
+        self._added: set = set()
+        self._removed: set = set()
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._refresher: Optional[asyncio.Task] = None
+
+        self.suppressed = 0
+        self.compactions = 0
+
+    # Loading
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            self._load_snapshot()
+            self._replay_journal()
+
+    def close(self) -> None:
+        with self._lock:
+            self._unmap()
+        os.close(self._lock_fd)
+
+    def _locked(self):
+        return _FileLock(self._lock_fd, self._sync)
+
+    def _unmap(self) -> None:
+        if isinstance(self._base, memoryview):
+            self._base.release()
+        self._base = array("q")
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _load_snapshot(self) -> None:
+        """Map the current snapshot and forget the journal state built on the previous one."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            new_map, base, snapshot_id = None, array("q"), None
+        else:
+            try:
+                info = os.fstat(fd)
+                snapshot_id = (info.st_ino, info.st_mtime_ns)
+                if info.st_size <= self.HEADER.size:
+                    new_map, base = None, array("q")
+                else:
+                    new_map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                    magic, count = self.HEADER.unpack_from(new_map, 0)
+                    if magic != self.MAGIC or self.HEADER.size + count * 8 > len(new_map):
+                        new_map.close()
+                        raise ValueError(f"{self.path} is not a suppression snapshot")
+                    base = memoryview(new_map)[self.HEADER.size:self.HEADER.size + count * 8].cast("q")
+            finally:
+                os.close(fd)
+        with self._lock:
+            # The old mapping is not closed here: a lookup on another thread may
+            # still be using it, and it is unmapped once the last reference goes
+            self._map, self._base, self._snapshot_id = new_map, base, snapshot_id
+            self._added, self._removed = set(), set()
+            self._journal_offset = self._journal_entries = 0
+
+    def _replay_journal(self) -> None:
+        """Apply journal lines written since the last replay (by any worker)."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Only whole lines; a partial one is picked up on the next replay
+        end = data.rfind(b"\n") + 1
+        with self._lock:
+            for line in data[:end].splitlines():
+                if line[:1] == b"+":
+                    self._apply_add(int(line[1:]))
+                elif line[:1] == b"-":
+                    self._apply_remove(int(line[1:]))
+                self._journal_entries += 1
+            self._journal_offset += end
+
+    def refresh(self) -> None:
+        """Pick up snapshots and journal lines written by other workers. Blocking; call from a thread."""
+        try:
+            with self._sync:
+                try:
+                    info = os.stat(self.path)
+                    snapshot_id = (info.st_ino, info.st_mtime_ns)
+                except FileNotFoundError:
+                    snapshot_id = None
+                journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+                if snapshot_id != self._snapshot_id or journal_size < self._journal_offset:
+                    # Another worker compacted: the journal was folded into the new snapshot
+                    self._load_snapshot()
+                    self._replay_journal()
+                elif journal_size > self._journal_offset:
+                    self._replay_journal()
+        except (OSError, ValueError) as e:
+            logger.error("Could not refresh suppression list %s: %s", self.path, e)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await asyncio.to_thread(self.refresh)
+
+    def start(self) -> None:
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+    # Lookups and updates
+
+    def _apply_add(self, number: int) -> None:
+        self._removed.discard(number)
+        self._added.add(number)
+
+    def _apply_remove(self, number: int) -> None:
+        self._added.discard(number)
+        self._removed.add(number)
+
+    def _in_base(self, number: int) -> bool:
+        base = self._base
+        index = bisect_left(base, number)
+        return index < len(base) and base[index] == number
+
+    def contains(self, number: int) -> bool:
+        if number in self._removed:
+            return False
+        return number in self._added or self._in_base(number)
+
+    def check(self, number: int) -> bool:
+        """``contains`` for the send path: counts the send as suppressed when it matches."""
+        if self.contains(number):
+            self.suppressed += 1
+            return True
+        return False
+
+    def _update(self, numbers: Iterable[int], sign: bytes) -> int:
+        numbers = list(numbers)
+        if not numbers:
+            return 0
+        lines = b"".join(sign + str(number).encode() + b"\n" for number in numbers)
+        with self._locked():
+            # Catch up first so our lines are applied after everything before them
+            self._replay_journal()
+            with open(self.journal_path, "ab") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._replay_journal()
+            if self._journal_entries >= self.compact_threshold:
+                self._compact_locked()
+        return len(numbers)
+
+    def add(self, numbers: Iterable[int]) -> int:
+        """Suppress ``numbers``. Blocking (journal fsync); call from a thread."""
+        return self._update(numbers, b"+")
+
+    def remove(self, numbers: Iterable[int]) -> int:
+        """Lift suppression for ``numbers``. Blocking (journal fsync); call from a thread."""
+        return self._update(numbers, b"-")
+
+    # Compaction
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot. Blocking; call from a thread."""
+        with self._locked():
+            self._replay_journal()
+            self._compact_locked()
+
+    def _merged(self) -> Iterator[int]:
+        removed, added = self._removed, self._added
+        previous = None
+        for number in heapq.merge(self._base, sorted(added)):
+            if number != previous and number not in removed:
+                yield number
+            previous = number
+
+    def _compact_locked(self) -> None:
+        started = time.monotonic()
+        tmp_path = self.path + ".tmp"
+        count = 0
+        with open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, 0))
+            chunk = array("q")
+            for number in self._merged():
+                chunk.append(number)
+                if len(chunk) >= 65536:
+                    count += len(chunk)
+                    chunk.tofile(f)
+                    chunk = array("q")
+            count += len(chunk)
+            chunk.tofile(f)
+            f.seek(0)
+            f.write(self.HEADER.pack(self.MAGIC, count))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        open(self.journal_path, "wb").close()
+        self._load_snapshot()
+        self.compactions += 1
+        logger.info(
+            "Compacted suppression list to %s numbers in %.2fs", count, time.monotonic() - started
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "snapshot_numbers": len(self._base),
+            "pending_added": len(self._added),
+            "pending_removed": len(self._removed),
+            "journal_entries": self._journal_entries,
+            "suppressed_sends": self.suppressed,
+            "compactions": self.compactions,
+        }
+
+
+class _FileLock:
+    """
+    Exclusive flock held across processes for journal writes and compaction.
+
+    flock does not exclude threads sharing the descriptor, so ``local`` is
+    held as well.
+    """
+
+    def __init__(self, fd: int, local: threading.Lock):
+        self.fd = fd
+        self.local = local
+
+    def __enter__(self):
+        self.local.acquire()
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except BaseException:
+            self.local.release()
+            raise
+
+    def __exit__(self, *exc: Any) -> None:
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        finally:
+            self.local.release()
+
+
+def number_key(graph_number: str) -> int:
+    """int64 key for a number in Graph API form (E.164 digits without ``+``)."""
+    return int(graph_number)
+
+
+_suppression_list: Optional[SuppressionList] = None
+
+
+def open_suppression_list() -> Optional[SuppressionList]:
+    """
+    Map the snapshot, replay the journal and start refreshing in the background.
+    Called from the application lifespan.
+    """
+    global _suppression_list
+    if _suppression_list is None and settings.SUPPRESSION_ENABLED:
+        suppression_list = SuppressionList(
+            settings.SUPPRESSION_SNAPSHOT_PATH,
+            reload_interval=settings.SUPPRESSION_RELOAD_INTERVAL,
+            compact_threshold=settings.SUPPRESSION_COMPACT_THRESHOLD
+        )
+        suppression_list.open()
+        suppression_list.start()
+        _suppression_list = suppression_list
+        stats = suppression_list.stats()
+        logger.info(
+            "Suppression list opened (%s numbers, %s journal entries)",
+            stats["snapshot_numbers"], stats["journal_entries"]
+        )
+    return _suppression_list
+
+
+async def close_suppression_list() -> None:
+    global _suppression_list
+    if _suppression_list is not None:
+        await _suppression_list.stop()
+        _suppression_list.close()
+        _suppression_list = None
+
+
+def get_suppression_list() -> Optional[SuppressionList]:
+    return _suppression_list
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.http_client import get_http_client
+from app.logger import logger
+from app.payloads import is_registered_template
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - YAML catalogs need PyYAML
+    yaml = None
+
+# Placeholders in template text: {{1}}, {{2}} or named {{customer_name}}
+_PLACEHOLDER = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+# Header formats that take exactly one media/location parameter
+_MEDIA_HEADER_FORMATS = frozenset({"DOCUMENT", "IMAGE", "VIDEO", "LOCATION"})
+
+# Component types whose parameter counts are checked before sending
+CHECKED_COMPONENTS = ("header", "body")
+
+# Metric label for template names that are neither registered nor in the catalog
+OTHER_TEMPLATE_LABEL = "other"
+
+
+class TemplateDefinition(NamedTuple):
+    """A message template as registered with Meta, reduced to what sends are checked against."""
+    name: str
+    language: str
+    status: str
+    # Component type ("header", "body") -> number of parameters it takes
+    parameters: Dict[str, int]
+
+
+def parse_template(entry: Dict[str, Any]) -> TemplateDefinition:
+    """
+    Build a definition from one template in Graph API ``message_templates`` form.
+
+    Hand-written catalogs may give ``parameters`` (``{"body": 2}``) instead
+    of ``components``.
+    """
+    parameters = entry.get("parameters")
+    if parameters is None:
+        parameters = {}
+        for component in entry.get("components") or ():
+            component_type = component.get("type", "").lower()
+            if component_type == "header" and component.get("format", "TEXT").upper() in _MEDIA_HEADER_FORMATS:
+                parameters["header"] = 1
+            elif component_type in CHECKED_COMPONENTS:
+                parameters[component_type] = len(set(_PLACEHOLDER.findall(component.get("text", ""))))
+    return TemplateDefinition(
+        name=entry["name"],
+        language=entry.get("language") or settings.TEMPLATE_DEFAULT_LANGUAGE,
+        status=str(entry.get("status", "APPROVED")).upper(),
+        parameters={key.lower(): int(value) for key, value in parameters.items()}
+    )
+
+
+def load_catalog_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Read template entries from a JSON or YAML file.
+
+    The file holds a list of templates, or a ``message_templates`` response
+    (``{"data": [...]}``) saved as-is.
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("PyYAML is required for YAML template catalogs (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data["data"] if isinstance(data, dict) else data
+
+
+async def fetch_graph_templates() -> List[Dict[str, Any]]:
+    """Fetch every template of the WhatsApp Business Account, following pagination."""
+    client = get_http_client()
+    url: Optional[str] = (
+        f"{settings.GRAPH_API_BASE_URL}/{settings.WHATSAPP_BUSINESS_ACCOUNT_ID}/message_templates"
+    )
+    params: Optional[Dict[str, str]] = {"fields": "name,language,status,components", "limit": "250"}
+    headers = {"Authorization": f"Bearer {settings.WHATSAPP_API_TOKEN}"}
+    entries: List[Dict[str, Any]] = []
+    while url:
+        response = await client.get(url, params=params, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        entries.extend(data.get("data", []))
+        # The next link already carries the query string
+        url, params = data.get("paging", {}).get("next"), None
+    return entries
+
+
+class TemplateCatalog:
+    """
+    In-memory catalog of approved templates, used to reject bad sends locally.
+
+    Definitions come from a local file (re-read when it changes) or from the
+    Graph API ``message_templates`` edge, refreshed in the background every
+    ``ttl`` seconds. A failed refresh keeps the current definitions. Until
+    the first successful load nothing is rejected.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        fetch: Optional[Callable[[], Awaitable[List[Dict[str, Any]]]]] = None,
+        ttl: float = 600.0,
+        default_language: str = "en_US"
+    ):
+        self.path = path
+        self.fetch = fetch
+        self.ttl = ttl
+        self.default_language = default_language
+        self._templates: Dict[Tuple[str, str], TemplateDefinition] = {}
+        self._languages: Dict[str, Tuple[str, ...]] = {}
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.loaded = False
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.rejected = 0
+
+    def load(self, entries: List[Dict[str, Any]]) -> None:
+        """Swap in a new set of definitions."""
+        templates = {}
+        languages: Dict[str, List[str]] = {}
+        for entry in entries:
+            definition = parse_template(entry)
+            templates[(definition.name, definition.language)] = definition
+            languages.setdefault(definition.name, []).append(definition.language)
+        self._templates = templates
+        self._languages = {name: tuple(codes) for name, codes in languages.items()}
+        self.loaded = True
+        self.loaded_at = time.time()
+
+    async def refresh(self) -> bool:
+        """Reload definitions from the configured source. Returns True if they were loaded."""
+        try:
+            if self.fetch is not None:
+                entries = await self.fetch()
+            else:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return True
+                entries = await asyncio.to_thread(load_catalog_file, self.path)
+                self._mtime = mtime
+            self.load(entries)
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.error("Could not refresh template catalog: %s", e)
+            return False
+        self.refreshes += 1
+        logger.info("Template catalog loaded (%s templates)", len(self._templates))
+        return True
+
+    def language_for(self, name: str, requested: Optional[str] = None) -> str:
+        """
+        Language to send ``name`` in: the requested one, else the default
+        language if the template has it, else the template's only (or first)
+        language.
+        """
+        if requested:
+            return requested
+        languages = self._languages.get(name)
+        if not languages or self.default_language in languages:
+            return self.default_language
+        return languages[0]
+
+    def has(self, name: str) -> bool:
+        """Whether the catalog defines ``name`` in any language."""
+        return name in self._languages
+
+    def check(self, name: str, language: str, parameters: Dict[str, int]) -> Optional[str]:
+        """
+        Check a send against the catalog.
+
+        Returns:
+            str: Why the send would be rejected by Meta, or None if it is fine
+        """
+        if not self.loaded:
+            return None
+        definition = self._templates.get((name, language))
+        if definition is None:
+            self.rejected += 1
+            languages = self._languages.get(name)
+            if languages is None:
+                return f"Unknown template '{name}'"
+            return f"Template '{name}' is not available in '{language}' (available: {', '.join(languages)})"
+        if definition.status != "APPROVED":
+            self.rejected += 1
+            return f"Template '{name}' ({language}) is not approved (status {definition.status})"
+        for component in CHECKED_COMPONENTS:
+            expected = definition.parameters.get(component, 0)
+            given = parameters.get(component, 0)
+            if given != expected:
+                self.rejected += 1
+                return f"Template '{name}' expects {expected} {component} parameters, got {given}"
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": "graph" if self.fetch is not None else self.path,
+            "templates": len(self._templates),
+            "loaded_at": self.loaded_at,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "rejected": self.rejected,
+        }
+
+
+_catalog: Optional[TemplateCatalog] = None
+
+
+async def start_template_catalog() -> Optional[TemplateCatalog]:
+    """
+    Load the catalog and start its refresh task. Called from the application
+    lifespan; does nothing when no catalog source is configured.
+    """
+    global _catalog
+    if _catalog is None:
+        if settings.TEMPLATE_CATALOG_FETCH:
+            if not settings.WHATSAPP_BUSINESS_ACCOUNT_ID:
+                logger.error("TEMPLATE_CATALOG_FETCH needs WHATSAPP_BUSINESS_ACCOUNT_ID; template checks are off")
+                return None
+            catalog = TemplateCatalog(fetch=fetch_graph_templates, ttl=settings.TEMPLATE_CATALOG_TTL,
+                                      default_language=settings.TEMPLATE_DEFAULT_LANGUAGE)
+        elif settings.TEMPLATE_CATALOG_FILE:
+            catalog = TemplateCatalog(path=settings.TEMPLATE_CATALOG_FILE, ttl=settings.TEMPLATE_CATALOG_TTL,
+                                      default_language=settings.TEMPLATE_DEFAULT_LANGUAGE)
+        else:
+            return None
+        await catalog.start()
+        _catalog = catalog
+    return _catalog
+
+
+async def stop_template_catalog() -> None:
+    global _catalog
+    if _catalog is not None:
+        await _catalog.stop()
+        _catalog = None
+
+
+def get_template_catalog() -> Optional[TemplateCatalog]:
+    return _catalog
+
+
+def template_label(name: str) -> str:
+    """
+    ``name`` as a metric label. Generic sends carry a caller-supplied name,
+    so names that are not registered or in the catalog share one label.
+    """
+    if is_registered_template(name) or (_catalog is not None and _catalog.has(name)):
+        return name
+    return OTHER_TEMPLATE_LABEL
+
+
+def template_language(name: str, requested: Optional[str] = None) -> str:
+    """Language for a send, from the request, the catalog or TEMPLATE_DEFAULT_LANGUAGE."""
+    if _catalog is not None:
+        return _catalog.language_for(name, requested)
+    return requested or settings.TEMPLATE_DEFAULT_LANGUAGE
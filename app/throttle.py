@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from app.config import Settings, settings, settings_store
+from app.logger import logger
+
+
+class TokenBucket:
+    """
+    Async token bucket that makes callers wait for capacity.
+
+    Tokens are reserved up front (the balance may go negative), so waiters are
+    released in arrival order without holding a lock while sleeping.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+        # Queue-wait statistics
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait: float) -> float:
+        """
+        Take one token, waiting up to ``max_wait`` seconds for it.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            TimeoutError: If no token would be available within ``max_wait``
+        """
+        self._refill(time.monotonic())
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            self.rejected += 1
+            raise TimeoutError(f"No send capacity within {max_wait:.2f}s (next slot in {wait:.2f}s)")
+
+        self.tokens -= 1
+        if wait > 0:
+            self.delayed += 1
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reserved slot back to later callers
+                self.tokens += 1
+                raise
+            finally:
+                self.waiting -= 1
+
+        self.acquired += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "available_tokens": round(max(self.tokens, 0.0), 3),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class OutboundThrottle:
+    """Per sending phone-number ID pacing for Graph API calls."""
+
+    def __init__(self, rate: float, burst: int, max_wait: float):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.buckets: Dict[str, TokenBucket] = {}
+        # Per-number rates for numbers on a different throughput tier
+        self.rates: Dict[str, float] = {}
+
+    def configure(self, phone_number_id: str, rate: float) -> None:
+        """Pace ``phone_number_id`` at ``rate`` sends per second (burst of one second's worth)."""
+        if self.rates.get(phone_number_id) == rate:
+            return
+        self.rates[phone_number_id] = rate
+        self.buckets.pop(phone_number_id, None)
+
+    def update(self, rate: float, burst: int, max_wait: float) -> None:
+        """Apply new default pacing to every number without a rate of its own, keeping queued waiters."""
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        for phone_number_id, bucket in self.buckets.items():
+            if phone_number_id not in self.rates:
+                bucket.rate = rate
+                bucket.burst = burst
+                bucket.tokens = min(bucket.tokens, float(burst))
+
+    def bucket(self, phone_number_id: str) -> TokenBucket:
+        bucket = self.buckets.get(phone_number_id)
+        if bucket is None:
+            rate = self.rates.get(phone_number_id)
+            bucket = self.buckets[phone_number_id] = (
+                TokenBucket(self.rate, self.burst) if rate is None else TokenBucket(rate, max(1, int(rate)))
+            )
+        return bucket
+
+    async def acquire(self, phone_number_id: str, max_wait: Optional[float] = None) -> float:
+        """
+        Wait for a send slot for ``phone_number_id``.
+
+        Returns:
+            float: Seconds spent waiting in the outbound queue
+
+        Raises:
+            HTTPException: 429 if no slot is available before the deadline
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        try:
+            return await self.bucket(phone_number_id).acquire(max_wait)
+        except TimeoutError as e:
+            logger.warning("Outbound throttle rejected send for %s: %s", phone_number_id, e)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Outbound WhatsApp send rate exceeded. Please try again later.",
+                headers={"Retry-After": str(max(1, int(max_wait)))}
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {phone_number_id: bucket.stats() for phone_number_id, bucket in self.buckets.items()}
+
+
+_outbound_throttle: Optional[OutboundThrottle] = None
+
+
+def get_outbound_throttle() -> OutboundThrottle:
+    """The process-wide throttle; created from settings the first time it is needed."""
+    global _outbound_throttle
+    if _outbound_throttle is None:
+        _outbound_throttle = OutboundThrottle(
+            rate=settings.OUTBOUND_RATE_PER_SECOND,
+            burst=settings.OUTBOUND_BURST,
+            max_wait=settings.OUTBOUND_MAX_WAIT_SECONDS
+        )
+    return _outbound_throttle
+
+
+@settings_store.on_reload
+def _apply_settings(new: Settings) -> None:
+    if _outbound_throttle is not None:
+        _outbound_throttle.update(new.OUTBOUND_RATE_PER_SECOND, new.OUTBOUND_BURST, new.OUTBOUND_MAX_WAIT_SECONDS)
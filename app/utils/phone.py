@@ -0,0 +1,82 @@
+import re
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from app.config import settings
+
+# E.164: a country code starting 1-9 and at most 15 digits in total
+_E164 = re.compile(r"\+?([1-9]\d{1,14})")
+
+# Formatting characters people paste along with numbers ("+1 (415) 555-0100")
+_SEPARATORS = str.maketrans("", "", " \t-().")
+
+
+def _normalize(phone_number: str) -> Optional[str]:
+    match = _E164.fullmatch(phone_number.strip().translate(_SEPARATORS))
+    return "+" + match.group(1) if match else None
+
+
+_cached_normalize: Optional[Callable[[str], Optional[str]]] = None
+
+
+def _normalizer() -> Callable[[str], Optional[str]]:
+    global _cached_normalize
+    if _cached_normalize is None:
+        # Sized from PHONE_CACHE_SIZE on first use, not when the module is imported
+        _cached_normalize = lru_cache(maxsize=settings.PHONE_CACHE_SIZE)(_normalize)
+    return _cached_normalize
+
+
+def normalize_phone_number(phone_number: str) -> Optional[str]:
+    """
+    Canonical E.164 form of ``phone_number`` (e.g. ``+919821449581``).
+
+    Surrounding whitespace, inner spaces, dashes, dots and parentheses are
+    dropped and the ``+`` is optional. Results are cached, so repeat recipients cost a dict lookup.
+
+    Returns:
+        str: The normalized number, or None if it is not a valid E.164 number
+    """
+    return _normalizer()(phone_number)
+
+
+class PhoneBatchResult(NamedTuple):
+    """Normalized numbers in input order (None where invalid) and the invalid indexes."""
+    numbers: List[Optional[str]]
+    invalid: List[int]
+
+
+def normalize_phone_numbers(phone_numbers: Sequence[str]) -> PhoneBatchResult:
+    """
+    Normalize many numbers in one call.
+
+    Returns:
+        PhoneBatchResult: ``numbers[i]`` is the E.164 form of ``phone_numbers[i]``
+        or None; ``invalid`` lists the indexes of numbers that failed
+    """
+    normalize = _normalizer()
+    numbers = [normalize(number) for number in phone_numbers]
+    invalid = [index for index, number in enumerate(numbers) if number is None]
+    return PhoneBatchResult(numbers, invalid)
+
+
+def graph_number(e164: str) -> str:
+    """The recipient format the Graph API expects: E.164 without the ``+``."""
+    return e164[1:]
+
+
+def phone_cache_stats() -> dict:
+    info = _normalizer().cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_ratio": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def clear_phone_cache() -> None:
+    """Drop every cached normalization (used by benchmarks)."""
+    _normalizer().cache_clear()
@@ -1,10 +1,11 @@
-import re
 from typing import Optional
 
+from app.utils.phone import normalize_phone_number
+
 def validate_phone_number(phone_number: str) -> bool:
     """
     Validate phone number format.
-    Accepts numbers with or without + prefix.
+    Accepts numbers with or without + prefix; see normalize_phone_number.
     
     Args:
         phone_number: Phone number to validate
@@ -12,17 +13,7 @@ def validate_phone_number(phone_number: str) -> bool:
     Returns:
         bool: True if valid, False otherwise
     """
-    # Remove any whitespace
-    phone_number = phone_number.strip()
-    
-    # Add + prefix if not present
-    if not phone_number.startswith('+'):
-        phone_number = '+' + phone_number
-    
-    # Basic international phone number pattern
-    pattern = r'^\+[1-9]\d{1,14}$'
-    
-    return bool(re.match(pattern, phone_number))
+    return normalize_phone_number(phone_number) is not None
 
 def validate_message_content(message: str) -> tuple[bool, Optional[str]]:
     """
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.logger import logger
+from app.status_store import StatusStore, drain_batch, get_status_store, parse_webhook_payload
+
+
+_SIGNATURE = re.compile(r"sha256=([0-9a-fA-F]{64})")
+
+
+class WebhookBodyTooLarge(ValueError):
+    """The webhook body is larger than WEBHOOK_MAX_BODY_BYTES."""
+
+
+def parse_signature(signature_header: Optional[str]) -> Optional[str]:
+    """Hex digest from an ``X-Hub-Signature-256`` header, or None if it is missing or malformed."""
+    match = _SIGNATURE.fullmatch(signature_header or "")
+    return match.group(1).lower() if match else None
+
+
+async def read_body(chunks: AsyncIterator[bytes], max_bytes: int, mac: Optional[Any] = None) -> bytes:
+    """
+    Read a request body of at most ``max_bytes``, feeding each chunk into ``mac`` if given.
+
+    Raises:
+        WebhookBodyTooLarge: As soon as more than ``max_bytes`` have arrived
+    """
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise WebhookBodyTooLarge(f"Webhook body exceeds {max_bytes} bytes")
+        if mac is not None:
+            mac.update(chunk)
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+async def read_verified_body(
+    chunks: AsyncIterator[bytes],
+    signature: str,
+    app_secret: str,
+    max_bytes: int
+) -> Tuple[bytes, bool]:
+    """
+    Read a request body while feeding each chunk into the HMAC.
+
+    The digest is ready as soon as the last chunk arrives, so verification
+    adds no second pass over the body.
+
+    Args:
+        signature: Expected hex digest, from parse_signature
+
+    Returns:
+        tuple: (raw_body, signature_valid)
+
+    Raises:
+        WebhookBodyTooLarge: If the body is larger than ``max_bytes``
+    """
+    mac = hmac.new(app_secret.encode(), digestmod=hashlib.sha256)
+    body = await read_body(chunks, max_bytes, mac)
+    return body, hmac.compare_digest(mac.hexdigest(), signature)
+
+
+class WebhookProcessor:
+    """
+    Decouples webhook acknowledgement from processing.
+
+    The route only verifies the signature and puts the raw body on a bounded
+    in-process queue. A background task drains the queue in batches, parses
+    the events and writes them to the status store in one transaction per
+    batch.
+    """
+
+    def __init__(self, store: StatusStore, max_queue: int, batch_size: int, flush_interval: float):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+        self.received = 0
+        self.dropped = 0
+        self.processed_statuses = 0
+        self.processed_inbound = 0
+        self.parse_errors = 0
+        self.batches = 0
+
+    def submit(self, body: bytes) -> bool:
+        """Queue a raw webhook body. Returns False when the queue is full."""
+        try:
+            self.queue.put_nowait(body)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.received += 1
+        return True
+
+    def _parse(self, batch: List[bytes]) -> Dict[str, List[Dict[str, Any]]]:
+        statuses: List[Dict[str, Any]] = []
+        inbound: List[Dict[str, Any]] = []
+        for body in batch:
+            try:
+                events = parse_webhook_payload(json.loads(body))
+            except (ValueError, TypeError, AttributeError) as e:
+                self.parse_errors += 1
+                logger.warning("Discarding malformed webhook payload: %s", e)
+                continue
+            statuses.extend(events["statuses"])
+            inbound.extend(events["inbound"])
+        return {"statuses": statuses, "inbound": inbound}
+
+    async def _run(self) -> None:
+        while True:
+            batch = await drain_batch(self.queue, self.batch_size, self.flush_interval)
+            events = self._parse(batch)
+            try:
+                await asyncio.to_thread(self.store.add_events, events["statuses"], events["inbound"])
+            except Exception as e:
+                logger.error("Failed to store webhook batch of %s payloads: %s", len(batch), e)
+            else:
+                self.batches += 1
+                self.processed_statuses += len(events["statuses"])
+                self.processed_inbound += len(events["inbound"])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Flush whatever was acknowledged but not yet stored
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %s unprocessed webhook payloads on shutdown", self.queue.qsize())
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "received": self.received,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "statuses": self.processed_statuses,
+            "inbound_messages": self.processed_inbound,
+            "parse_errors": self.parse_errors,
+        }
+
+
+_processor: Optional[WebhookProcessor] = None
+
+
+def start_webhook_processor() -> WebhookProcessor:
+    """Create the processor and its background task. Called from the application lifespan."""
+    global _processor
+    if _processor is None:
+        _processor = WebhookProcessor(
+            get_status_store(),
+            max_queue=settings.WEBHOOK_QUEUE_SIZE,
+            batch_size=settings.WEBHOOK_BATCH_SIZE,
+            flush_interval=settings.WEBHOOK_FLUSH_INTERVAL
+        )
+        _processor.start()
+    return _processor
+
+
+async def stop_webhook_processor() -> None:
+    global _processor
+    if _processor is not None:
+        await _processor.stop()
+        _processor = None
+
+
+def get_webhook_processor() -> Optional[WebhookProcessor]:
+    return _processor
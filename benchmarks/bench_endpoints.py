@@ -0,0 +1,460 @@
+"""
+Benchmark suite: drives the real application (middleware, auth, services)
+in-process through httpx.ASGITransport against the mock Graph API (also
+in-process by default, or over localhost with ``--mock-server`` to include
+the connection pool), one scenario per endpoint in app/routes/messages.py.
+
+Each scenario runs either closed-loop (``--concurrency`` workers sending
+``--requests`` requests back to back) or open-loop (``--rate`` arrivals per
+second for ``--duration`` seconds, latency measured from the scheduled
+arrival so a slow server cannot hide queueing). Results (throughput, error
+counts and p50/p95/p99 latency) are printed and, with ``--output``, saved as
+JSON. ``compare`` flags regressions between two saved runs and exits 1 if
+any are found, so it can gate CI.
+
+Usage:
+    python -m benchmarks.bench_endpoints run [--scenarios hello_world batch ...]
+        [--concurrency 50 --requests 2000 | --rate 500 --duration 10]
+        [--latency 0.02] [--jitter 0.005] [--error-rate 0.01] [--error-status 500]
+        [--output results.json]
+    python -m benchmarks.bench_endpoints compare baseline.json current.json [--threshold 0.1]
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.mock_graph import MockGraphAPI, MockGraphServer
+
+API_KEY = "bench-key"
+# (method, path, httpx request keyword arguments)
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def recipient(i: int) -> str:
+    """A distinct valid number per request, so sends are not coalesced or serialized."""
+    return f"+1415{i % 10**7:07d}"
+
+
+class Scenario:
+    """One endpoint under test. ``setup`` runs before the timed requests."""
+
+    name = ""
+
+    async def setup(self, client: httpx.AsyncClient, count: int) -> None:
+        pass
+
+    def request(self, i: int) -> Request:
+        raise NotImplementedError
+
+
+class HelloWorld(Scenario):
+    name = "hello_world"
+    params: Dict[str, str] = {}
+
+    def request(self, i: int) -> Request:
+        return "POST", "/api/v1/messages/hello-world", {"json": {"to_number": recipient(i)}, "params": self.params}
+
+
+class HelloWorldAsync(HelloWorld):
+    name = "hello_world_async"
+    params = {"async": "true"}
+
+
+class OrderConfirm(Scenario):
+    name = "order_confirm"
+
+    def __init__(self, graph_url: str):
+        self.pdf_url = f"{graph_url}/documents/statement.pdf"
+
+    def request(self, i: int) -> Request:
+        return "POST", "/api/v1/messages/order-confirm", {"json": {
+            "to_number": recipient(i),
+            "card_type": "Visa Credit Card",
+            "merchant_name": "Amazon",
+            "document_type": "Monthly Statement",
+            "pdf_url": self.pdf_url,
+        }}
+
+
+class AccountCreated(Scenario):
+    name = "account_created"
+
+    def request(self, i: int) -> Request:
+        return "POST", "/api/v1/messages/account-created", {"json": {
+            "to_number": recipient(i), "name": "John Doe", "verification_type": "email"
+        }}
+
+
+class Generic(Scenario):
+    name = "generic"
+
+    def request(self, i: int) -> Request:
+        return "POST", "/api/v1/messages/", {"json": {
+            "to_number": recipient(i),
+            "template": {"name": "hello_world", "language": {"code": "en_US"}},
+        }}
+
+
+class Batch(Scenario):
+    name = "batch"
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def request(self, i: int) -> Request:
+        first = i * self.size
+        return "POST", "/api/v1/messages/batch", {"json": {
+            "template_name": "hello_world",
+            "recipients": [{"to_number": recipient(first + k)} for k in range(self.size)],
+        }}
+
+
+class Scheduled(Scenario):
+    name = "scheduled"
+
+    def request(self, i: int) -> Request:
+        send_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+        return "POST", "/api/v1/messages/hello-world", {"json": {
+            "to_number": recipient(i), "send_at": send_at.isoformat()
+        }}
+
+
+class JobStatus(Scenario):
+    name = "job_status"
+
+    async def setup(self, client: httpx.AsyncClient, count: int) -> None:
+        method, path, kwargs = HelloWorldAsync().request(0)
+        response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+        self.job_id = response.json()["job_id"]
+
+    def request(self, i: int) -> Request:
+        return "GET", f"/api/v1/messages/{self.job_id}", {}
+
+
+class ScheduledStatus(Scenario):
+    name = "scheduled_status"
+
+    async def setup(self, client: httpx.AsyncClient, count: int) -> None:
+        method, path, kwargs = Scheduled().request(0)
+        response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+        self.schedule_id = response.json()["schedule_id"]
+
+    def request(self, i: int) -> Request:
+        return "GET", f"/api/v1/scheduled-messages/{self.schedule_id}", {}
+
+
+class ScheduledCancel(Scenario):
+    """Each request cancels a different send booked during setup."""
+
+    name = "scheduled_cancel"
+
+    async def setup(self, client: httpx.AsyncClient, count: int) -> None:
+        scheduled = Scheduled()
+        self.schedule_ids = []
+        for i in range(count):
+            method, path, kwargs = scheduled.request(i)
+            response = await client.request(method, path, **kwargs)
+            response.raise_for_status()
+            self.schedule_ids.append(response.json()["schedule_id"])
+
+    def request(self, i: int) -> Request:
+        return "DELETE", f"/api/v1/scheduled-messages/{self.schedule_ids[i]}", {}
+
+
+class MessageStatuses(Scenario):
+    name = "message_statuses"
+
+    async def setup(self, client: httpx.AsyncClient, count: int) -> None:
+        method, path, kwargs = HelloWorld().request(0)
+        response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+        self.message_id = response.json()["message_id"]
+        # The send log is written in batches; wait until the send is readable
+        for _ in range(100):
+            if (await client.get(f"/api/v1/messages/{self.message_id}/statuses")).status_code == 200:
+                break
+            await asyncio.sleep(0.05)
+
+    def request(self, i: int) -> Request:
+        return "GET", f"/api/v1/messages/{self.message_id}/statuses", {}
+
+
+class ListMessages(Scenario):
+    name = "list_messages"
+
+    def request(self, i: int) -> Request:
+        return "GET", "/api/v1/messages/", {"params": {"limit": "50"}}
+
+
+def build_scenarios(graph_url: str, batch_size: int) -> Dict[str, Scenario]:
+    scenarios = [
+        HelloWorld(), HelloWorldAsync(), OrderConfirm(graph_url), AccountCreated(), Generic(),
+        Batch(batch_size), Scheduled(), JobStatus(), ScheduledStatus(), ScheduledCancel(),
+        MessageStatuses(), ListMessages(),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+        self.errors = 0
+
+    async def send(self, client: httpx.AsyncClient, request: Request, started: float) -> None:
+        method, path, kwargs = request
+        try:
+            response = await client.request(method, path, **kwargs)
+            code = str(response.status_code)
+            failed = response.status_code >= 300
+        except Exception as e:
+            code = type(e).__name__
+            failed = True
+        self.latencies.append(time.perf_counter() - started)
+        self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        self.errors += failed
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        total = len(ordered)
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "errors": self.errors,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "status_codes": self.status_codes,
+            "latency_ms": {
+                "mean": round(sum(ordered) / total * 1000, 3) if total else 0.0,
+                "p50": round(percentile(ordered, 0.50) * 1000, 3),
+                "p95": round(percentile(ordered, 0.95) * 1000, 3),
+                "p99": round(percentile(ordered, 0.99) * 1000, 3),
+                "max": round(ordered[-1] * 1000, 3) if total else 0.0,
+            },
+        }
+
+
+async def closed_loop(client: httpx.AsyncClient, scenario: Scenario, offset: int, count: int,
+                      concurrency: int) -> Dict[str, Any]:
+    recorder = Recorder()
+    pending = iter(range(offset, offset + count))
+
+    async def worker():
+        for i in pending:
+            await recorder.send(client, scenario.request(i), time.perf_counter())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+async def open_loop(client: httpx.AsyncClient, scenario: Scenario, offset: int, count: int,
+                    rate: float) -> Dict[str, Any]:
+    recorder = Recorder()
+    tasks = []
+    started = time.perf_counter()
+    for k in range(count):
+        arrival = started + k / rate
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(recorder.send(client, scenario.request(offset + k), arrival)))
+    await asyncio.gather(*tasks)
+    return recorder.report(time.perf_counter() - started)
+
+
+def configure_environment(args: argparse.Namespace, graph_url: str, directory: str) -> None:
+    """Point the app at the mock and at throwaway stores; must run before app is imported."""
+    os.environ.update({
+        "API_KEY": API_KEY,
+        "WHATSAPP_API_TOKEN": "bench-token",
+        "PHONE_NUMBER_ID": "123456789",
+        "GRAPH_API_BASE_URL": graph_url,
+        # Documents are served by the mock on a local address
+        "MEDIA_FETCH_ALLOW_PRIVATE": "true",
+        "LOG_LEVEL": args.log_level,
+        "RATE_LIMIT_MAX_REQUESTS": str(10**9),
+        "OUTBOUND_THROTTLE_ENABLED": "true" if args.throttle else "false",
+        "SEND_QUEUE_ENABLED": "true",
+        "SEND_QUEUE_PATH": os.path.join(directory, "send_queue.db"),
+        "SCHEDULER_PATH": os.path.join(directory, "scheduled.db"),
+        "STATUS_STORE_PATH": os.path.join(directory, "status.db"),
+        "SUPPRESSION_SNAPSHOT_PATH": os.path.join(directory, "suppression.bin"),
+    })
+
+
+async def run_suite(args: argparse.Namespace, graph: MockGraphAPI, graph_url: str) -> Dict[str, Any]:
+    from app.main import app
+    from app import http_client
+
+    if not args.mock_server:
+        # Same event loop, no sockets: measures the service, not the loopback stack
+        http_client._client = http_client.GraphHTTPClient(transport=httpx.ASGITransport(app=graph))
+
+    scenarios = build_scenarios(graph_url, args.batch_size)
+    count = args.requests if args.rate is None else int(args.rate * args.duration)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="https://bench", headers={"X-API-Key": API_KEY}, timeout=60
+        ) as client:
+            for name in args.scenarios:
+                scenario = scenarios[name]
+                await scenario.setup(client, args.warmup + count)
+                # Warm-up requests use their own recipients and are not recorded
+                await closed_loop(client, scenario, 0, args.warmup, min(args.warmup, args.concurrency) or 1)
+                if args.rate is None:
+                    result = await closed_loop(client, scenario, args.warmup, count, args.concurrency)
+                    result.update(mode="closed", concurrency=args.concurrency)
+                else:
+                    result = await open_loop(client, scenario, args.warmup, count, args.rate)
+                    result.update(mode="open", rate=args.rate)
+                results[name] = result
+                print_result(name, result)
+    return results
+
+
+def print_result(name: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(f"{name:<20}{result['throughput_rps']:>10.1f}{result['error_rate'] * 100:>8.2f}%"
+          f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}", flush=True)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> None:
+    graph = MockGraphAPI(
+        latency=args.latency, latency_jitter=args.jitter,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed
+    )
+    with tempfile.TemporaryDirectory() as directory, contextlib.ExitStack() as stack:
+        graph_url = "http://graph.mock"
+        if args.mock_server:
+            graph_url = stack.enter_context(MockGraphServer(graph)).base_url
+        configure_environment(args, graph_url, directory)
+        print(f"{'scenario':<20}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        results = asyncio.run(run_suite(args, graph, graph_url))
+
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("func", "output")},
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.output}")
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline``: throughput down, or
+    p50/p95/p99 latency up, by more than ``threshold`` (a fraction), or an
+    error rate more than one percentage point higher.
+    """
+    regressions = []
+    print(f"{'scenario':<20}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, old in baseline["scenarios"].items():
+        new = current["scenarios"].get(name)
+        if new is None:
+            continue
+        checks = [("throughput_rps", old["throughput_rps"], new["throughput_rps"], -1)]
+        checks += [(f"{key} ms", old["latency_ms"][key], new["latency_ms"][key], 1) for key in ("p50", "p95", "p99")]
+        for metric, before, after, direction in checks:
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change * direction > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name} {metric}: {before:g} -> {after:g} ({change:+.1%})")
+            print(f"{name:<20}{metric:<16}{before:>12.2f}{after:>12.2f}{change:>+10.1%}{flag}")
+        if new["error_rate"] - old["error_rate"] > 0.01:
+            regressions.append(f"{name} error_rate: {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+            print(f"{name:<20}{'error_rate':<16}{old['error_rate']:>12.2%}{new['error_rate']:>12.2%}  REGRESSION")
+    return regressions
+
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_reports(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nno regressions beyond {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run scenarios and report throughput and latency")
+    run_parser.add_argument("--scenarios", nargs="+", default=list(build_scenarios("", 1)),
+                            choices=list(build_scenarios("", 1)))
+    run_parser.add_argument("--requests", type=int, default=2000, help="requests per scenario (closed loop)")
+    run_parser.add_argument("--concurrency", type=int, default=50)
+    run_parser.add_argument("--rate", type=float, help="arrivals per second; switches to open loop")
+    run_parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario (open loop)")
+    run_parser.add_argument("--warmup", type=int, default=50)
+    run_parser.add_argument("--batch-size", type=int, default=100)
+    run_parser.add_argument("--latency", type=float, default=0.02, help="mock Graph API latency in seconds")
+    run_parser.add_argument("--jitter", type=float, default=0.0, help="+/- uniform latency jitter in seconds")
+    run_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Graph sends that fail")
+    run_parser.add_argument("--error-status", type=int, default=500)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--throttle", action="store_true", help="keep the outbound throttle on")
+    run_parser.add_argument("--mock-server", action="store_true",
+                            help="serve the mock over localhost TCP in a thread instead of in-process")
+    run_parser.add_argument("--log-level", default="WARNING")
+    run_parser.add_argument("--output", help="write the JSON report here")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: per-send ``httpx.AsyncClient`` vs. the shared pooled client.
+
+Usage:
+    python -m benchmarks.bench_http_client [--requests 2000] [--concurrency 50] [--latency 0.005]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+from app.http_client import GraphHTTPClient
+from benchmarks.mock_graph import MockGraphAPI, MockGraphServer
+
+PAYLOAD = {
+    "messaging_product": "whatsapp",
+    "to": "919821449581",
+    "type": "template",
+    "template": {"name": "hello_world", "language": {"code": "en_US"}},
+}
+
+
+async def _run(send, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput_rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def bench_per_request_client(url: str, total: int, concurrency: int):
+    async def send():
+        async with httpx.AsyncClient() as client:
+            return await client.post(url, json=PAYLOAD)
+    return await _run(send, total, concurrency)
+
+
+async def bench_shared_client(url: str, total: int, concurrency: int, http2: bool):
+    client = GraphHTTPClient(max_connections=concurrency, max_keepalive_connections=concurrency, http2=http2)
+    try:
+        result = await _run(lambda: client.post(url, json=PAYLOAD), total, concurrency)
+        result["pool"] = client.stats()
+        return result
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="Mock upstream latency in seconds")
+    parser.add_argument("--http2", action="store_true", help="Enable HTTP/2 on the shared client (needs h2)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with MockGraphServer(MockGraphAPI(latency=args.latency)) as server:
+        url = f"{server.base_url}/123456/messages"
+        per_request = asyncio.run(bench_per_request_client(url, args.requests, args.concurrency))
+        shared = asyncio.run(bench_shared_client(url, args.requests, args.concurrency, args.http2))
+
+    print(f"{'mode':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in (("per-request client", per_request), ("shared pooled client", shared)):
+        print(f"{name:<22}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+    print(f"speedup: {shared['throughput_rps'] / per_request['throughput_rps']:.2f}x")
+    print(f"pool: {shared['pool']}")
+
+
+if __name__ == "__main__":
+    main()
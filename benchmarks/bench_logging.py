@@ -0,0 +1,120 @@
+"""
+Benchmark: logging overhead per send request on the calling (event loop)
+thread. Compares the previous setup (f-strings, StreamHandler writing
+synchronously) with app.logger (lazy %-style arguments, records handed to a
+QueueListener thread, JSON formatting off the hot path).
+
+The log lines mirror one hello_world send: route, auth, service and the
+debug lines that are disabled at INFO level. ``--write-delay-us`` simulates
+a slow stdout (a pipe whose reader is falling behind). Both setups create
+records with the lookups app.logger disables, so the difference is the
+handler path alone.
+
+Usage:
+    python -m benchmarks.bench_logging [--requests 20000] [--write-delay-us 0 50]
+"""
+import argparse
+import io
+import logging
+import logging.handlers
+import queue
+import time
+
+from app.logger import JsonFormatter, DeferredQueueHandler, Logger, TEXT_FORMAT
+
+PAYLOAD = b'{"messaging_product":"whatsapp","to":"919821449581","type":"template","template":{"name":"hello_world"}}'
+RESPONSE = {"messaging_product": "whatsapp", "messages": [{"id": "wamid.HBgLOTE5ODIxNDQ5NTgxFQIAERgSQjQ2"}]}
+
+
+class SlowStream(io.TextIOBase):
+    """Discards output, optionally blocking on each write like a full pipe."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            deadline = time.perf_counter() + self.delay
+            while time.perf_counter() < deadline:
+                pass
+        return len(text)
+
+
+def legacy_request(log: logging.Logger, number: str, template: str) -> None:
+    log.info(f"Received hello_world template request for {number}")
+    log.debug(f"Raw received API key: '{'k' * 32}'")
+    log.debug(f"Keys equal after strip: {True}")
+    log.info(f"API key validation successful")
+    log.info(f"Sending WhatsApp template message to {number}")
+    log.debug(f"Using template: {template}")
+    log.debug(f"Request payload: {PAYLOAD}")
+    log.info(f"Successfully sent template message to {number}")
+    log.debug(f"WhatsApp API response: {RESPONSE}")
+
+
+def current_request(log: Logger, number: str, template: str) -> None:
+    log.info("Received hello_world template request for %s", number, sampled=True)
+    log.debug("Raw received API key: '%s'", "k" * 32)
+    log.debug("Keys equal after strip: %s", True)
+    log.info("API key validation successful", sampled=True)
+    log.info("Sending WhatsApp template message to %s", number, sampled=True)
+    log.debug("Using template: %s", template)
+    log.debug("Request payload: %s", PAYLOAD)
+    log.info("Successfully sent template message to %s", number, sampled=True)
+    log.debug("WhatsApp API response: %s", RESPONSE)
+
+
+def isolated_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(name)
+    log.handlers = [handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log
+
+
+def run_legacy(requests: int, delay: float) -> float:
+    handler = logging.StreamHandler(SlowStream(delay))
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    log = isolated_logger("bench.legacy", handler)
+    start = time.perf_counter()
+    for i in range(requests):
+        legacy_request(log, f"9198214{i:05d}", "hello_world")
+    return time.perf_counter() - start
+
+
+def run_current(requests: int, delay: float, sample_rate: float) -> float:
+    stream = logging.StreamHandler(SlowStream(delay))
+    stream.setFormatter(JsonFormatter())
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    isolated_logger("bench.current", DeferredQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, stream)
+    listener.start()
+    log = Logger("bench.current", sample_rate=sample_rate)
+    start = time.perf_counter()
+    for i in range(requests):
+        current_request(log, f"9198214{i:05d}", "hello_world")
+    elapsed = time.perf_counter() - start
+    listener.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--write-delay-us", type=float, nargs="+", default=[0, 50])
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="LOG_SAMPLE_RATE for the sampled run")
+    args = parser.parse_args()
+
+    print(f"{'stdout write delay':<20}{'legacy us/req':>15}{'queued us/req':>15}"
+          f"{f'sampled {args.sample_rate:g}':>15}")
+    for delay_us in args.write_delay_us:
+        delay = delay_us / 1e6
+        legacy = run_legacy(args.requests, delay)
+        current = run_current(args.requests, delay, 1.0)
+        sampled = run_current(args.requests, delay, args.sample_rate)
+        print(f"{f'{delay_us:g} us':<20}{legacy / args.requests * 1e6:>15.1f}"
+              f"{current / args.requests * 1e6:>15.1f}{sampled / args.requests * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: cost per event of the instruments in app.metrics, plus the
+time to render a scrape with realistic label cardinality.
+
+Usage:
+    python -m benchmarks.bench_metrics [--iterations 1000000]
+"""
+import argparse
+import random
+import timeit
+
+from app.metrics import Counter, Gauge, Histogram, Registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = registry.register(Histogram("bench_latency_seconds", "Latency.", ("template", "status")))
+    counter = registry.register(Counter("bench_events_total", "Events."))
+    gauge = registry.register(Gauge("bench_in_flight", "In flight."))
+
+    latencies = [random.lognormvariate(-4, 1) for _ in range(1024)]
+    values = iter(latencies * (args.iterations // len(latencies) + 1))
+
+    cases = {
+        "histogram.observe": lambda: histogram.observe(next(values), "hello_world", "200"),
+        "counter.inc": lambda: counter.inc(),
+        "gauge.inc + dec": lambda: (gauge.inc(), gauge.dec()),
+        "empty call (baseline)": lambda: None,
+    }
+    print(f"{'operation':<24}{'ns/event':>10}")
+    for name, case in cases.items():
+        elapsed = timeit.timeit(case, number=args.iterations)
+        print(f"{name:<24}{elapsed / args.iterations * 1e9:>10.0f}")
+
+    # 20 templates x 5 statuses, the order of magnitude a busy instance exports
+    for template in range(20):
+        for status in ("200", "400", "429", "500", "error"):
+            histogram.observe(0.05, f"template_{template}", status)
+    renders = 200
+    elapsed = timeit.timeit(registry.render, number=renders)
+    print(f"\nrender with {len(histogram._series)} histogram series: {elapsed / renders * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
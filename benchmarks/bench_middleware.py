@@ -0,0 +1,126 @@
+"""
+Benchmark: the previous BaseHTTPMiddleware chain vs. the pure ASGI
+middleware in app.middleware.security.
+
+Both chains wrap the same trivial JSON endpoint and are driven in-process
+through httpx.ASGITransport, so the numbers isolate middleware overhead.
+
+Usage:
+    python -m benchmarks.bench_middleware [--requests 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.rate_limit import MemoryBackend
+from app.middleware.security import (
+    HTTPSRedirectMiddleware,
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware
+)
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, backend):
+        super().__init__(app)
+        self.backend = backend
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        allowed, _ = await self.backend.hit(request.client.host if request.client else "unknown")
+        if not allowed:
+            return JSONResponse(status_code=429, content={"detail": "Too many requests."})
+        return await call_next(request)
+
+
+class LegacyHTTPSRedirectMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable):
+        if request.url.scheme != "https":
+            return JSONResponse(status_code=400, content={"detail": "HTTPS is required for all API calls"})
+        return await call_next(request)
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["Content-Security-Policy"] = "default-src 'self'"
+        return response
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    backend = MemoryBackend(10**9, 60)
+    if legacy:
+        app.add_middleware(LegacyHTTPSRedirectMiddleware)
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware, backend=backend)
+    else:
+        app.add_middleware(HTTPSRedirectMiddleware)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RateLimitMiddleware, backend=backend)
+    return app
+
+
+async def drive(app: FastAPI, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+        # Warm up routing and middleware stack construction
+        for _ in range(50):
+            await client.get("/ping")
+
+        pending = iter(range(total))
+
+        async def worker():
+            for _ in pending:
+                start = time.perf_counter()
+                response = await client.get("/ping")
+                latencies.append(time.perf_counter() - start)
+                assert response.headers["x-content-type-options"] == "nosniff"
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput_rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    legacy = asyncio.run(drive(build_app(legacy=True), args.requests, args.concurrency))
+    asgi = asyncio.run(drive(build_app(legacy=False), args.requests, args.concurrency))
+
+    print(f"{'middleware chain':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in (("BaseHTTPMiddleware", legacy), ("pure ASGI", asgi)):
+        print(f"{name:<22}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+    print(f"speedup: {asgi['throughput_rps'] / legacy['throughput_rps']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
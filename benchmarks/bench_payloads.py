@@ -0,0 +1,100 @@
+"""
+Benchmark: per-request dict assembly + httpx's JSON encoding (previous
+send_whatsapp_message) vs. the registered payload builders in app.payloads.
+
+Usage:
+    python -m benchmarks.bench_payloads [--iterations 200000]
+"""
+import argparse
+import json
+import timeit
+
+from app.payloads import build_payload, graph_endpoint
+from app.schemas import (
+    AccountCreatedTemplateRequest,
+    HelloWorldTemplateRequest,
+    MessageRequest,
+    OrderConfirmTemplateRequest
+)
+
+BASE_URL = "https://graph.facebook.com/v12.0"
+PHONE_NUMBER_ID = "123456789"
+TOKEN = "token"
+
+
+def legacy_build(message, phone_number: str) -> tuple:
+    """The dict construction send_whatsapp_message did before the registry."""
+    url = f"{BASE_URL}/{PHONE_NUMBER_ID}/messages"
+    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": phone_number,
+        "type": "template",
+        "template": {
+            "name": getattr(message, "template_name", None) or message.template.name,
+            "language": {"code": "en_US"}
+        }
+    }
+    if isinstance(message, OrderConfirmTemplateRequest):
+        payload["template"]["components"] = [
+            {"type": "header", "parameters": [{"type": "document", "document": {"link": str(message.pdf_url)}}]},
+            {"type": "body", "parameters": [
+                {"type": "text", "text": message.card_type},
+                {"type": "text", "text": message.merchant_name},
+                {"type": "text", "text": message.document_type}
+            ]}
+        ]
+    elif isinstance(message, AccountCreatedTemplateRequest):
+        payload["template"]["components"] = [{"type": "body", "parameters": [
+            {"type": "text", "text": message.name},
+            {"type": "text", "text": message.verification_type}
+        ]}]
+    elif isinstance(message, MessageRequest) and message.template.components:
+        payload["template"]["components"] = [
+            c.model_dump(mode="json", exclude_none=True) for c in message.template.components
+        ]
+    # httpx's json= encoding
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    return url, headers, body
+
+
+def registry_build(message, phone_number: str) -> tuple:
+    url, headers = graph_endpoint(BASE_URL, PHONE_NUMBER_ID, TOKEN)
+    return url, headers, build_payload(message, phone_number, "en_US")
+
+
+MESSAGES = {
+    "hello_world": HelloWorldTemplateRequest(to_number="919821449581"),
+    "order_confirm": OrderConfirmTemplateRequest(
+        to_number="919821449581", card_type="Credit", merchant_name="Amazon",
+        document_type="statement", pdf_url="https://example.com/documents/statement.pdf"
+    ),
+    "account_created": AccountCreatedTemplateRequest(
+        to_number="919821449581", name="John Doe", verification_type="email"
+    ),
+    "generic": MessageRequest(
+        to_number="919821449581",
+        template={"name": "promo", "language": {"code": "en_US"}, "components": [
+            {"type": "body", "parameters": [{"type": "text", "text": "Hello"}]}
+        ]}
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'template':<18}{'legacy ns':>12}{'registry ns':>14}{'speedup':>10}")
+    for name, message in MESSAGES.items():
+        assert json.loads(legacy_build(message, "919821449581")[2]) == \
+            json.loads(registry_build(message, "919821449581")[2])
+        legacy = timeit.timeit(lambda: legacy_build(message, "919821449581"), number=args.iterations)
+        registry = timeit.timeit(lambda: registry_build(message, "919821449581"), number=args.iterations)
+        print(f"{name:<18}{legacy / args.iterations * 1e9:>12.0f}"
+              f"{registry / args.iterations * 1e9:>14.0f}{legacy / registry:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
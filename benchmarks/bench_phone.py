@@ -0,0 +1,101 @@
+"""
+Benchmark: validating and normalizing recipient numbers. Compares the
+previous per-message path (strip, '+' handling, regex looked up from the
+``re`` cache on every call, '+' removed again for the Graph API) with the
+precompiled, LRU-cached normalize_phone_numbers batch call.
+
+The list mixes formats ("+91...", "91...", "+1 (415) 555-0100"), repeats
+recipients and contains a share of invalid numbers.
+
+Usage:
+    python -m benchmarks.bench_phone [--numbers 100000] [--unique 0.3] [--invalid 0.02]
+"""
+import argparse
+import random
+import re
+import time
+from typing import List, Optional
+
+from app.utils.phone import clear_phone_cache, normalize_phone_numbers
+
+
+def legacy_validate_phone_number(phone_number: str) -> bool:
+    """validate_phone_number before numbers were normalized once and cached."""
+    phone_number = phone_number.strip()
+    if not phone_number.startswith('+'):
+        phone_number = '+' + phone_number
+    pattern = r'^\+[1-9]\d{1,14}$'
+    return bool(re.match(pattern, phone_number))
+
+
+def legacy_normalize(phone_number: str) -> Optional[str]:
+    """What send_whatsapp_message did with to_number before sending."""
+    phone_number = phone_number.strip()
+    if not phone_number.startswith('+'):
+        phone_number = '+' + phone_number
+    if not legacy_validate_phone_number(phone_number):
+        return None
+    return phone_number[1:] if phone_number.startswith('+') else phone_number
+
+
+def make_numbers(count: int, unique_ratio: float, invalid_ratio: float, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    unique = max(1, int(count * unique_ratio))
+    pool = []
+    for _ in range(unique):
+        roll = rng.random()
+        if roll < invalid_ratio:
+            pool.append(rng.choice(["0123456", "+", "abc123", "+1234567890123456"]))
+            continue
+        digits = f"{rng.randint(1, 9)}{rng.randrange(10 ** 10, 10 ** 11)}"
+        if roll < 0.5:
+            pool.append("+" + digits)
+        elif roll < 0.85:
+            pool.append(digits)
+        else:
+            pool.append(f"+{digits[:2]} {digits[2:5]} {digits[5:8]}-{digits[8:]}")
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--numbers", type=int, default=100_000)
+    parser.add_argument("--unique", type=float, default=0.3, help="Share of distinct numbers in the list")
+    parser.add_argument("--invalid", type=float, default=0.02, help="Share of distinct numbers that are invalid")
+    args = parser.parse_args()
+
+    numbers = make_numbers(args.numbers, args.unique, args.invalid)
+
+    legacy_invalid: List[int] = []
+
+    def legacy():
+        legacy_invalid[:] = [i for i, number in enumerate(numbers) if legacy_normalize(number) is None]
+
+    result = None
+
+    def batch():
+        nonlocal result
+        result = normalize_phone_numbers(numbers)
+
+    legacy_time = timed(legacy)
+    clear_phone_cache()
+    cold_time = timed(batch)
+    warm_time = timed(batch)
+
+    # Formatted numbers ("+1 (415) ...") are accepted now, so only check the overlap
+    assert set(result.invalid) <= set(legacy_invalid)
+
+    print(f"{args.numbers} numbers, {len(set(numbers))} distinct, {len(result.invalid)} invalid")
+    print(f"{'implementation':<28}{'total ms':>10}{'ns/number':>12}")
+    for name, seconds in (("legacy", legacy_time), ("batch, cold cache", cold_time), ("batch, warm cache", warm_time)):
+        print(f"{name:<28}{seconds * 1e3:>10.1f}{seconds / args.numbers * 1e9:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
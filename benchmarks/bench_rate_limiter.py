@@ -0,0 +1,90 @@
+"""
+Benchmark: list-scan rate limiter (previous implementation) vs. the O(1)
+sliding-window counter used by RateLimitMiddleware.
+
+Usage:
+    python -m benchmarks.bench_rate_limiter [--clients 10000] [--requests 200000] [--max-requests 100]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Dict, List
+
+from app.middleware.rate_limit import SlidingWindowRateLimiter
+
+
+class ListScanRateLimiter:
+    """The per-IP timestamp list algorithm RateLimitMiddleware used before."""
+
+    def __init__(self, max_requests: int, window_seconds: float):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.requests: Dict[str, List[float]] = {}
+
+    def hit(self, key: str, now: float) -> bool:
+        if key not in self.requests:
+            self.requests[key] = []
+        self.requests[key] = [t for t in self.requests[key] if now - t < self.window_seconds]
+        if len(self.requests[key]) >= self.max_requests:
+            return False
+        self.requests[key].append(now)
+        return True
+
+
+def _drive(limiter, keys: List[str], clock_step: float) -> None:
+    now = 1_000_000.0
+    for key in keys:
+        now += clock_step
+        limiter.hit(key, now)
+
+
+def run(factory, keys: List[str], clock_step: float):
+    """Time one run, then measure peak memory on a second, traced run."""
+    limiter = factory()
+    start = time.perf_counter()
+    _drive(limiter, keys, clock_step)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    _drive(factory(), keys, clock_step)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return limiter, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--max-requests", type=int, default=100)
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--hot-clients", type=int, default=50,
+                        help="Clients that receive half of all traffic (exercise long timestamp lists)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    clients = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.clients)]
+    hot = clients[:args.hot_clients]
+    keys = [rng.choice(hot) if rng.random() < 0.5 else rng.choice(clients) for _ in range(args.requests)]
+    # Spread the run over two windows so both implementations expire state
+    clock_step = 2 * args.window / args.requests
+
+    legacy, legacy_time, legacy_mem = run(
+        lambda: ListScanRateLimiter(args.max_requests, args.window), keys, clock_step
+    )
+    sliding, sliding_time, sliding_mem = run(
+        lambda: SlidingWindowRateLimiter(args.max_requests, args.window, max_keys=args.clients), keys, clock_step
+    )
+
+    print(f"{args.requests} requests from {args.clients} clients (limit {args.max_requests}/{args.window:.0f}s)")
+    print(f"{'implementation':<26}{'ns/request':>12}{'peak KiB':>12}{'keys kept':>12}")
+    print(f"{'list scan (previous)':<26}{legacy_time / args.requests * 1e9:>12.0f}"
+          f"{legacy_mem / 1024:>12.0f}{len(legacy.requests):>12}")
+    print(f"{'sliding window counter':<26}{sliding_time / args.requests * 1e9:>12.0f}"
+          f"{sliding_mem / 1024:>12.0f}{len(sliding.entries):>12}")
+    print(f"speedup: {legacy_time / sliding_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
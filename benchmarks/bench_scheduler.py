@@ -0,0 +1,95 @@
+"""
+Benchmark: the send scheduler with a large backlog. Books ``--pending``
+sends spread over the next day, then measures how long the loader takes
+to fill the heap with the sends due within the horizon and how much memory
+the heap uses, compared with the previous approach of one sleeping
+coroutine per scheduled message.
+
+Usage:
+    python -m benchmarks.bench_scheduler [--pending 1000000] [--horizon 300]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from app.scheduler import SendScheduler
+from app.schemas import HelloWorldTemplateRequest
+
+
+def book(scheduler: SendScheduler, count: int, spread: float) -> float:
+    """Insert ``count`` scheduled sends directly, as fast as SQLite allows."""
+    payload = HelloWorldTemplateRequest(to_number="919821449581").model_dump_json()
+    now = time.time()
+    rng = random.Random(3)
+    rows = (
+        (uuid.uuid4().hex, "bench", "HelloWorldTemplateRequest", payload, now + rng.random() * spread, now, now)
+        for _ in range(count)
+    )
+    started = time.perf_counter()
+    with scheduler._lock:
+        scheduler._conn.execute("BEGIN")
+        scheduler._conn.executemany(
+            "INSERT INTO scheduled_sends (id, client_id, kind, payload, send_at, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'scheduled', ?, ?)",
+            rows
+        )
+        scheduler._conn.execute("COMMIT")
+    return time.perf_counter() - started
+
+
+async def coroutine_per_message(count: int) -> int:
+    """Memory held by one sleeping task per scheduled send."""
+    tracemalloc.start()
+    tasks = [asyncio.create_task(asyncio.sleep(3600)) for _ in range(count)]
+    await asyncio.sleep(0)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pending", type=int, default=1_000_000)
+    parser.add_argument("--horizon", type=float, default=300.0)
+    parser.add_argument("--max-loaded", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        scheduler = SendScheduler(
+            os.path.join(directory, "scheduled.db"), horizon=args.horizon, max_loaded=args.max_loaded
+        )
+        scheduler.open()
+        insert = book(scheduler, args.pending, spread=86400)
+        print(f"booked {args.pending} sends in {insert:.1f}s ({args.pending / insert:,.0f}/s)")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        for send_at, schedule_id in scheduler._load_due(time.time() + args.horizon):
+            scheduler._push(send_at, schedule_id)
+        load = time.perf_counter() - started
+        heap_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"loaded {len(scheduler._heap)} due within {args.horizon:g}s in {load * 1e3:.1f} ms, "
+              f"{heap_memory / 1e6:.1f} MB")
+
+        started = time.perf_counter()
+        scheduler._load_due(time.time() + args.horizon + 1)
+        print(f"incremental load (1s of window): {(time.perf_counter() - started) * 1e3:.2f} ms")
+        scheduler.close()
+
+    sample = min(args.pending, 100_000)
+    per_task = asyncio.run(coroutine_per_message(sample)) / sample
+    print(f"coroutine per message: {per_task:.0f} bytes each, "
+          f"~{per_task * args.pending / 1e6:.0f} MB for {args.pending} pending sends")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: cold start, from a fresh interpreter to the first response.
+Each run starts a new Python process that imports ``app.main``, runs the
+application lifespan (HTTP client, stores, background tasks) and serves
+GET /api/v1/health in-process. Reports the median and range of each phase
+over ``--runs`` processes, and with ``--importtime`` the modules that
+take longest to import (from ``python -X importtime``).
+
+Data files go to a temporary directory and an empty .env file is used,
+so local configuration does not affect the numbers.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10] [--importtime 15]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+PHASES = ("import", "startup", "first_response", "total")
+
+
+def child() -> None:
+    """Runs inside the measured process; prints phase timings in ms as JSON."""
+    started = time.perf_counter()
+    import app.main
+    imported = time.perf_counter()
+
+    async def serve() -> Tuple[float, float]:
+        import httpx
+        application = app.main.app
+        async with application.router.lifespan_context(application):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=application)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                response = await client.get("/api/v1/health")
+                response.raise_for_status()
+            responded = time.perf_counter()
+        return ready, responded
+
+    ready, responded = asyncio.run(serve())
+    print(json.dumps({
+        "import": (imported - started) * 1e3,
+        "startup": (ready - imported) * 1e3,
+        "first_response": (responded - ready) * 1e3,
+    }))
+
+
+def environment(directory: str) -> Dict[str, str]:
+    env_file = os.path.join(directory, ".env")
+    open(env_file, "w").close()
+    env = dict(os.environ)
+    env.update({
+        "ENV_FILE": env_file,
+        "API_KEY": "bench-key",
+        "WHATSAPP_API_TOKEN": "bench-token",
+        "PHONE_NUMBER_ID": "1234567890",
+        "LOG_LEVEL": "WARNING",
+        "IDEMPOTENCY_SQLITE_PATH": "",
+        "STATUS_STORE_PATH": os.path.join(directory, "status.db"),
+        "SCHEDULER_PATH": os.path.join(directory, "scheduled.db"),
+        "SEND_QUEUE_PATH": os.path.join(directory, "send_queue.db"),
+        "SUPPRESSION_SNAPSHOT_PATH": os.path.join(directory, "suppression.bin"),
+        "RATE_LIMIT_SHM_PATH": os.path.join(directory, "rate_limit"),
+    })
+    return env
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    total = (time.perf_counter() - started) * 1e3
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total"] = total
+    return timings
+
+
+def slowest_imports(env: Dict[str, str], count: int) -> List[Tuple[int, int, str]]:
+    """(self, cumulative, module) import times in microseconds, slowest cumulative first."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        own, _, rest = line.removeprefix("import time:").partition("|")
+        cumulative, _, name = rest.partition("|")
+        try:
+            rows.append((int(own), int(cumulative), name.strip()))
+        except ValueError:
+            # The header line
+            continue
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="also list the N slowest imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = environment(directory)
+        # One unmeasured run so every sample sees warm .pyc files and page cache
+        run_once(env)
+        samples = [run_once(env) for _ in range(args.runs)]
+        imports = slowest_imports(env, args.importtime) if args.importtime else []
+
+    print(f"{args.runs} cold starts (ms)      median      min      max")
+    for phase in PHASES:
+        values = [sample[phase] for sample in samples]
+        print(f"  {phase:<22}{statistics.median(values):>9.1f}{min(values):>9.1f}{max(values):>9.1f}")
+    if imports:
+        print("\nslowest imports (ms)      self  cumulative")
+        for own, cumulative, name in imports:
+            print(f"  {name:<22}{own / 1e3:>7.1f}{cumulative / 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Minimal local stand-in for the WhatsApp Graph API used by the benchmarks.
+
+Runs a uvicorn server in a background thread that answers
+``POST /{phone_number_id}/messages`` with a canned success payload after
+an optional artificial latency. ``POST /{phone_number_id}/media`` consumes
+the upload and returns a media id, and ``GET /documents/<name>`` serves a
+deterministic document of ``document_size`` bytes (content depends on the
+name) for media upload tests.
+
+Errors can be injected at a fixed rate: ``error_rate`` of the message sends
+fail with ``error_status`` and a Graph-style error body (code 130429 for
+429, so the service treats it as a throughput limit).
+"""
+import asyncio
+import collections
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+class MockGraphAPI:
+    """ASGI app that mimics the Graph API messages endpoint."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        document_size: int = 256 * 1024,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int = 1
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.document_size = document_size
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.downloads = 0
+        # Most recent message payloads received, for inspection by tests
+        self.payloads = collections.deque(maxlen=1000)
+        self._ids = itertools.count(1)
+        self._media_ids = itertools.count(1)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["method"] == "GET" and scope["path"].startswith("/documents/"):
+            await self._serve_document(scope, send)
+            return
+
+        received = 0
+        chunks = []
+        media = scope["path"].endswith("/media")
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if not media:
+                chunks.append(chunk)
+            more_body = message.get("more_body", False)
+
+        self.requests += 1
+        delay = self.latency
+        if self.latency_jitter:
+            delay = max(0.0, delay + self._random.uniform(-self.latency_jitter, self.latency_jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+        if not media and self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            await self._send_error(send)
+            return
+        if media:
+            self.uploads += 1
+            self.uploaded_bytes += received
+            payload = {"id": f"media.mock{next(self._media_ids)}"}
+        else:
+            self.payloads.append(b"".join(chunks))
+            payload = {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": "0", "wa_id": "0"}],
+                "messages": [{"id": f"wamid.mock{next(self._ids)}"}],
+            }
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+    async def _send_error(self, send):
+        code = 130429 if self.error_status == 429 else 131000
+        body = json.dumps({"error": {
+            "message": "Injected error",
+            "type": "OAuthException",
+            "code": code,
+            "fbtrace_id": "mock",
+        }}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": self.error_status,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _serve_document(self, scope, send):
+        self.downloads += 1
+        block = (scope["path"].encode() * 64)[:4096]
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/pdf"),
+                (b"content-length", str(self.document_size).encode()),
+            ],
+        })
+        remaining = self.document_size
+        while remaining:
+            chunk = block[:min(len(block), remaining)]
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockGraphServer:
+    """Run a MockGraphAPI on localhost in a background thread."""
+
+    def __init__(self, app: MockGraphAPI = None, port: int = None):
+        self.app = app or MockGraphAPI()
+        self.port = port or _free_port()
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "MockGraphServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)